@@ -5,66 +5,256 @@
 #==================================================================
 # ------------------ Chargement des bibliothèques -----------------
 #==================================================================
+# Cœur léger (données, agrégats) importé au démarrage ; pile géographique
+# (geopandas, folium) et Plotly Express importées à la première carte ou au
+# premier graphique affiché (cf. benchmarks/bench_startup.py)
 import os
-import requests
+import shutil
+import time
+from functools import partial
 import pandas as pd
-import geopandas as gpd
-import folium
 import streamlit as st
-import plotly.express as px
-import matplotlib.pyplot as plt
-from shapely.geometry import Point
-from folium.plugins import MarkerCluster
-from streamlit_folium import st_folium
-from branca.element import Template, MacroElement
 from datetime import datetime
+from griefpy.ingestion import REQUIRED_COLS, MissingColumnsError, content_hash, remove_legacy_snapshots, stream_workbook
+from griefpy.incremental import (
+    INCREMENTAL_DIR, STATE_MAX_AGE, UPLOAD_DIR, UPLOAD_MAX_AGE, IncrementalStore, purge_states, source_state_dir,
+    touch_state,
+)
+from griefpy.remote import RemoteFetcher, RemoteFetchError, content_stamp
+from griefpy.refresh import REFRESH_INTERVAL, BackgroundRefresher
+from griefpy.consolidation import ConsolidatedStore, load_manifest
+from griefpy.aggregation import PROJECT_COL, AggregateCube, kpi_counts
+from griefpy.filtres import FilterIndex, sidebar_criteria
+from griefpy.instrumentation import Recorder, timed, record, to_jsonl, to_prometheus
+from griefpy.figures import BASE_TEMPLATE, FigureCache, FigureTheme, filter_key
+from griefpy.durees import SLA_DAYS
+from griefpy.graphiques import STATUS_COLORS, build_communautes, build_duree, build_evolution, build_nature
+from griefpy.table import PAGE_SIZES, TableIndex, export_csv, export_parquet
+from griefpy.schema import memory_usage
+
+t_debut = time.perf_counter()
+
+# --- Mesures détaillées par étape (coupées par défaut : contexte vide) ---
+mesures = st.session_state.setdefault("instrumentation", Recorder())
+mesures.enabled = st.session_state.get("afficher_temps", False)
+mesures.new_run()
 
 #=================================================================
 # -------------------- Chargement des données --------------------
 #=================================================================
-@st.cache_data(ttl=30)
-def load_data(path):
+# --- Récupérateur partagé (session HTTP + cache disque) ---
+@st.cache_resource
+def get_fetcher():
+    return RemoteFetcher()
+
+# --- Couches géographiques (clé = chemins + empreinte des fichiers), lues
+# dès leur téléchargement par le fil de scrutation ---
+@st.cache_resource
+def get_geo_cache():
+    from griefpy.geo import GeoCache
+    return GeoCache()
+
+def get_geo_assets(point_path, polygon_path, empreintes):
+    return get_geo_cache().assets(point_path, polygon_path, empreintes)
+
+# --- Table préparée et cube tenus à jour par deltas (un état par source) ---
+@st.cache_resource(max_entries=4)
+def get_store(key):
+    return IncrementalStore(source_state_dir(key))
+
+def source_id(source):
+    return getattr(source, "name", None) or str(source)
+
+# --- Fichiers téléversés : un état par contenu (jamais partagé par simple nom),
+# effacé du disque dès que le cache le libère, ou après UPLOAD_MAX_AGE sans usage ---
+@st.cache_resource(max_entries=4, on_release=lambda store: shutil.rmtree(store.state_dir, ignore_errors=True))
+def get_upload_store(version):
+    purge_states(UPLOAD_DIR, UPLOAD_MAX_AGE)
+    return IncrementalStore(os.path.join(UPLOAD_DIR, version[:16]))
+
+# --- Nettoyage des caches sur disque (une fois par processus) ---
+@st.cache_resource
+def purge_cache(sources):
+    # Anciens instantanés Parquet : copies complètes du registre, plus lues
+    remove_legacy_snapshots()
+    purge_states(UPLOAD_DIR, UPLOAD_MAX_AGE)
+    # États des anciennes sources (dont les fichiers téléversés des versions précédentes)
+    purge_states(INCREMENTAL_DIR, STATE_MAX_AGE, keep=[source_state_dir(source) for source in sources])
+
+def sources_configurees():
+    """Registres dont l'état est conservé : source unique ou projets du manifeste."""
+    if not manifest:
+        return (url_excel,)
+    try:
+        return tuple(p.registre for p in load_manifest(manifest))
+    except (OSError, ValueError):
+        return ()
+
+# --- Index bitmap des filtres (une fois par version) ---
+@st.cache_resource(max_entries=4)
+def get_filter_index(version, _df):
+    return FilterIndex(_df)
+
+# --- Index du tableau : recherche et tri côté serveur (une fois par version) ---
+@st.cache_resource(max_entries=4)
+def get_table_index(version, _df):
+    return TableIndex(_df)
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+def load_data(source):
+    """Version (empreinte) du fichier téléversé, lu en flux et validé au premier passage.
+
+    Ne renvoie que la version : la table n'est pas copiée par session.
+    L'empreinte du fichier (et son refus éventuel) est gardée dans la session
+    sous (`file_id`, taille) : les relances ne rehachent pas les octets.
+    """
+    cle = (source.file_id, source.size)
+    connu = st.session_state.get("televersement")
+    if connu is None or connu[0] != cle:
+        # Seul le dernier fichier de la session est gardé : rien ne s'accumule
+        connu = st.session_state["televersement"] = (cle, content_hash(source.getvalue()), None)
+    _, version, rejet = connu
+    if rejet is not None:
+        raise rejet
+    store = get_upload_store(version)
+    if store.version == version:
+        return version
+    # En-tête vérifié avant toute ligne, puis lignes validées et typées par blocs
+    barre = st.sidebar.progress(0.0, text="📥 Lecture du fichier…")
+    def avancement(lues, total):
+        barre.progress(min(lues / total, 1.0) if total else 0.0, text=f"📥 Lecture du fichier : {lues} lignes validées")
     try:
-        df = pd.read_excel(path, engine="openpyxl")
-        return df
+        # `getvalue()` renvoie le tampon du fichier lui-même (sans copie)
+        store.refresh(source.getvalue(), reader=partial(stream_workbook, progress=avancement), version=version)
     except Exception as e:
-        st.error(f"❌ Impossible de charger le fichier Excel : {e}")
-        return pd.DataFrame()
+        st.session_state["televersement"] = (cle, version, e.with_traceback(None))
+        raise
+    finally:
+        barre.empty()
+    return version
+
+def upload_snapshot(source):
+    """Version publiée du fichier téléversé (lu si son état a été libéré)."""
+    version = load_data(source)
+    store = get_upload_store(version)
+    touch_state(store.state_dir)
+    snapshot = store.snapshot
+    return snapshot if snapshot is not None and snapshot.version == version else None
+
+def lecture_anticipee(geo_cache, point_src, polygon_src):
+    """Rappel du fil de scrutation : GeoPackage lu dès que sa copie arrive."""
+    kinds = {point_src: "points", polygon_src: "polygon"}
+    def on_fetched(result):
+        if result.url in kinds:
+            geo_cache.warm(kinds[result.url], result.path, content_stamp(result))
+    return on_fetched
+
+# --- Scrutation des sources distantes en tâche de fond (un fil par source) ---
+# Manifeste multi-projets : un store par registre, projets rechargés en parallèle
+@st.cache_resource(max_entries=4, on_release=lambda refresher: refresher.stop(0))
+def get_refresher(url, extra_urls, manifeste=False):
+    store = ConsolidatedStore(get_fetcher(), INCREMENTAL_DIR) if manifeste else get_store(source_id(url))
+    refresher = BackgroundRefresher(
+        get_fetcher(), store, url, extra_urls, interval=refresh_interval,
+        on_fetched=None if manifeste else lecture_anticipee(get_geo_cache(), *extra_urls),
+    )
+    # Seul le tout premier chargement (aucune version sur disque) attend la source
+    if refresher.store.snapshot is None:
+        refresher.poll()
+    return refresher.start()
+
+# Sources surchargeables par variable d'environnement (URL ou chemin local)
+url_excel = os.environ.get("GRIEFPY_EXCEL_URL", "https://www.dropbox.com/scl/fi/z8djqa2kmwvv5rpy1qgc3/Table_MGG.xlsx?rlkey=knqski5ezathyuo1v44lh6icy&st=cyyjc912&dl=1")
+point_url = os.environ.get("GRIEFPY_POINTS_URL", "https://www.dropbox.com/scl/fi/rgf74oa5eldfci8f5lems/Boite_aux_lettres.gpkg?rlkey=b6r4flk6158dy4mze9m8f81rp&st=dcgum783&dl=1")
+polygon_url = os.environ.get("GRIEFPY_POLYGON_URL", "https://www.dropbox.com/scl/fi/cqu74x55xo8phugzct5af/lim_lefini_09072020.gpkg?rlkey=15vxwezrwbo11rtfuxh2z91un&st=c05wbp5m&dl=1")
+refresh_interval = float(os.environ.get("GRIEFPY_REFRESH_SECONDS", REFRESH_INTERVAL))
+# Consolidation : manifeste JSON des projets (cf. griefpy.consolidation), prioritaire sur GRIEFPY_EXCEL_URL
+manifest = os.environ.get("GRIEFPY_MANIFEST")
+purge_cache(sources_configurees())
 
-url_excel = "https://www.dropbox.com/scl/fi/z8djqa2kmwvv5rpy1qgc3/Table_MGG.xlsx?rlkey=knqski5ezathyuo1v44lh6icy&st=cyyjc912&dl=1"
 uploaded_file = st.sidebar.file_uploader("Choisir un fichier Excel (.xlsx)", type=["xlsx"])
-df = load_data(uploaded_file if uploaded_file else url_excel)
+# Version publiée (table canonique + cube) lue une fois : même version pour
+# toute la relance, sans copie, même si une autre session la remplace entre-temps
+with mesures.stage("Chargement", size=lambda: memory_usage(snapshot.frame) if snapshot else 0):
+    colonnes_rejetees = None
+    if uploaded_file:
+        try:
+            snapshot = upload_snapshot(uploaded_file)
+        except MissingColumnsError as e:
+            snapshot, colonnes_rejetees = None, e.missing
+        except Exception as e:
+            # Fichier illisible ou valeurs invalides (InvalidRowsError : lignes citées)
+            snapshot = None
+            st.error(f"❌ Impossible de charger le fichier Excel : {e}")
+    else:
+        if manifest:
+            refresher = get_refresher(manifest, (), manifeste=True)
+        else:
+            refresher = get_refresher(url_excel, (point_url, polygon_url))
+        snapshot = refresher.store.snapshot
+        statut_maj = refresher.status
+        if isinstance(refresher.error, MissingColumnsError) and statut_maj.failures:
+            colonnes_rejetees = refresher.error.missing
+        if snapshot is None:
+            if colonnes_rejetees is None:
+                st.error(f"❌ Impossible de charger le fichier Excel : {statut_maj.last_error}")
+        else:
+            if statut_maj.checked_at:
+                st.sidebar.caption(f"🕒 Données à jour au {datetime.fromtimestamp(statut_maj.checked_at):%d/%m/%Y %H:%M:%S}")
+            if colonnes_rejetees:
+                st.sidebar.warning(
+                    f"⚠️ Nouvelle version rejetée, colonnes manquantes : {colonnes_rejetees}. "
+                    f"Dernière version valide affichée."
+                )
+            elif statut_maj.failures:
+                st.sidebar.warning(
+                    f"⚠️ Source injoignable ({statut_maj.failures} échec(s)) : dernière version valide affichée. "
+                    f"Nouvel essai à {datetime.fromtimestamp(statut_maj.next_at):%H:%M:%S}."
+                )
+        # Consolidation : projets absents de la table fusionnée
+        for r in (refresher.store.results.values() if manifest else []):
+            if r.error or r.missing_cols:
+                st.sidebar.warning(f"⚠️ Projet {r.project} écarté : {r.error or f'colonnes manquantes {r.missing_cols}'}")
+df = snapshot.frame if snapshot else pd.DataFrame()
 
 #====================================================================
 # -------------------- Vérification des colonnes --------------------
 #====================================================================
-cols_req = [
-    "Type_depot","Type","Statut_traitement","Nature_plainte",
-    "Categorie","Date_reception","Nb_jour","Communaute","Sexe", 
-    "Classement"
-]
+# Colonnes vérifiées sur le registre brut avant toute préparation (store incrémental)
+cols_req = REQUIRED_COLS
+
+if snapshot is None and colonnes_rejetees:
+    st.error(f"❌ Colonnes manquantes dans le fichier : {colonnes_rejetees}")
+    st.stop()
 
 if df.empty:
     st.error("❌ Le fichier Excel est vide ou n’a pas pu être chargé")
     st.stop()
 
 # Vérification des colonnes manquantes
-missing_cols = [col for col in cols_req if col not in df.columns]
+with mesures.stage("Vérification des colonnes"):
+    missing_cols = [col for col in cols_req if col not in df.columns]
 if missing_cols:
     st.error(f"❌ Colonnes manquantes dans le fichier : {missing_cols}")
     st.stop()
 
 # Si tout est bon, on poursuit sans afficher aucun message
-df["Date_reception"] = pd.to_datetime(df["Date_reception"], errors="coerce", dayfirst=True)
-df = df.dropna(subset=["Date_reception"])
-df["Année"] = df["Date_reception"].dt.year
-df["Trimestre"] = df["Date_reception"].dt.to_period("Q").astype(str)
-df["Mois"] = df["Date_reception"].dt.to_period("M").dt.to_timestamp()
+# (dates analysées et colonnes Année/Trimestre/Mois déjà calculées à l'ingestion)
+if df.attrs.get("sans_date"):
+    st.sidebar.caption(f"⚠️ {df.attrs['sans_date']} ligne(s) sans date de réception valide écartée(s)")
 
 #====================================================================
 # --------------------------- Filtres -------------------------------
 #====================================================================
 st.sidebar.header("Filtres")
+# Table consolidée : filtre par projet (None = source unique, sans colonne Projet)
+projets_choisis = None
+if PROJECT_COL in df.columns:
+    projets_dispo = df[PROJECT_COL].cat.categories.tolist()
+    projets_choisis = st.sidebar.multiselect("🗂️ Projet :", projets_dispo, default=projets_dispo)
 annee_courante = datetime.now().year
 annees_dispo = sorted(df["Année"].unique())
 annee_choisie = st.sidebar.selectbox(
@@ -72,25 +262,31 @@ annee_choisie = st.sidebar.selectbox(
     annees_dispo,
     index=annees_dispo.index(annee_courante) if annee_courante in annees_dispo else 0
 )
-Types = st.sidebar.multiselect("📂 Type de dépôt :", df["Type_depot"].unique(), default=df["Type_depot"].unique())
-Statuts = st.sidebar.multiselect("✅ Statut de traitement :", df["Statut_traitement"].unique(), default=df["Statut_traitement"].unique())
-
-# --- Dataframe filtré pour les graphiques ---
-df_filtered = df[df["Type_depot"].isin(Types) & df["Statut_traitement"].isin(Statuts)]
-if annee_choisie:
-    df_filtered = df_filtered[df_filtered["Année"] == annee_choisie]
-if df_filtered.empty:
+Types = st.sidebar.multiselect("📂 Type de dépôt :", df["Type_depot"].unique().tolist(), default=df["Type_depot"].unique().tolist())
+Statuts = st.sidebar.multiselect("✅ Statut de traitement :", df["Statut_traitement"].unique().tolist(), default=df["Statut_traitement"].unique().tolist())
+
+# --- Évaluation unique des filtres ---
+# Lignes retenues (tableau) et cube découpé (indicateurs, carte, graphiques)
+with mesures.stage("Filtres", size=lambda: rows_filtered.nbytes):
+    filter_index = get_filter_index(df.attrs.get("version"), df)
+    rows_filtered = filter_index.rows(sidebar_criteria(annee_choisie, Types, Statuts, projets_choisis))
+    cube = snapshot.cube
+    cube_filtered = cube.slice(annee_choisie, Types, Statuts, projets=projets_choisis)
+filtres_key = filter_key(df.attrs.get("version"), annee_choisie, Types, Statuts, projets_choisis)
+if len(rows_filtered) == 0:
     st.warning("Aucun enregistrement après filtrage")
     st.stop()
 
-# --- Dataframe filtré pour la carte ---
-df_filtered_2 = df[df["Type_depot"].isin(Types) & df["Statut_traitement"].isin(Statuts)].copy()
-if annee_choisie:
-    df_filtered_2 = df_filtered_2[df_filtered_2["Année"] == annee_choisie]
-    
-# Nettoyage pour la carte
-df_filtered_2["Communaute"] = df_filtered_2["Communaute"].astype(str).str.strip().str.lower()
-df_filtered_2["Statut_traitement"] = df_filtered_2["Statut_traitement"].replace(["nan","NaN","None",""], pd.NA)
+# --- Filtre croisé : communauté cliquée sur la carte (mode interactif) ---
+# Ignoré si la communauté n'a aucun grief avec les filtres courants
+communaute_carte = st.session_state.get("communaute_carte")
+if communaute_carte and not cube_filtered.count_where("Communaute", [communaute_carte]):
+    communaute_carte = None
+cube_graphiques = cube_filtered.where("Communaute", [communaute_carte]) if communaute_carte else cube_filtered
+# Histogrammes des durées découpés par les mêmes filtres que le cube
+durees_graphiques = snapshot.durees.slice(annee_choisie, Types, Statuts, projets=projets_choisis)
+if communaute_carte:
+    durees_graphiques = durees_graphiques.where("Communaute", [communaute_carte])
 
 #====================================================================
 # ---------------------- Apparence / Thème --------------------------
@@ -99,6 +295,7 @@ st.sidebar.markdown("---")
 st.sidebar.header("🖌️ Apparence")
 plein_ecran = st.sidebar.toggle("🖥️ Plein écran")
 theme_choice = st.sidebar.radio("🎨 Choisir le thème :", ["Clair", "Sombre"])
+afficher_temps = st.sidebar.toggle("⏱️ Temps d'exécution des sections", key="afficher_temps")
 
 # Définition des couleurs selon le thème
 if theme_choice == "Clair":
@@ -120,6 +317,7 @@ else:
     graph_bg_color = "#2a2d33"
     font_color = "#ffffff"
 
+figure_theme = FigureTheme(plotly_template, graph_bg_color, font_color)
 page_width = "100%" if plein_ecran else "80%"
 
 # Application du style CSS
@@ -152,14 +350,27 @@ h1,h2,h3,h4 {{
 </style>
 """, unsafe_allow_html=True)
 
+#====================================================================
+# ------------------ Chronométrage des sections ---------------------
+#====================================================================
+# Chaque section est une unité relancée seule (fragment) ou à la demande
+# (onglet ouvert) ; sa dernière durée est gardée dans la session.
+def section_timings():
+    return st.session_state.setdefault("section_timings", {})
+
+def afficher_duree(name, ms):
+    mesures.add(f"Section : {name}", ms)
+    if afficher_temps:
+        st.caption(f"⏱️ {name} : {ms:.0f} ms")
+
+def section(name):
+    return timed(section_timings, name, on_done=afficher_duree)
+
 #====================================================================
 # -------------------------- Indicateurs ----------------------------
 #====================================================================
 st.title("📊 Indicateurs de suivi MGG")
-total = len(df_filtered)
-acheves = len(df_filtered[df_filtered["Statut_traitement"].isin(["Achevé","Grief non recevable"])])
-en_cours = len(df_filtered[df_filtered["Statut_traitement"].isin(["En cours", "Perdu de vue"])])
-a_traiter = len(df_filtered[df_filtered["Statut_traitement"]=="A traiter"])
+total, acheves, en_cours, a_traiter = kpi_counts(cube_filtered)
 
 cols = st.columns(4)
 metrics = [(total,"Total"),(acheves,"Achevés"),(en_cours,"En cours"),(a_traiter,"A traiter")]
@@ -175,494 +386,502 @@ for col,(val,label),color in zip(cols,metrics,card_colors):
 #====================================================================
 # --------------------- Carte de localisation -----------------------
 #====================================================================
-point_url = "https://www.dropbox.com/scl/fi/rgf74oa5eldfci8f5lems/Boite_aux_lettres.gpkg?rlkey=b6r4flk6158dy4mze9m8f81rp&st=dcgum783&dl=1"
-polygon_url = "https://www.dropbox.com/scl/fi/cqu74x55xo8phugzct5af/lim_lefini_09072020.gpkg?rlkey=15vxwezrwbo11rtfuxh2z91un&st=c05wbp5m&dl=1"
-
-# --- Dossier temporaire ---
-os.makedirs("temp_gpkg", exist_ok=True)
-
-# --- Téléchargement des fichiers ---
-for url, path in [(point_url, "temp_gpkg/Boite_aux_lettres.gpkg"),
-                  (polygon_url, "temp_gpkg/lim_lefini_09072020.gpkg")]:
-    r = requests.get(url)
-    if r.status_code == 200:
-        with open(path, "wb") as f:
-            f.write(r.content)
-    else:
-        st.error(f"Erreur téléchargement : {url}")
-
-# --- Lecture GeoPackages ---
-point_gdf = gpd.read_file("temp_gpkg/Boite_aux_lettres.gpkg")
-polygon_gdf = gpd.read_file("temp_gpkg/lim_lefini_09072020.gpkg")
-
-# --- Reprojection vers WGS84 ---
-point_gdf = point_gdf.to_crs(epsg=4326)
-polygon_gdf = polygon_gdf.to_crs(epsg=4326)
-
-# --- Nettoyage des noms pour jointure ---
-point_gdf["name"] = point_gdf["name"].str.strip().str.lower()
-df_filtered_2["Communaute"] = df_filtered_2["Communaute"].str.strip().str.lower()
-
-# --- Statuts valides ---
-statuts_valides = ["Achevé", "En cours", "Perdu de vue", "A traiter"]
-
-# --- Préparation du résumé par communauté ---
-summary = df_filtered_2.groupby("Communaute").agg(
-    Total_griefs=pd.NamedAgg(column="Statut_traitement", aggfunc="count"),
-    Acheve=pd.NamedAgg(column="Statut_traitement", aggfunc=lambda x: (x=="Achevé").sum()),
-    En_cours=pd.NamedAgg(column="Statut_traitement", aggfunc=lambda x: (x=="En cours").sum()),
-    Perdu_de_vue=pd.NamedAgg(column="Statut_traitement", aggfunc=lambda x: (x=="Perdu de vue").sum()),
-    A_traiter=pd.NamedAgg(column="Statut_traitement", aggfunc=lambda x: (x=="A traiter").sum())
-).reset_index()
-
-# --- Conversion en int pour éviter ValueError ---
-cols_stats = ["Total_griefs","Acheve","En_cours","Perdu_de_vue","A_traiter"]
-summary[cols_stats] = summary[cols_stats].apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
-
-# --- Jointure avec les points ---
-point_merged = point_gdf.merge(summary, left_on="name", right_on="Communaute", how="left")
-point_merged[cols_stats] = point_merged[cols_stats].fillna(0).astype(int)
-
-# --- Fonction couleur selon présence de grief ---
-def couleur_point(total):
-    return "gray" if total == 0 else "blue"
-
-# --- Création de la carte ---
-m = folium.Map(location=[-0.7, 17], zoom_start=6, tiles="CartoDB dark_matter")
-
-# --- Ajout du polygone ---
-folium.GeoJson(
-    polygon_gdf,
-    name="Domaine",
-    style_function=lambda x: {"fillColor": "#ff7800","color": "#ffffff","weight": 2,"fillOpacity": 0.3},
-    tooltip="Zone de projet"
-).add_to(m)
-
-# --- Cluster des villages ---
-marker_cluster = MarkerCluster(name="📍 Communautés").add_to(m)
-
-# --- Ajout des points ---
-for _, row in point_merged.iterrows():
-    total = row.get("Total_griefs", 0)
-    popup_html = f"""
-    <b>Communauté :</b> {row.get('Communaute', 'Inconnue')}<br>
-    <b>Total griefs :</b> {total}<br>
-    <b>Achevé :</b> {row.get('Acheve', 0)}<br>
-    <b>En cours :</b> {row.get('En_cours', 0)}<br>
-    <b>Perdu de vue :</b> {row.get('Perdu_de_vue', 0)}<br>
-    <b>A traiter :</b> {row.get('A_traiter', 0)}
-    """
-    folium.CircleMarker(
-        location=[row.geometry.y, row.geometry.x],
-        radius=6,
-        color="white",
-        fill=True,
-        fill_color=couleur_point(total),
-        fill_opacity=0.9,
-        popup=folium.Popup(popup_html, max_width=250)
-    ).add_to(marker_cluster)
-
-# --- Layer control ---
-folium.LayerControl(collapsed=False).add_to(m)
-
-# --- CSS LayerControl ---
-macro = MacroElement()
-macro._template = Template("""
-{% macro html(this, kwargs) %}
-<style>
-.leaflet-control-layers {
-    font-size: 10px !important;
-    line-height: 1.1 !important;
-    max-height: 150px !important;
-    overflow-y: auto !important;
-}
-</style>
-{% endmacro %}
-""")
-m.get_root().add_child(macro)
-
-# --- Affichage Streamlit ---
-st.subheader("📍 Carte de localisation des boîtes à grief")
-total_point = len(point_merged)
-st.markdown(f"**🆗 Nombre total installé : {total_point}**")
-st_folium(m, width=900, height=430)
-#====================================================================
-# --------------------- Graphiques principaux -----------------------
-#====================================================================
-st.subheader("📈 Analyse visuelle")
-
-colors_map_statut = {
-    "Achevé": "#00ff99",
-    "Grief non recevable": "#ffcc00",
-    "En cours": "#636efa",
-    "A traiter": "#ff6666"
+# Objets renvoyés par st_folium selon le mode (liste vide = carte statique)
+MAP_MODES = {
+    "Affichage seul": [],
+    "Clic = filtre par communauté": ["last_object_clicked", "last_object_clicked_count"],
 }
-#-------------------------------------------------------------------------------------
-# --- Répartition par type de dépôt ---
-type_counts = df_filtered["Type_depot"].value_counts().sort_values()
-fig_type = px.bar(
-    x=type_counts.index, y=type_counts.values, text=type_counts.values,
-    title="Répartition par type de dépôt", template=plotly_template, height=400
-)
-fig_type.update_traces(marker_line_width=0)
-fig_type.update_layout(
-    title_font=dict(color=font_color, size=18),
-    xaxis_title="Type de dépôt", yaxis_title="Nombre de griefs",
-    plot_bgcolor=graph_bg_color, paper_bgcolor=graph_bg_color,
-    font=dict(color=font_color)
-)
-
-# --- Avancement général ---
-fig_stat = px.pie(
-    df_filtered, names="Statut_traitement", title="Avancement général du traitement",
-    color="Statut_traitement", color_discrete_map=colors_map_statut,
-    template=plotly_template, height=400
-)
-fig_stat.update_traces(textinfo="percent+label", textposition="inside", marker_line_width=0)
-fig_stat.update_layout(
-    title_font=dict(color=font_color, size=18),
-    plot_bgcolor=graph_bg_color, paper_bgcolor=graph_bg_color,
-    font=dict(color=font_color)
-)
-
-if plein_ecran:
-    st.plotly_chart(fig_type, use_container_width=True)
-    st.plotly_chart(fig_stat, use_container_width=True)
-else:
-    c1, c2 = st.columns(2)
-    c1.plotly_chart(fig_type, use_container_width=True)
-    c2.plotly_chart(fig_stat, use_container_width=True)
-#-------------------------------------------------------------------------------------
-
-# --- Répartition par Type de population et Genre ---
-# --- Filtre d'affichage du genre ---
-genre_mode = st.radio(
-    "Affichage du genre (H/F):",
-    ["Tout genre", "Catégoriser"],
-    index=0,
-    horizontal=True
-)
 
-# --- Préparation des données ---
-df_pop_sexe = df_filtered.groupby(["Type", "Sexe"]).size().reset_index(name="Nombre")
+def couches_carte():
+    """(projet, GeoPackage des boîtes, limite, cube filtré) de chaque couche de la carte.
 
-# --- Cas 1 : fusionner tous les genres ---
-if genre_mode == "Tout genre":
-    df_plot = (
-        df_pop_sexe.groupby("Type")["Nombre"]
-        .sum()
-        .reset_index()
+    Source unique : une couche sans nom ; consolidation : une par projet retenu.
+    """
+    if PROJECT_COL not in df.columns:
+        return [(None, point_url, polygon_url, cube_filtered)]
+    return [
+        (p.name, p.boites, p.limite, cube_filtered.where(PROJECT_COL, [p.name]))
+        for p in refresher.store.projects
+        if p.boites and p.limite and p.name in projets_choisis
+    ]
+
+@st.fragment
+@section("Carte")
+def section_carte():
+    # --- Pile géographique importée au premier affichage de la carte ---
+    from streamlit_folium import st_folium
+    from griefpy.geo import MARKER_MODES, build_map, nearest_name, summary_points
+
+    # --- Téléchargement conditionnel (copie locale si inchangée ou hors ligne) ---
+    couches = []
+    with mesures.stage("Carte : GeoPackages"):
+        for nom, point_src, polygon_src, cube_couche in couches_carte():
+            gpkg_paths, empreintes = {}, []
+            for url in [point_src, polygon_src]:
+                try:
+                    # Copie locale tenue à jour par le fil de fond : pas d'appel réseau ici
+                    result = get_fetcher().fetch(url, max_age=float("inf"))
+                    gpkg_paths[url] = result.path
+                    empreintes.append(content_stamp(result))
+                except (RemoteFetchError, OSError):
+                    st.error(f"Erreur téléchargement : {url}")
+                    st.stop()
+
+            # --- Lecture, reprojection WGS84 et normalisation des noms (en cache) ---
+            # Un fichier local modifié sur place change d'empreinte : il est relu
+            geo_assets = get_geo_assets(gpkg_paths[point_src], gpkg_paths[polygon_src], tuple(empreintes))
+            couches.append((nom, geo_assets, cube_couche))
+    if not couches:
+        st.info("Aucun projet sélectionné n'a de GeoPackages dans le manifeste.")
+        return
+
+    with mesures.stage("Carte : résumé par communauté"):
+        # --- Résumé par communauté (cube découpé selon les filtres) joint aux points ---
+        points_couches = [summary_points(geo_assets.points, cube_couche) for _, geo_assets, cube_couche in couches]
+        point_merged = points_couches[0] if len(points_couches) == 1 else pd.concat(points_couches, ignore_index=True)
+
+    # --- En-tête de la carte ---
+    st.subheader("📍 Carte de localisation des boîtes à grief")
+    total_point = len(point_merged)
+    st.markdown(f"**🆗 Nombre total installé : {total_point}**")
+
+    # --- Mode de rendu des marqueurs (la section seule est relancée) ---
+    mode_marqueurs = st.radio("Rendu des marqueurs :", list(MARKER_MODES), horizontal=True, key="mode_marqueurs")
+
+    # --- Interaction : affichage seul (aucun retour serveur) ou clic = filtre croisé ---
+    mode_carte = st.radio("Interaction avec la carte :", list(MAP_MODES), horizontal=True, key="mode_carte")
+
+    # --- Création de la carte : une couche par projet (consolidation) ---
+    m = build_map(
+        [(nom, geo_assets, points) for (nom, geo_assets, _), points in zip(couches, points_couches)],
+        MARKER_MODES[mode_marqueurs], interactive=bool(MAP_MODES[mode_carte]),
     )
-    color_arg = None  # pas de coloration par genre
-    barmode = "relative"
-else:
-    df_plot = df_pop_sexe.copy()
-    color_arg = "Sexe"
-    barmode = "group"
-
-# --- Tri croissant selon total des griefs ---
-ordre_tri = (
-    df_pop_sexe.groupby("Type")["Nombre"]
-    .sum()
-    .sort_values()
-    .index.tolist()
-)
 
-# --- Création du graphique ---
-fig_pop_sexe = px.bar(
-    df_plot,
-    x="Type",
-    y="Nombre",
-    color=color_arg,
-    text="Nombre",
-    title="Répartition par type de population",
-    template=plotly_template,
-    height=400,
-    category_orders={"Type": ordre_tri},
-    barmode=barmode
-)
+    # --- Affichage Streamlit ---
+    # Déplacement et zoom ne renvoient rien : aucune relance côté serveur.
+    # En mode interactif, seul un clic sur un marqueur relance ce fragment.
+    with mesures.stage("Carte : HTML Folium", size=lambda: len(m.get_root().render())):
+        etat = st_folium(m, width=900, height=430, returned_objects=MAP_MODES[mode_carte], key="carte") or {}
+    clic = etat.get("last_object_clicked")
+    # Le composant renvoie le dernier clic à chaque relance : on ne traite que les nouveaux
+    if clic and etat.get("last_object_clicked_count") != st.session_state.get("clics_carte"):
+        st.session_state["clics_carte"] = etat.get("last_object_clicked_count")
+        # Les graphiques (onglet Analyse) seront filtrés à l'ouverture de l'onglet ;
+        # un clic loin de tout marqueur ne change pas le filtre
+        nom = nearest_name(point_merged, clic["lat"], clic["lng"])
+        if nom is not None:
+            st.session_state["communaute_carte"] = nom
+    selection = st.session_state.get("communaute_carte")
+    if selection:
+        c1, c2 = st.columns([3, 1])
+        c1.info(f"🔎 Graphiques filtrés sur la communauté : {selection}")
+        c2.button("Retirer le filtre", key="retirer_filtre_carte",
+                  on_click=lambda: st.session_state.update(communaute_carte=None))
+    elif MAP_MODES[mode_carte]:
+        st.caption("Cliquez sur une communauté pour filtrer les graphiques de l'onglet Analyse visuelle.")
 
-# Style du graphque
-fig_pop_sexe.update_traces(marker_line_width=0)
-fig_pop_sexe.update_layout(
-    title_font=dict(color=font_color, size=18),
-    xaxis_title="Type de population",
-    yaxis_title="Nombre de griefs",
-    plot_bgcolor=graph_bg_color,
-    paper_bgcolor=graph_bg_color,
-    font=dict(color=font_color),
-    legend_title_text = "Genre"
-)
-
-st.plotly_chart(fig_pop_sexe, use_container_width=True)    # affichage dans streamlit
-#-------------------------------------------------------------------------------------
-
-# --- Histogramme par nature ---
-st.subheader("🔵 Statut de traitement")
-ordre_nature = df_filtered["Nature_plainte"].value_counts().sort_values().index.tolist()
-fig_nature = px.histogram(
-    df_filtered, y="Nature_plainte", color="Statut_traitement", text_auto=True,
-    category_orders={"Nature_plainte": ordre_nature}, orientation="h",
-    title="Nature de griefs par traitement", template=plotly_template,
-    color_discrete_map=colors_map_statut, height=400
-)
-# Style du graphique
-fig_nature.update_traces(marker_line_width=0)
-fig_nature.update_layout(
-    title_font=dict(color=font_color, size=18),
-    xaxis_title="Nombre", yaxis_title="Nature de griefs",
-    plot_bgcolor=graph_bg_color, paper_bgcolor=graph_bg_color,
-    font=dict(color=font_color),
-    legend_title_text="Statut de traitement"
-)
-st.plotly_chart(fig_nature, use_container_width=True)
-#-------------------------------------------------------------------------------------
-
-st.subheader("🏘️ Répartition par communauté et genre")
 
-# --- 🔘 Bouton radio pour le mode d'affichage ---
-choix_type = st.radio(
-    "Afficher selon :",
-    ["Tout type", "Catégoriser"],
-    horizontal=True,
-    key="choix_type_comm"
-)
-
-# --- Nettoyage complet de la colonne 'Communaute' ---
-df_filtered["Communaute"] = (
-    df_filtered["Communaute"]
-    .astype(str)
-    .str.strip()
-    .str.lower()
-)
-
-# --- Vérification des colonnes requises ---
-if "Communaute" in df_filtered.columns and "Type_depot" in df_filtered.columns:
+#====================================================================
+# --------------------- Graphiques principaux -----------------------
+#====================================================================
+# --- Figures en cache : construites une fois par (données, filtres, paramètres) ---
+def figure(name, build, *params):
+    """Figure `name` aux couleurs du thème ; `build()` ne tourne qu'au premier appel."""
+    def build_mesure():
+        with mesures.stage(f"Figure : {name}"):
+            return build()
+    return get_figure_cache().get((filtres_key, communaute_carte, name) + params, build_mesure, figure_theme)
+
+def afficher_figure(fig, container=st):
+    """Sérialisation et envoi de la figure, mesurés sous le titre de la figure."""
+    titre = fig.layout.title.text or "sans titre"
+    with mesures.stage(f"Plotly : {titre}", size=lambda: len(fig.to_json())):
+        container.plotly_chart(fig, use_container_width=True)
+
+# --- Sections sans widget propre : recalculées avec les filtres ---
+@section("Type de dépôt / avancement")
+def section_repartition():
+    # --- Répartition par type de dépôt ---
+    def build_type():
+        type_counts = cube_graphiques.value_counts("Type_depot").sort_values()
+        fig = px.bar(
+            x=type_counts.index, y=type_counts.values, text=type_counts.values,
+            title="Répartition par type de dépôt", template=BASE_TEMPLATE, height=400
+        )
+        fig.update_traces(marker_line_width=0)
+        fig.update_layout(xaxis_title="Type de dépôt", yaxis_title="Nombre de griefs")
+        return fig
+    fig_type = figure("type_depot", build_type)
+
+    # --- Avancement général ---
+    def build_stat():
+        statut_counts = cube_graphiques.counts("Statut_traitement", appearance=True).reset_index(name="Nombre")
+        fig = px.pie(
+            statut_counts, names="Statut_traitement", values="Nombre", title="Avancement général du traitement",
+            color="Statut_traitement", color_discrete_map=STATUS_COLORS, template=BASE_TEMPLATE, height=400
+        )
+        fig.update_traces(textinfo="percent+label", textposition="inside", marker_line_width=0)
+        return fig
+    fig_stat = figure("avancement", build_stat)
 
-    # --- Mode "Tout type" : deux colonnes côte à côte ---
-    if choix_type == "Tout type":
+    if plein_ecran:
+        afficher_figure(fig_type)
+        afficher_figure(fig_stat)
+    else:
         c1, c2 = st.columns(2)
+        afficher_figure(fig_type, c1)
+        afficher_figure(fig_stat, c2)
+
+
+# --- Sections à widget propre : fragments relancés seuls ---
+@st.fragment
+@section("Population et genre")
+def section_population():
+    # --- Répartition par Type de population et Genre ---
+    # --- Filtre d'affichage du genre ---
+    genre_mode = st.radio(
+        "Affichage du genre (H/F):",
+        ["Tout genre", "Catégoriser"],
+        index=0,
+        horizontal=True
+    )
 
-        # Comptage correct des griefs par communauté
-        comm_counts = (
-            df_filtered.groupby("Communaute", dropna=False)
-            .size()
-            .reset_index(name="Nombre_de_griefs")
-            .sort_values(by="Nombre_de_griefs", ascending=True)
+    def build_pop_sexe():
+        # --- Préparation des données ---
+        df_pop_sexe = cube_graphiques.counts(["Type", "Sexe"]).reset_index(name="Nombre")
+
+        # --- Cas 1 : fusionner tous les genres ---
+        if genre_mode == "Tout genre":
+            df_plot = (
+                df_pop_sexe.groupby("Type")["Nombre"]
+                .sum()
+                .reset_index()
+            )
+            color_arg = None  # pas de coloration par genre
+            barmode = "relative"
+        else:
+            df_plot = df_pop_sexe.copy()
+            color_arg = "Sexe"
+            barmode = "group"
+
+        # --- Tri croissant selon total des griefs ---
+        ordre_tri = (
+            df_pop_sexe.groupby("Type")["Nombre"]
+            .sum()
+            .sort_values()
+            .index.tolist()
         )
 
-        fig_comm = px.bar(
-            comm_counts,
-            x="Communaute",
-            y="Nombre_de_griefs",
-            text="Nombre_de_griefs",
-            title="Nombre total de griefs par communauté",
-            template=plotly_template,
+        # --- Création du graphique ---
+        fig = px.bar(
+            df_plot,
+            x="Type",
+            y="Nombre",
+            color=color_arg,
+            text="Nombre",
+            title="Répartition par type de population",
+            template=BASE_TEMPLATE,
             height=400,
-            color_discrete_sequence=["#00ccff"]
+            category_orders={"Type": ordre_tri},
+            barmode=barmode
         )
 
-        fig_comm.update_traces(textposition="outside", cliponaxis=False, marker_line_width=0)
-        fig_comm.update_layout(
-            title_font=dict(color=font_color, size=18),
-            xaxis_title="Village / Localité",
+        # Style du graphque
+        fig.update_traces(marker_line_width=0)
+        fig.update_layout(
+            xaxis_title="Type de population",
             yaxis_title="Nombre de griefs",
-            plot_bgcolor=graph_bg_color,
-            paper_bgcolor=graph_bg_color,
-            font=dict(color=font_color),
-            showlegend=False,
+            legend_title_text = "Genre"
         )
+        return fig
 
-        c1.plotly_chart(fig_comm, use_container_width=True)
-
-        # --- Graphique pie ---
-        if "Sexe" in df_filtered.columns:
-            df_sexe = df_filtered[df_filtered["Sexe"].notna()]
-            if not df_sexe.empty:
-                fig_sexe = px.pie(
-                    df_sexe,
-                    names="Sexe",
-                    title="Répartition en genre",
-                    template=plotly_template,
-                    height=400
-                )
-                fig_sexe.update_traces(textinfo="percent+label", textposition="inside", marker_line_width=0)
-                fig_sexe.update_layout(
-                    title_font=dict(color=font_color, size=18),
-                    plot_bgcolor=graph_bg_color,
-                    paper_bgcolor=graph_bg_color,
-                    font=dict(color=font_color)
-                )
-                c2.plotly_chart(fig_sexe, use_container_width=True)
+    fig_pop_sexe = figure("population_genre", build_pop_sexe, genre_mode)
+    afficher_figure(fig_pop_sexe)    # affichage dans streamlit
 
-    # --- Mode "Catégoriser" : barre pleine largeur, pie en dessous ---
-    else:
-        comm_type_counts = (
-            df_filtered.groupby(["Communaute", "Type_depot"], dropna=False)
-            .size()
-            .reset_index(name="Nombre_de_griefs")
-        )
 
-        ordre_tri = (
-            comm_type_counts.groupby("Communaute")["Nombre_de_griefs"]
-            .sum()
-            .sort_values(ascending=True)
-            .index.tolist()
-        )
+@section("Nature par statut")
+def section_nature():
+    # --- Histogramme par nature ---
+    st.subheader("🔵 Statut de traitement")
+    fig_nature = figure("nature_statut", lambda: build_nature(cube_graphiques))
+    afficher_figure(fig_nature)
 
-        fig_comm = px.bar(
-            comm_type_counts,
-            x="Communaute",
-            y="Nombre_de_griefs",
-            color="Type_depot",
-            text="Nombre_de_griefs",
-            title="Griefs par communauté et type de dépôt",
-            template=plotly_template,
-            height=600,
-            category_orders={"Communaute": ordre_tri},
-            barmode="group"
-        )
 
-        fig_comm.update_traces(textposition="outside", cliponaxis=False, marker_line_width=0)
-        fig_comm.update_layout(
-            title_font=dict(color=font_color, size=18),
-            xaxis_title="Village / Localité",
-            yaxis_title="Nombre de griefs",
-            plot_bgcolor=graph_bg_color,
-            paper_bgcolor=graph_bg_color,
-            font=dict(color=font_color),
-            showlegend=True,
-            legend_title_text="Type de dépôt"
-        )
+@st.fragment
+@section("Communautés")
+def section_communautes():
+    st.subheader("🏘️ Répartition par communauté et genre")
 
-        st.plotly_chart(fig_comm, use_container_width=True)
-
-        # --- Graphique pie en dessous ---
-        if "Sexe" in df_filtered.columns:
-            df_sexe = df_filtered[df_filtered["Sexe"].notna()]
-            if not df_sexe.empty:
-                fig_sexe = px.pie(
-                    df_sexe,
-                    names="Sexe",
-                    title="Répartition en genre",
-                    template=plotly_template,
-                    height=350
-                )
-                fig_sexe.update_traces(textinfo="percent+label", textposition="inside", marker_line_width=0)
-                fig_sexe.update_layout(
-                    title_font=dict(color=font_color, size=18),
-                    plot_bgcolor=graph_bg_color,
-                    paper_bgcolor=graph_bg_color,
-                    font=dict(color=font_color)
-                )
-                st.plotly_chart(fig_sexe, use_container_width=True)
+    # --- 🔘 Bouton radio pour le mode d'affichage ---
+    choix_type = st.radio(
+        "Afficher selon :",
+        ["Tout type", "Catégoriser"],
+        horizontal=True,
+        key="choix_type_comm"
+    )
 
-else:
-    st.warning("⚠️ Les colonnes 'Communaute' et 'Type_depot' doivent exister dans le jeu de données.")
-#-------------------------------------------------------------------------------------
-
-# --- Nature par Genre ---
-st.subheader("👥 Nature des griefs par genre")
-df_cat_sexe = df_filtered.groupby(["Nature_plainte","Sexe"]).size().reset_index(name="Nombre")
-ordre_nature_tri = df_cat_sexe.groupby("Nature_plainte")["Nombre"].sum().sort_values().index.tolist()
-fig_cat_sexe = px.bar(
-    df_cat_sexe, y="Nature_plainte", x="Nombre", color="Sexe",
-    category_orders={"Nature_plainte": ordre_nature_tri}, orientation="h",
-    template=plotly_template, text="Nombre", height=400
-)
+    # --- Graphique pie (commun aux deux modes, seule la hauteur change) ---
+    def build_sexe(height):
+        df_sexe = cube_graphiques.counts("Sexe", appearance=True).reset_index(name="Nombre")
+        fig = px.pie(
+            df_sexe,
+            names="Sexe",
+            values="Nombre",
+            title="Répartition en genre",
+            template=BASE_TEMPLATE,
+            height=height
+        )
+        fig.update_traces(textinfo="percent+label", textposition="inside", marker_line_width=0)
+        return fig
+
+    # --- Vérification des colonnes requises ---
+    if "Communaute" in df.columns and "Type_depot" in df.columns:
+        sexe_vide = cube_graphiques.counts("Sexe").empty
+
+        # --- Mode "Tout type" : deux colonnes côte à côte ---
+        if choix_type == "Tout type":
+            c1, c2 = st.columns(2)
+            afficher_figure(figure("communautes", lambda: build_communautes(cube_graphiques)), c1)
+
+            # --- Graphique pie ---
+            if "Sexe" in df.columns and not sexe_vide:
+                fig_sexe = figure("genre", lambda: build_sexe(400), 400)
+                afficher_figure(fig_sexe, c2)
+
+        # --- Mode "Catégoriser" : barre pleine largeur, pie en dessous ---
+        else:
+            def build_comm_type():
+                comm_type_counts = (
+                    cube_graphiques.counts(["Communaute", "Type_depot"], dropna=False)
+                    .reset_index(name="Nombre_de_griefs")
+                )
 
-# Style du graphique
-fig_cat_sexe.update_traces(marker_line_width=0)
-fig_cat_sexe.update_layout(
-    title="Nature des griefs par sexe",
-    title_font=dict(color=font_color, size=18),
-    xaxis_title="Nombre", yaxis_title="Nature de griefs",
-    plot_bgcolor=graph_bg_color, paper_bgcolor=graph_bg_color,
-    font=dict(color=font_color),
-    legend_title_text = "Genre"
-)
-st.plotly_chart(fig_cat_sexe, use_container_width=True)    # affichage dans srtreamlit
-#-------------------------------------------------------------------------------------
-
-# --- Évolution temporelle ---
-st.subheader("📈 Évolution temporelle des griefs")
-top_n = st.slider("Top N natures :", 3, 10, 5)
-trimestres = sorted(df_filtered["Trimestre"].unique())
-trimestre_sel = st.selectbox("Filtrer par trimestre :", ["Tous"] + trimestres)
-df_trim = df_filtered if trimestre_sel == "Tous" else df_filtered[df_filtered["Trimestre"] == trimestre_sel]
-top_natures = df_trim["Nature_plainte"].value_counts().nlargest(top_n).index
-df_line = df_trim[df_trim["Nature_plainte"].isin(top_natures)].groupby(["Mois","Nature_plainte"]).size().reset_index(name="Nombre")
-fig_line = px.line(df_line, x="Mois", y="Nombre", color="Nature_plainte", markers=True,
-    title=f"Top {top_n} évolution", template=plotly_template, height=400)
-fig_line.update_layout(
-    title_font=dict(color=font_color, size=18),
-    legend_title_text="Nature de griefs",
-    plot_bgcolor=graph_bg_color, paper_bgcolor=graph_bg_color,
-    font=dict(color=font_color)
-)
+                ordre_tri = (
+                    comm_type_counts.groupby("Communaute")["Nombre_de_griefs"]
+                    .sum()
+                    .sort_values(ascending=True)
+                    .index.tolist()
+                )
 
-# Style du graphique
-fig_line.update_xaxes(dtick="M1", tickformat="%b", tickangle=-45)
-st.plotly_chart(fig_line, use_container_width=True)    # affichage dans srtreamlit
-#-------------------------------------------------------------------------------------
+                fig = px.bar(
+                    comm_type_counts,
+                    x="Communaute",
+                    y="Nombre_de_griefs",
+                    color="Type_depot",
+                    text="Nombre_de_griefs",
+                    title="Griefs par communauté et type de dépôt",
+                    template=BASE_TEMPLATE,
+                    height=600,
+                    category_orders={"Communaute": ordre_tri},
+                    barmode="group"
+                )
 
-# --- Classement par nature ---
-if "Classement" in df_filtered.columns:
-    st.subheader("🏁 Griefs classés par nature")
+                fig.update_traces(textposition="outside", cliponaxis=False, marker_line_width=0)
+                fig.update_layout(
+                    xaxis_title="Village / Localité",
+                    yaxis_title="Nombre de griefs",
+                    showlegend=True,
+                    legend_title_text="Type de dépôt"
+                )
+                return fig
 
-    # Filtrer uniquement les griefs classés
-    df_classe = df_filtered[df_filtered["Classement"].astype(str).str.lower() == "oui"]
+            afficher_figure(figure("communautes_type", build_comm_type))
 
-    if not df_classe.empty:
-        # Compter les griefs par nature
-        nature_counts = df_classe["Nature_plainte"].value_counts().sort_values()
+            # --- Graphique pie en dessous ---
+            if "Sexe" in df.columns and not sexe_vide:
+                fig_sexe = figure("genre", lambda: build_sexe(350), 350)
+                afficher_figure(fig_sexe)
 
-        fig_classement = px.bar(
-            x=nature_counts.index,
-            y=nature_counts.values,
-            text=nature_counts.values,
-            title="Répartition des griefs classés par nature",
-            template=plotly_template,
-            height=400,
-            color_discrete_sequence=["#00ccff"]
+    else:
+        st.warning("⚠️ Les colonnes 'Communaute' et 'Type_depot' doivent exister dans le jeu de données.")
+
+
+@section("Nature par genre")
+def section_nature_genre():
+    # --- Nature par Genre ---
+    st.subheader("👥 Nature des griefs par genre")
+    def build_cat_sexe():
+        df_cat_sexe = cube_graphiques.counts(["Nature_plainte","Sexe"]).reset_index(name="Nombre")
+        ordre_nature_tri = df_cat_sexe.groupby("Nature_plainte")["Nombre"].sum().sort_values().index.tolist()
+        fig = px.bar(
+            df_cat_sexe, y="Nature_plainte", x="Nombre", color="Sexe",
+            category_orders={"Nature_plainte": ordre_nature_tri}, orientation="h",
+            text="Nombre", template=BASE_TEMPLATE, height=400
         )
 
         # Style du graphique
-        fig_classement.update_traces(marker_line_width=0)
-        fig_classement.update_layout(
-            title_font=dict(color=font_color, size=18),
-            xaxis_title="Nature de grief",
-            yaxis_title="Nombre de griefs classés",
-            plot_bgcolor=graph_bg_color,
-            paper_bgcolor=graph_bg_color,
-            font=dict(color=font_color)
+        fig.update_traces(marker_line_width=0)
+        fig.update_layout(
+            title="Nature des griefs par sexe",
+            xaxis_title="Nombre", yaxis_title="Nature de griefs",
+            legend_title_text = "Genre"
         )
+        return fig
+    fig_cat_sexe = figure("nature_genre", build_cat_sexe)
+    afficher_figure(fig_cat_sexe)    # affichage dans srtreamlit
+
+
+@st.fragment
+@section("Évolution, classement et durée")
+def section_evolution():
+    # --- Évolution temporelle ---
+    st.subheader("📈 Évolution temporelle des griefs")
+    top_n = st.slider("Top N natures :", 3, 10, 5)
+    trimestres = sorted(cube_graphiques.cells["Trimestre"].unique())
+    trimestre_sel = st.selectbox("Filtrer par trimestre :", ["Tous"] + trimestres)
+    cube_trim = cube_graphiques if trimestre_sel == "Tous" else cube_graphiques.slice(trimestre=trimestre_sel)
+    durees_trim = durees_graphiques if trimestre_sel == "Tous" else durees_graphiques.slice(trimestre=trimestre_sel)
+
+    fig_line = figure("evolution", lambda: build_evolution(cube_trim, top_n), top_n, trimestre_sel)
+    afficher_figure(fig_line)    # affichage dans srtreamlit
+    #-------------------------------------------------------------------------------------
+
+    # --- Classement par nature ---
+    if "Classement" in df.columns:
+        st.subheader("🏁 Griefs classés par nature")
+
+        # Filtrer uniquement les griefs classés
+        classes = cube_graphiques.cells["Classement"].astype(str).str.lower() == "oui"
+        cube_classe = AggregateCube(cube_graphiques.cells[classes])
+
+        if cube_classe.total:
+            def build_classement():
+                # Compter les griefs par nature
+                nature_counts = cube_classe.value_counts("Nature_plainte").sort_values()
+
+                fig = px.bar(
+                    x=nature_counts.index,
+                    y=nature_counts.values,
+                    text=nature_counts.values,
+                    title="Répartition des griefs classés par nature",
+                    template=BASE_TEMPLATE,
+                    height=400,
+                    color_discrete_sequence=["#00ccff"]
+                )
 
-        st.plotly_chart(fig_classement, use_container_width=True)
+                # Style du graphique
+                fig.update_traces(marker_line_width=0)
+                fig.update_layout(
+                    xaxis_title="Nature de grief",
+                    yaxis_title="Nombre de griefs classés"
+                )
+                return fig
+            fig_classement = figure("classement", build_classement)
+
+            afficher_figure(fig_classement)
+
+        else:
+            st.info("ℹ️ Aucun grief classé ('Classement = Oui') trouvé dans les données.")
+    #-------------------------------------------------------------------------------------
+
+    # --- Durée de traitement : quantiles et dépassement du délai cible ---
+    st.subheader("⌛ Durée de traitement")
+    if "Nb_jour" in df.columns and durees_trim.total:
+        sla = st.number_input("Délai cible (jours) :", min_value=1, value=SLA_DAYS, step=1)
+        q = durees_trim.quantiles()
+        st.caption(
+            f"p50 : {q['p50']:.0f} j · p90 : {q['p90']:.0f} j · p99 : {q['p99']:.0f} j · "
+            f"au-delà de {sla} j : {durees_trim.breach_rate(sla):.0%} des griefs"
+        )
+        fig_duree = figure("duree", lambda: build_duree(durees_trim, sla), trimestre_sel, sla)
+        afficher_figure(fig_duree)    # affichage dans srtreamlit
 
-    else:
-        st.info("ℹ️ Aucun grief classé ('Classement = Oui') trouvé dans les données.")
-#-------------------------------------------------------------------------------------
-
-# --- Durée moyenne ---
-st.subheader("⌛ Durée de traitement")
-if "Nb_jour" in df_trim.columns:
-    df_duree = df_trim.groupby("Nature_plainte")["Nb_jour"].mean().round().reset_index().sort_values("Nb_jour")
-    fig_duree = px.bar(df_duree, x="Nature_plainte", y="Nb_jour", text_auto=".1f",
-        title="Durée moyenne de traitement par nature", template=plotly_template, height=400)
-    fig_duree.update_traces(marker_line_width=0)
-    
-    # Style du graphique
-    fig_duree.update_layout(
-        title_font=dict(color=font_color, size=18),
-        xaxis_title="Nature de griefs", yaxis_title="Durée (jours)",
-        plot_bgcolor=graph_bg_color, paper_bgcolor=graph_bg_color,
-        font=dict(color=font_color)
+#====================================================================
+# ------------------------ Tableau final ---------------------------
+#====================================================================
+@st.fragment
+@section("Tableau")
+def section_tableau():
+    st.subheader("📋 Aperçu des données")
+    table_index = get_table_index(df.attrs.get("version"), df)
+
+    # --- Colonnes, recherche et tri (évalués sur le serveur) ---
+    colonnes = st.multiselect("Colonnes :", list(df.columns), default=list(df.columns), key="table_colonnes")
+    colonnes = colonnes or list(df.columns)
+    col_recherche, col_tri, col_ordre = st.columns([3, 2, 1])
+    recherche = col_recherche.text_input("🔎 Rechercher :", key="table_recherche")
+    tri = col_tri.selectbox("Trier par :", ["(aucun)"] + colonnes, key="table_tri")
+    decroissant = col_ordre.toggle("Décroissant", key="table_decroissant")
+
+    with mesures.stage("Tableau : recherche et tri"):
+        rows = table_index.search(rows_filtered, recherche, colonnes)
+        if tri != "(aucun)":
+            rows = table_index.sort(rows, tri, decroissant)
+
+    # --- Pagination : seule la page affichée est envoyée au navigateur ---
+    col_taille, col_page = st.columns(2)
+    taille = col_taille.selectbox("Lignes par page :", PAGE_SIZES, index=1, key="table_taille")
+    n_pages = max(1, -(-len(rows) // taille))
+    numero = col_page.number_input(f"Page (sur {n_pages}) :", min_value=1, max_value=n_pages, value=1, key="table_page")
+    with mesures.stage("Tableau : page", size=lambda: memory_usage(page.frame)):
+        page = table_index.page(rows, numero, taille, colonnes)
+    fin = page.start + len(page.frame)
+    st.caption(f"Lignes {page.start + 1 if page.total else 0}–{fin} sur {page.total}")
+    st.dataframe(page.frame, use_container_width=True)
+
+    # --- Export des lignes retenues, construit en mémoire au clic (pas à chaque relance) ---
+    col_csv, col_parquet = st.columns(2)
+    col_csv.download_button(
+        "⬇️ Exporter en CSV", data=lambda: export_csv(df, rows, colonnes),
+        file_name="griefs.csv", mime="text/csv", key="table_csv"
+    )
+    col_parquet.download_button(
+        "⬇️ Exporter en Parquet", data=lambda: export_parquet(df, rows, colonnes),
+        file_name="griefs.parquet", mime="application/vnd.apache.parquet", key="table_parquet"
     )
-    st.plotly_chart(fig_duree, use_container_width=True)    # affichage dans srtreamlit
+
 
 #====================================================================
-# ------------------------ Tableau final ---------------------------
+# ---------------- Onglets : exécution à la demande -----------------
 #====================================================================
-st.subheader("📋 Aperçu des données")
-st.dataframe(df_filtered, use_container_width=True)
+# Seul l'onglet ouvert est calculé ; changer d'onglet relance le script
+onglet_carte, onglet_graphiques, onglet_donnees = st.tabs(
+    ["📍 Carte", "📈 Analyse visuelle", "📋 Données"],
+    key="onglet", on_change="rerun"
+)
+mesures.add("Préambule", record(section_timings(), "Préambule (chargement, filtres, indicateurs)", t_debut))
+
+if onglet_carte.open:
+    with onglet_carte:
+        section_carte()
+
+if onglet_graphiques.open:
+    # Plotly Express importé à la première ouverture de l'onglet (global des sections)
+    import plotly.express as px
+    with onglet_graphiques:
+        st.subheader("📈 Analyse visuelle")
+        if communaute_carte:
+            st.info(f"🔎 Filtre de la carte : communauté {communaute_carte}")
+        section_repartition()
+        section_population()
+        section_nature()
+        section_communautes()
+        section_nature_genre()
+        section_evolution()
+
+if onglet_donnees.open:
+    with onglet_donnees:
+        section_tableau()
+
+# --- Dernières durées connues (sections relancées seules incluses) ---
+if afficher_temps:
+    with st.sidebar.expander("⏱️ Durées des sections", expanded=True):
+        for name, mesure in section_timings().items():
+            st.caption(f"{name} : {mesure['ms']:.0f} ms")
+        memoire = df.attrs.get("memoire")
+        if memoire:
+            st.caption(f"Mémoire du registre : {memoire.after / 2**20:.1f} Mo (brut {memoire.before / 2**20:.1f} Mo)")
+
+    # --- Détail par étape et export pour analyse hors ligne ---
+    with st.sidebar.expander("🛠️ Instrumentation des étapes"):
+        for mesure in mesures.latest():
+            taille = f" · {mesure['bytes'] / 1024:.0f} Ko" if mesure["bytes"] is not None else ""
+            st.caption(f"{mesure['stage']} : {mesure['ms']:.1f} ms{taille}")
+        st.download_button(
+            "⬇️ Mesures (JSON lines)", data=lambda: to_jsonl(list(mesures.records)),
+            file_name="griefpy_mesures.jsonl", mime="application/jsonl", key="export_mesures_jsonl"
+        )
+        st.download_button(
+            "⬇️ Mesures (Prometheus)", data=lambda: to_prometheus(list(mesures.records)),
+            file_name="griefpy_mesures.prom", mime="text/plain", key="export_mesures_prom"
+        )
@@ -0,0 +1,3 @@
+#*********************** Projet GriefPy ***************************
+#          Mesures de performance du dashboard (hors ligne)
+#******************************************************************
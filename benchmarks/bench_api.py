@@ -0,0 +1,92 @@
+#*********************** Projet GriefPy ***************************
+#   API JSON : débit et latences, réponses calculées / mémorisées / 304
+#******************************************************************
+"""Usage : python benchmarks/bench_api.py [n_lignes] [n_clients] [n_requetes]
+
+Lance l'API sur un port libre et `n_clients` clients HTTP (connexions
+persistantes) qui demandent `/api/agregats` avec des filtres tirés parmi
+les combinaisons de la barre latérale :
+
+- « calcul » : cache vidé avant chaque requête (découpe du cube + JSON) ;
+- « mémorisé » : réponses servies depuis le cache (version, route, filtres) ;
+- « 304 » : clients qui renvoient l'ETag reçu (`If-None-Match`).
+"""
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register
+from griefpy.api import make_server
+from griefpy.incremental import IncrementalStore
+
+
+def combinaisons(table):
+    statuts = sorted(table["Statut_traitement"].dropna().unique())
+    types = sorted(table["Type_depot"].dropna().unique())
+    return [
+        {"annee": int(a), "statut": statuts[:k], "type": types[:j]}
+        for a in sorted(table["Année"].unique()) for k in (2, len(statuts)) for j in (1, len(types))
+    ]
+
+
+def client(port, filtres, n, mode, service, latences, seed):
+    """Client léger (http.client, connexion persistante) : le client pèse peu sur le CPU partagé."""
+    rng = np.random.default_rng(seed)
+    connexion = http.client.HTTPConnection("127.0.0.1", port)
+    chemins = [f"/api/agregats?{urlencode(f, doseq=True)}" for f in filtres]
+    etags = {}
+    for _ in range(n):
+        i = int(rng.integers(len(filtres)))
+        headers = {"If-None-Match": etags[i]} if mode == "304" and i in etags else {}
+        if mode == "calcul":
+            service._entries.clear()
+        t0 = time.perf_counter()
+        connexion.request("GET", chemins[i], headers=headers)
+        reponse = connexion.getresponse()
+        reponse.read()
+        latences.append(time.perf_counter() - t0)
+        etags[i] = reponse.getheader("ETag")
+    connexion.close()
+
+
+def main(n_rows, n_clients, n_requetes):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = IncrementalStore(tmp)
+        store.update(make_register(n_rows), "v1")
+        server = make_server(store, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        filtres = combinaisons(store.snapshot.frame)
+
+        print(f"Registre synthétique : {n_rows} lignes, {n_clients} clients, {os.cpu_count()} CPU")
+        print(f"{'mode':<10} | {'req/s':>7} | {'p50 (ms)':>8} | {'p95 (ms)':>8}")
+        for mode in ("calcul", "mémorisé", "304"):
+            # Cache chaud (et ETag connus) avant les modes mémorisé / 304
+            client(port, filtres, len(filtres) * 3, mode, server.service, [], 0)
+            latences = []
+            fils = [
+                threading.Thread(target=client, args=(port, filtres, n_requetes // n_clients, mode,
+                                                      server.service, latences, i + 1))
+                for i in range(n_clients)
+            ]
+            t0 = time.perf_counter()
+            for fil in fils:
+                fil.start()
+            for fil in fils:
+                fil.join()
+            duree = time.perf_counter() - t0
+            p50, p95 = np.percentile(latences, [50, 95]) * 1000
+            print(f"{mode:<10} | {len(latences) / duree:>7.0f} | {p50:>8.1f} | {p95:>8.1f}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [50_000, 8, 2000][len(args):]))
@@ -0,0 +1,75 @@
+#*********************** Projet GriefPy ***************************
+#   Dates de réception : inférence pandas vs formats explicites
+#******************************************************************
+"""Usage : python benchmarks/bench_calendar.py [n_lignes]
+
+Colonne `Date_reception` telle que la lit openpyxl dans un classeur saisi à
+la main : vraies dates, dates en texte (jour en premier), numéros de série.
+Compare l'ancienne préparation (`pd.to_datetime(dayfirst=True)` puis
+périodes en texte) à `prepare_calendar`, temps et lignes perdues (NaT).
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register
+from griefpy.calendrier import prepare_calendar
+
+
+def mixed_dates(n_rows, seed=0):
+    """Mélange 70 % dates, 20 % textes "jj/mm/aaaa", 8 % séries Excel, 2 % vides/illisibles."""
+    rng = np.random.default_rng(seed)
+    dates = make_register(n_rows, seed=seed)["Date_reception"]
+    valeurs = dates.astype(object).to_numpy(copy=True)
+    tirage = rng.random(n_rows)
+    textes = tirage < 0.2
+    valeurs[textes] = dates[textes].dt.strftime("%d/%m/%Y").to_numpy()
+    series = (tirage >= 0.2) & (tirage < 0.28)
+    valeurs[series] = ((dates[series] - pd.Timestamp("1899-12-30")).dt.days).to_numpy()
+    valeurs[(tirage >= 0.28) & (tirage < 0.29)] = None
+    valeurs[(tirage >= 0.29) & (tirage < 0.30)] = "à préciser"
+    return pd.DataFrame({"Date_reception": pd.Series(valeurs, dtype=object)})
+
+
+def ancien(df):
+    """Préparation d'origine du dashboard."""
+    df = df.copy()
+    df["Date_reception"] = pd.to_datetime(df["Date_reception"], errors="coerce", dayfirst=True)
+    df = df.dropna(subset=["Date_reception"])
+    df["Année"] = df["Date_reception"].dt.year
+    df["Trimestre"] = df["Date_reception"].dt.to_period("Q").astype(str)
+    df["Mois"] = df["Date_reception"].dt.to_period("M").dt.to_timestamp()
+    return df
+
+
+def chrono(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+def main(n_rows):
+    df = mixed_dates(n_rows)
+    print(f"Colonne mixte : {n_rows} lignes")
+    for nom, func in [("to_datetime + périodes texte", ancien), ("prepare_calendar", lambda d: prepare_calendar(d.copy()))]:
+        try:
+            t, out = chrono(func, df)
+        except (ValueError, TypeError) as e:
+            print(f"{nom:<30} | échec : {e}")
+            continue
+        memoire = out[["Année", "Trimestre", "Mois"]].memory_usage(deep=True, index=False).sum() / 2**20
+        # Numéros de série lus comme des microsecondes depuis 1970
+        aberrantes = int((out["Année"] < 1990).sum())
+        print(
+            f"{nom:<30} | {t:>7.2f} s | lignes gardées {len(out):>8} | "
+            f"dates < 1990 {aberrantes:>7} | calendrier {memoire:>6.1f} Mo"
+        )
+    print(prepare_calendar(df.copy()).attrs["dates"])
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
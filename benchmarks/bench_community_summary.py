@@ -0,0 +1,62 @@
+#*********************** Projet GriefPy ***************************
+#   Résumé par communauté : agrégations lambda vs cube de comptage
+#******************************************************************
+"""Usage : python benchmarks/bench_community_summary.py [n_lignes ...]"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register, with_calendar
+from griefpy.aggregation import AggregateCube, community_summary
+
+
+def legacy_summary(df, annee, types, statuts):
+    """Ancien calcul de Python_VERIF.py (une lambda par groupe et par statut)."""
+    df_2 = df[df["Type_depot"].isin(types) & df["Statut_traitement"].isin(statuts)].copy()
+    if annee:
+        df_2 = df_2[df_2["Année"] == annee]
+    df_2["Communaute"] = df_2["Communaute"].astype(str).str.strip().str.lower()
+    df_2["Statut_traitement"] = df_2["Statut_traitement"].replace(["nan", "NaN", "None", ""], pd.NA)
+    summary = df_2.groupby("Communaute").agg(
+        Total_griefs=pd.NamedAgg(column="Statut_traitement", aggfunc="count"),
+        Acheve=pd.NamedAgg(column="Statut_traitement", aggfunc=lambda x: (x == "Achevé").sum()),
+        En_cours=pd.NamedAgg(column="Statut_traitement", aggfunc=lambda x: (x == "En cours").sum()),
+        Perdu_de_vue=pd.NamedAgg(column="Statut_traitement", aggfunc=lambda x: (x == "Perdu de vue").sum()),
+        A_traiter=pd.NamedAgg(column="Statut_traitement", aggfunc=lambda x: (x == "A traiter").sum()),
+    ).reset_index()
+    cols_stats = ["Total_griefs", "Acheve", "En_cours", "Perdu_de_vue", "A_traiter"]
+    summary[cols_stats] = summary[cols_stats].apply(pd.to_numeric, errors="coerce").fillna(0).astype(int)
+    return summary
+
+
+def chrono(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(tailles):
+    print(f"{'lignes':>9} | {'cellules':>9} | {'lambda (s)':>10} | {'cube (s)':>9} | {'découpe (s)':>11} | gain")
+    for n in tailles:
+        df = with_calendar(make_register(n, n_communities=200))
+        annee = int(df["Année"].max())
+        types = df["Type_depot"].unique().tolist()
+        statuts = df["Statut_traitement"].unique().tolist()
+
+        t_legacy, attendu = chrono(legacy_summary, df, annee, types, statuts)
+        t_cube, cube = chrono(AggregateCube.from_frame, df, repeat=1)
+        t_slice, obtenu = chrono(lambda: community_summary(cube.slice(annee, types, statuts)))
+        # Communautés en catégories côté cube, en texte côté lambda : mêmes valeurs
+        pd.testing.assert_frame_equal(obtenu, attendu, check_dtype=False, check_categorical=False)
+
+        print(f"{n:>9} | {len(cube.cells):>9} | {t_legacy:>10.4f} | {t_cube:>9.4f} | {t_slice:>11.4f} | x{t_legacy / t_slice:.0f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,71 @@
+#*********************** Projet GriefPy ***************************
+#   Consolidation : projets chargés en série vs en parallèle
+#******************************************************************
+"""Usage : python benchmarks/bench_consolidation.py [n_projets] [n_lignes_par_projet]
+
+Écrit un classeur synthétique par projet et un manifeste, puis mesure :
+
+- le premier chargement (aucun état sur disque), projets un par un
+  (`max_workers=1`) puis en parallèle ; l'analyse des classeurs ne se
+  parallélise que sur plusieurs cœurs (pool de processus) ;
+- la relance d'un processus (états relus sur disque, classeurs inchangés) ;
+- un rafraîchissement où un seul classeur a changé : seul ce projet est
+  relu, les autres gardent leur état.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register
+from griefpy.consolidation import MAX_WORKERS, ConsolidatedStore
+from griefpy.remote import RemoteFetcher
+
+
+def chrono(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+def ecrire_manifeste(workdir, n_projets, n_rows):
+    projets = []
+    for i in range(n_projets):
+        nom = f"Projet_{i:02d}"
+        make_register(n_rows, seed=i).to_excel(os.path.join(workdir, f"{nom}.xlsx"), index=False)
+        projets.append({"nom": nom, "registre": f"{nom}.xlsx"})
+    manifeste = os.path.join(workdir, "manifeste.json")
+    with open(manifeste, "w", encoding="utf-8") as f:
+        json.dump({"projets": projets}, f)
+    return manifeste
+
+
+def main(n_projets, n_rows):
+    with tempfile.TemporaryDirectory() as workdir:
+        manifeste = ecrire_manifeste(workdir, n_projets, n_rows)
+        fetcher = RemoteFetcher(os.path.join(workdir, "copies"))
+        store = lambda nom, workers: ConsolidatedStore(fetcher, os.path.join(workdir, nom), max_workers=workers)
+
+        t_serie, _ = chrono(store("serie", 1).refresh, manifeste)
+        parallele = store("parallele", MAX_WORKERS)
+        t_parallele, stats = chrono(parallele.refresh, manifeste)
+        t_relance, _ = chrono(store("parallele", MAX_WORKERS).refresh, manifeste)
+
+        # Un seul classeur modifié : quelques griefs supprimés
+        raw = make_register(n_rows, seed=0).iloc[:-10]
+        raw.to_excel(os.path.join(workdir, "Projet_00.xlsx"), index=False)
+        t_un, stats_un = chrono(parallele.refresh, manifeste)
+
+    processus = min(MAX_WORKERS, n_projets, os.cpu_count() or 1)
+    print(f"{n_projets} projets x {n_rows} lignes = {stats.rows} lignes fusionnées, {os.cpu_count()} cœur(s)")
+    print(f"{'premier chargement, en série':<40} | {t_serie:>8.2f} s")
+    print(f"{f'premier chargement, {processus} processus':<40} | {t_parallele:>8.2f} s | x{t_serie / t_parallele:.1f}")
+    print(f"{'relance (états sur disque)':<40} | {t_relance:>8.2f} s")
+    print(f"{'un classeur modifié':<40} | {t_un:>8.2f} s | {stats_un.deleted} suppression(s)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [6, 20_000][len(args):]))
@@ -0,0 +1,80 @@
+#*********************** Projet GriefPy ***************************
+#   Durées : quantiles exacts sur les lignes vs histogrammes fusionnés
+#******************************************************************
+"""Usage : python benchmarks/bench_durees.py [n_lignes ...]
+
+- Lignes : filtres appliqués à la table puis `groupby().quantile()` et
+  taux de dépassement, à chaque combinaison de filtres.
+- Histogrammes : découpe des histogrammes de `DurationSketches` (mêmes
+  dimensions que le cube) puis fusion par nature.
+
+Mesure aussi la construction des histogrammes et leur mise à jour par delta
+quand 50 griefs sont ajoutés.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_incremental import next_version
+from benchmarks.synthetic import make_register
+from griefpy.durees import SLA_DAYS, DurationSketches
+from griefpy.incremental import ROW_KEY, IncrementalStore
+
+
+def chrono(func, *args, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.perf_counter() - t0) / repeat, result
+
+
+def combinaisons(table):
+    """Filtres (année, trimestre, statuts) parcourus par un utilisateur."""
+    statuts = [None, ["Achevé"], ["En cours", "A traiter"]]
+    return [(a, t, s) for a in sorted(table["Année"].unique()) for t in (None, f"{a}Q1", f"{a}Q3") for s in statuts]
+
+
+def par_lignes(table, filtres):
+    for annee, trimestre, statuts in filtres:
+        lignes = table[table["Année"] == annee]
+        if trimestre is not None:
+            lignes = lignes[lignes["Trimestre"] == trimestre]
+        if statuts is not None:
+            lignes = lignes[lignes["Statut_traitement"].isin(statuts)]
+        groupes = lignes.groupby("Nature_plainte", observed=True)["Nb_jour"]
+        groupes.quantile([0.5, 0.9, 0.99], interpolation="lower")
+        groupes.apply(lambda d: (d > SLA_DAYS).mean())
+
+
+def par_histogrammes(durees, filtres):
+    for annee, trimestre, statuts in filtres:
+        durees.slice(annee, statuts=statuts, trimestre=trimestre).duration_stats("Nature_plainte")
+
+
+def main(tailles):
+    print(f"{'lignes':>9} | {'cellules':>8} | {'lignes (ms/filtre)':>18} | {'histog. (ms/filtre)':>19} | "
+          f"{'construction (s)':>16} | {'delta (ms)':>10}")
+    for n in tailles:
+        raw = make_register(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = IncrementalStore(tmp)
+            store.update(raw, "v1")
+            table, durees = store.table, store.durees
+            filtres = combinaisons(table)
+            t_lignes, _ = chrono(par_lignes, table, filtres)
+            t_hist, _ = chrono(par_histogrammes, durees, filtres)
+            t_build, _ = chrono(DurationSketches.from_frame, table)
+
+            # Delta : les lignes ajoutées par la version suivante
+            anciennes = set(table[ROW_KEY])
+            store.update(next_version(raw, n_modified=0), "v2")
+            ajoutees = store.table[~store.table[ROW_KEY].isin(anciennes)]
+            t_delta, _ = chrono(durees.apply_delta, ajoutees, ajoutees.iloc[:0], repeat=5)
+        print(f"{n:>9} | {len(durees.cells):>8} | {t_lignes / len(filtres) * 1000:>18.1f} | "
+              f"{t_hist / len(filtres) * 1000:>19.1f} | {t_build:>16.2f} | {t_delta * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,121 @@
+#*********************** Projet GriefPy ***************************
+#   Démarrage à froid : sources récupérées en série vs en parallèle
+#******************************************************************
+"""Usage : python benchmarks/bench_fetch.py [n_lignes] [debit_mo_s]
+
+Sert le classeur et les deux GeoPackages depuis un serveur HTTP local dont
+le débit est limité par connexion (`debit_mo_s`), comme un lien Dropbox.
+
+- Avant : classeur puis GeoPackages téléchargés l'un après l'autre, puis
+  couches lues à l'ouverture de la carte.
+- Après : `BackgroundRefresher.poll()` télécharge tout en parallèle et lit
+  chaque GeoPackage (`GeoCache.warm`) dès son arrivée, pendant que le
+  classeur se télécharge encore.
+
+Le temps « après » doit être proche du plus long téléchargement seul, plus
+la préparation du classeur (lecture openpyxl), qui reste sur le chemin.
+"""
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_geopackages, make_register
+from griefpy.geo import GeoCache
+from griefpy.incremental import IncrementalStore
+from griefpy.refresh import BackgroundRefresher
+from griefpy.remote import RemoteFetcher
+
+BLOC = 64 * 1024
+
+
+class Source:
+    """Fichiers servis (nom -> contenu) et débit par connexion (octets/s)."""
+    fichiers = {}
+    debit = 2 * 2**20
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = Source.fichiers[self.path.lstrip("/")]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        for i in range(0, len(body), BLOC):
+            self.wfile.write(body[i:i + BLOC])
+            time.sleep(BLOC / Source.debit)
+
+
+def chrono(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+def main(n_rows, debit_mo_s):
+    Source.debit = debit_mo_s * 2**20
+    raw = make_register(n_rows)
+    buffer = io.BytesIO()
+    raw.to_excel(buffer, index=False)
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    url = lambda nom: f"http://127.0.0.1:{serveur.server_port}/{nom}"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        points, polygon = make_geopackages(workdir, raw["Communaute"].unique())
+        Source.fichiers = {"Table_MGG.xlsx": buffer.getvalue()}
+        for path in (points, polygon):
+            with open(path, "rb") as f:
+                Source.fichiers[os.path.basename(path)] = f.read()
+        urls = [url(nom) for nom in Source.fichiers]
+        seuls = {nom: chrono(RemoteFetcher(os.path.join(workdir, f"seul_{i}")).fetch, u)[0]
+                 for i, (nom, u) in enumerate(zip(Source.fichiers, urls))}
+
+        chemin = os.path.join(workdir, "Table_MGG.xlsx")
+        with open(chemin, "wb") as f:
+            f.write(Source.fichiers["Table_MGG.xlsx"])
+        t_prepa, _ = chrono(IncrementalStore(os.path.join(workdir, "etat_local")).refresh, chemin)
+
+        # Avant : en série, puis lecture des couches
+        def en_serie():
+            fetcher = RemoteFetcher(os.path.join(workdir, "serie"))
+            paths = [fetcher.fetch(u).path for u in urls]
+            IncrementalStore(os.path.join(workdir, "etat_serie")).refresh(paths[0])
+            GeoCache().assets(paths[1], paths[2], (None, None))
+        t_serie, _ = chrono(en_serie)
+
+        # Après : en parallèle, couches lues dès leur arrivée
+        def en_parallele():
+            fetcher, cache = RemoteFetcher(os.path.join(workdir, "parallele")), GeoCache()
+            kinds = {urls[1]: "points", urls[2]: "polygon"}
+            refresher = BackgroundRefresher(
+                fetcher, IncrementalStore(os.path.join(workdir, "etat_parallele")), urls[0], urls[1:],
+                on_fetched=lambda r: r.url in kinds and cache.warm(kinds[r.url], r.path, r.sha256),
+            )
+            refresher.poll()
+            paths = [fetcher.cached_path(u) for u in urls[1:]]
+            cache.assets(*paths, tuple(fetcher.fetch(u, max_age=float("inf")).sha256 for u in urls[1:]))
+        t_parallele, _ = chrono(en_parallele)
+    serveur.shutdown()
+    serveur.server_close()
+
+    print(f"Registre : {n_rows} lignes, débit {debit_mo_s} Mo/s par connexion, {os.cpu_count()} cœur(s)")
+    for nom, t in seuls.items():
+        taille = len(Source.fichiers[nom]) / 2**20
+        print(f"{f'téléchargement seul : {nom} ({taille:.1f} Mo)':<52} | {t:>6.2f} s")
+    print(f"{'préparation du classeur seule (fichier local)':<52} | {t_prepa:>6.2f} s")
+    print(f"{'avant : en série + lecture des couches':<52} | {t_serie:>6.2f} s")
+    print(f"{'après : en parallèle, couches lues dès leur arrivée':<52} | {t_parallele:>6.2f} s"
+          f" | x{t_serie / t_parallele:.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 10_000, float(args[1]) if len(args) > 1 else 0.25)
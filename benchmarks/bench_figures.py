@@ -0,0 +1,63 @@
+#*********************** Projet GriefPy ***************************
+#   Figures Plotly : reconstruction complète vs cache LRU + thème
+#******************************************************************
+"""Usage : python benchmarks/bench_figures.py [n_lignes]"""
+import os
+import sys
+import time
+
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register, with_calendar
+from griefpy.aggregation import AggregateCube
+from griefpy.figures import BASE_TEMPLATE, FigureCache, FigureTheme, apply_theme
+
+CLAIR = FigureTheme("plotly_white", "#efefef", "#000000")
+SOMBRE = FigureTheme("plotly_dark", "#2a2d33", "#ffffff")
+
+
+def build_nature(cube):
+    """Figure « Nature de griefs par traitement » du dashboard."""
+    ordre = cube.value_counts("Nature_plainte").sort_values().index.tolist()
+    data = cube.counts(["Nature_plainte", "Statut_traitement"], appearance=True).reset_index(name="Nombre")
+    fig = px.bar(
+        data, y="Nature_plainte", x="Nombre", color="Statut_traitement", text_auto=True,
+        category_orders={"Nature_plainte": ordre}, orientation="h",
+        title="Nature de griefs par traitement", template=BASE_TEMPLATE, height=400
+    )
+    fig.update_traces(marker_line_width=0)
+    return fig
+
+
+def chrono(func, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main(n_rows):
+    df = with_calendar(make_register(n_rows))
+    cube = AggregateCube.from_frame(df).slice(int(df["Année"].max()))
+    cache = FigureCache()
+    key = ("bench", "nature_statut")
+
+    # Avant : agrégats + Plotly Express + thème à chaque relance
+    t_avant = chrono(lambda: apply_theme(build_nature(cube), CLAIR))
+    cache.get(key, lambda: build_nature(cube), CLAIR)
+    t_hit = chrono(lambda: cache.get(key, lambda: build_nature(cube), CLAIR))
+    t_theme = chrono(lambda: apply_theme(cache._lookup(("base", key)), SOMBRE))
+    t_json = chrono(lambda: cache.get(key, None, CLAIR).to_json())
+
+    print(f"Registre synthétique : {n_rows} lignes, {len(cube.cells)} cellules")
+    print(f"{'reconstruction complète':<32} | {t_avant:>8.2f} ms")
+    print(f"{'cache (même thème)':<32} | {t_hit:>8.3f} ms")
+    print(f"{'premier passage à un thème':<32} | {t_theme:>8.2f} ms")
+    print(f"{'sérialisation JSON (Streamlit)':<32} | {t_json:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
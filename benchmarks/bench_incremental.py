@@ -0,0 +1,69 @@
+#*********************** Projet GriefPy ***************************
+#   Rafraîchissement : reconstruction complète vs deltas de lignes
+#******************************************************************
+"""Usage : python benchmarks/bench_incremental.py [n_lignes ...]
+
+Mesure la mise à jour de la table préparée et du cube quand le registre
+reçoit quelques dizaines de griefs nouveaux ou modifiés. La lecture du
+classeur (identique dans les deux cas) n'est pas comptée. Le chemin des
+deltas est forcé ; « retenu » est le mode que choisit le store avec les
+seuils `DELTA_MIN_ROWS` et `DELTA_MAX_SHARE`.
+"""
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register
+from griefpy import incremental
+from griefpy.incremental import IncrementalStore, delta_worthwhile
+
+
+def next_version(raw, n_new=50, n_modified=10, seed=1):
+    """Registre du lendemain : `n_new` griefs ajoutés, `n_modified` statuts mis à jour."""
+    nouveaux = make_register(n_new, seed=seed)
+    nouveaux["ID"] += int(raw["ID"].max())
+    raw = pd.concat([raw, nouveaux], ignore_index=True)
+    modifies = raw.sample(n_modified, random_state=seed).index
+    raw.loc[modifies, "Statut_traitement"] = "Achevé"
+    return raw
+
+
+def chrono(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+def main(tailles):
+    print(f"{'lignes':>9} | {'complète (s)':>12} | {'delta (s)':>9} | {'ajoutées':>8} | {'modifiées':>9} | gain | retenu")
+    for n in tailles:
+        v1 = make_register(n)
+        v2 = next_version(v1)
+        with tempfile.TemporaryDirectory() as d1, tempfile.TemporaryDirectory() as d2, \
+                mock.patch.multiple(incremental, DELTA_MIN_ROWS=0, DELTA_MAX_SHARE=1.0):
+            store = IncrementalStore(d1)
+            store.update(v1, "v1")
+            t_delta, stats = chrono(store.update, v2, "v2")
+            complet = IncrementalStore(d2)
+            t_full, _ = chrono(complet.update, v2, "v2")
+
+        retenu = "delta" if delta_worthwhile(len(v1), stats.added + stats.modified + stats.deleted) else "complète"
+
+        # Même table et mêmes agrégats qu'une reconstruction depuis v2
+        # (comparaison détaillée : tests/test_incremental.py)
+        pd.testing.assert_frame_equal(store.snapshot.frame, complet.snapshot.frame, check_categorical=False)
+        mesures = ["n", "nb_jour_sum", "nb_jour_count"]
+        assert (store.cube.cells[mesures].sum() == complet.cube.cells[mesures].sum()).all()
+        print(
+            f"{n:>9} | {t_full:>12.3f} | {t_delta:>9.3f} | {stats.added:>8} | "
+            f"{stats.modified:>9} | x{t_full / t_delta:.1f} | {retenu}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
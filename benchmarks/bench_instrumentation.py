@@ -0,0 +1,44 @@
+#*********************** Projet GriefPy ***************************
+#   Instrumentation : coût d'une étape mesurée, coupée ou active
+#******************************************************************
+"""Usage : python benchmarks/bench_instrumentation.py [n_etapes]
+
+Coût par étape de `Recorder.stage()` coupé (contexte vide partagé, taille
+non évaluée) et actif, puis durée des exports JSON lines et Prometheus.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from griefpy.instrumentation import Recorder, to_jsonl, to_prometheus
+
+
+def par_etape(recorder, n):
+    taille = lambda: 1024
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with recorder.stage("Figure : evolution", size=taille):
+            pass
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main(n):
+    coupe, actif = Recorder(), Recorder(max_records=n)
+    actif.enabled = True
+    t0 = time.perf_counter()
+    for _ in range(n):
+        pass
+    t_vide = (time.perf_counter() - t0) / n * 1e6
+    print(f"{'boucle vide':<30} | {t_vide:>8.3f} µs")
+    print(f"{'étape, instrumentation coupée':<30} | {par_etape(coupe, n):>8.3f} µs")
+    print(f"{'étape, instrumentation active':<30} | {par_etape(actif, n):>8.3f} µs")
+    records = list(actif.records)
+    for nom, export in (("JSON lines", to_jsonl), ("Prometheus", to_prometheus)):
+        t0 = time.perf_counter()
+        texte = export(records)
+        print(f"{'export ' + nom:<30} | {(time.perf_counter() - t0) * 1000:>8.1f} ms | {len(records)} mesures, {len(texte) / 1024:.0f} Ko")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,64 @@
+#*********************** Projet GriefPy ***************************
+#   Marqueurs de la carte : boucle CircleMarker vs couche unique
+#******************************************************************
+"""Usage : python benchmarks/bench_map_markers.py [n_points ...]
+
+Pour chaque mode, mesure la construction de la carte (ajout des marqueurs +
+rendu HTML par folium) et la taille du HTML envoyé au navigateur.
+"""
+import os
+import sys
+import time
+
+import folium
+import geopandas as gpd
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from griefpy.geo import add_markers
+
+
+def make_points(n_points, seed=0):
+    """Boîtes à griefs jointes au résumé par communauté, comme `point_merged`."""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 20, (n_points, 4)) * (rng.random((n_points, 1)) < 0.7)
+    points = gpd.GeoDataFrame(
+        {
+            "name": [f"village_{i:05d}" for i in range(n_points)],
+            "Communaute": [f"village_{i:05d}" for i in range(n_points)],
+            "Acheve": counts[:, 0], "En_cours": counts[:, 1],
+            "Perdu_de_vue": counts[:, 2], "A_traiter": counts[:, 3],
+        },
+        geometry=gpd.points_from_xy(rng.uniform(15.8, 16.2, n_points), rng.uniform(-1.0, -0.6, n_points)),
+        crs=4326,
+    )
+    points.insert(2, "Total_griefs", counts.sum(axis=1))
+    return points
+
+
+def build_map(points, mode):
+    m = folium.Map(location=[-0.7, 17], zoom_start=6, tiles="CartoDB dark_matter")
+    add_markers(m, points, mode)
+    return m.get_root().render()
+
+
+def chrono(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+def main(tailles):
+    print(f"{'points':>7} | {'détaillé (s)':>12} | {'HTML (ko)':>9} | {'rapide (s)':>10} | {'HTML (ko)':>9} | gain")
+    for n in tailles:
+        points = make_points(n)
+        t_detail, html_detail = chrono(build_map, points, "detail")
+        t_fast, html_fast = chrono(build_map, points, "fast")
+        print(
+            f"{n:>7} | {t_detail:>12.3f} | {len(html_detail) / 1024:>9.0f} | "
+            f"{t_fast:>10.3f} | {len(html_fast) / 1024:>9.0f} | x{t_detail / t_fast:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1_000, 10_000])
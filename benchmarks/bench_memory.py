@@ -0,0 +1,53 @@
+#*********************** Projet GriefPy ***************************
+#   Mémoire de la table : colonnes texte vs schéma compact partagé
+#******************************************************************
+"""Usage : python benchmarks/bench_memory.py [n_lignes] [n_sessions]
+
+Compare la table préparée telle que la gardait le dashboard (textes en
+objets Python, une copie désérialisée par session via `st.cache_data`) à la
+table canonique de `compact_frame`, partagée par toutes les sessions.
+"""
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register, with_calendar
+from griefpy.schema import TEXT_COLS, compact_frame, memory_usage
+
+
+def chrono(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+def main(n_rows, n_sessions):
+    brut = with_calendar(make_register(n_rows))
+    # Ancienne table : textes en objets, calendrier en texte
+    ancien = brut.astype({col: object for col in TEXT_COLS})
+    ancien["Trimestre"] = ancien["Trimestre"].astype(str).astype(object)
+    ancien = ancien.astype({"Nb_jour": "int64", "Année": "int32"})
+    t_compact, compact = chrono(compact_frame, brut.copy())
+
+    # Copie servie à chaque relance par st.cache_data (pickle aller-retour)
+    t_copie, _ = chrono(lambda: pickle.loads(pickle.dumps(ancien)))
+
+    avant, apres = memory_usage(ancien), memory_usage(compact)
+    print(f"Registre synthétique : {n_rows} lignes, {n_sessions} sessions")
+    print(f"{'table texte (objets)':<32} | {avant / 2**20:>8.1f} Mo")
+    print(f"{'table compacte':<32} | {apres / 2**20:>8.1f} Mo | x{avant / apres:.1f} (en {t_compact:.2f} s)")
+    print(f"{'avant : une copie par session':<32} | {avant * n_sessions / 2**20:>8.1f} Mo | copie {t_copie:.2f} s par relance")
+    print(f"{'après : table partagée':<32} | {apres / 2**20:>8.1f} Mo | copie 0 s")
+    print()
+    print(f"{'colonne':<18} | {'avant (Mo)':>10} | {'après (Mo)':>10}")
+    detail_avant = ancien.memory_usage(deep=True, index=False)
+    detail_apres = compact.memory_usage(deep=True, index=False)
+    for col in TEXT_COLS + ["Nb_jour", "Année", "Trimestre"]:
+        print(f"{col:<18} | {detail_avant[col] / 2**20:>10.1f} | {detail_apres[col] / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 1_000_000, args[1] if len(args) > 1 else 10)
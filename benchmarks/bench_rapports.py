@@ -0,0 +1,47 @@
+#*********************** Projet GriefPy ***************************
+#   Rapports hors ligne : rendu séquentiel vs pool, puis relance
+#******************************************************************
+"""Usage : python benchmarks/bench_rapports.py [n_lignes] [processus]
+
+- Premier passage : tous les rapports (année × communauté) sont rendus,
+  d'abord un par un puis avec le pool de processus.
+- Relance : registre et couches inchangés, aucun rapport n'est régénéré.
+"""
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_geopackages, make_register
+from griefpy.rapports import build_reports, load_dataset
+from griefpy.remote import RemoteFetcher
+
+warnings.filterwarnings("ignore", "CartoDB tiles")
+
+
+def chrono(dataset, sortie, processus):
+    t0 = time.perf_counter()
+    stats = build_reports(dataset, sortie, max_workers=processus)
+    return time.perf_counter() - t0, stats
+
+
+def main(n_rows, processus):
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = make_register(n_rows)
+        registre = os.path.join(tmp, "registre.xlsx")
+        raw.to_excel(registre, index=False)
+        points, limite = make_geopackages(tmp, raw["Communaute"].unique())
+        dataset = load_dataset(registre, points, limite, RemoteFetcher(os.path.join(tmp, "copies")),
+                               os.path.join(tmp, "etat"))
+
+        print(f"Registre synthétique : {n_rows} lignes, {os.cpu_count()} CPU")
+        for nom, sortie, n_proc in [("séquentiel", "seq", 1), (f"pool ({processus} proc.)", "pool", processus),
+                                    ("relance (inchangé)", "pool", processus)]:
+            duree, stats = chrono(dataset, os.path.join(tmp, sortie), n_proc)
+            print(f"{nom:<22} : {duree:>6.2f} s  {stats.rendered} rendus, {stats.skipped} ignorés")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
@@ -0,0 +1,118 @@
+#*********************** Projet GriefPy ***************************
+#   Rafraîchissement : rechargement bloquant vs scrutation de fond
+#******************************************************************
+"""Usage : python benchmarks/bench_refresh.py [n_lignes]
+
+Sert le classeur depuis un serveur HTTP local (ETag, 304, pannes simulées).
+
+- Avant : à l'expiration du TTL, la relance suivante télécharge et prépare
+  le classeur modifié avant de pouvoir répondre.
+- Après : `BackgroundRefresher.poll()` prépare la version hors relance ; la
+  relance ne lit que le `Snapshot` publié.
+
+Vérifie aussi le recul exponentiel pendant une panne de la source.
+"""
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_incremental import next_version
+from benchmarks.synthetic import make_register
+from griefpy.incremental import IncrementalStore
+from griefpy.refresh import BackgroundRefresher
+from griefpy.remote import RemoteFetcher
+
+
+class Source:
+    """Contenu servi et pannes à simuler (réponses 503)."""
+    body = b""
+    pannes = 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if Source.pannes:
+            Source.pannes -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        etag = '"%s"' % hashlib.md5(Source.body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(Source.body)))
+        self.end_headers()
+        self.wfile.write(Source.body)
+
+
+def xlsx(df):
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def chrono(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - t0) * 1000, result
+
+
+def main(n_rows):
+    v1 = make_register(n_rows)
+    corps = [xlsx(v1), xlsx(next_version(v1))]
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{serveur.server_port}/Table_MGG.xlsx"
+
+    with tempfile.TemporaryDirectory() as d_avant, tempfile.TemporaryDirectory() as d_apres:
+        # Avant : la relance qui suit l'expiration du TTL paie tout
+        Source.body = corps[0]
+        fetcher, store = RemoteFetcher(os.path.join(d_avant, "remote")), IncrementalStore(d_avant)
+        store.refresh(fetcher.fetch(url).path)
+        Source.body = corps[1]
+        t_avant, _ = chrono(lambda: store.refresh(fetcher.fetch(url).path) and store.snapshot.frame)
+
+        # Après : la scrutation de fond prépare, la relance lit
+        Source.body = corps[0]
+        refresher = BackgroundRefresher(RemoteFetcher(os.path.join(d_apres, "remote")), IncrementalStore(d_apres), url)
+        refresher.poll()
+        Source.body = corps[1]
+        t_fond, statut = chrono(refresher.poll)
+        t_apres, _ = chrono(lambda: refresher.store.snapshot.frame)
+        t_304, _ = chrono(refresher.poll)
+
+        print(f"Registre synthétique : {n_rows} lignes, classeur de {len(corps[1]) / 2**20:.1f} Mo")
+        print(f"{'avant : relance après expiration du TTL':<44} | {t_avant:>10.1f} ms")
+        print(f"{'après : relance (lecture du Snapshot)':<44} | {t_apres:>10.4f} ms")
+        print(f"{'après : scrutation de fond, classeur modifié':<44} | {t_fond:>10.1f} ms (hors relance)")
+        print(f"{'après : scrutation de fond, 304':<44} | {t_304:>10.1f} ms (hors relance)")
+
+        # Panne de la source : intervalle doublé, dernière version servie
+        version = refresher.store.snapshot.version
+        Source.pannes = 4
+        print("\nPanne simulée (503) :")
+        for _ in range(5):
+            statut = refresher.poll()
+            delai = statut.next_at - refresher.clock()
+            print(
+                f"  échecs consécutifs {statut.failures} | prochain essai dans {delai:>5.0f} s | "
+                f"version servie inchangée : {refresher.store.snapshot.version == version}"
+            )
+    serveur.shutdown()
+    serveur.server_close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
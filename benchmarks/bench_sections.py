@@ -0,0 +1,160 @@
+#*********************** Projet GriefPy ***************************
+#     Coût de relance par section : script complet vs fragments
+#******************************************************************
+"""Usage : python benchmarks/bench_sections.py [n_lignes] [--avant REV] [--essais N]
+
+Exécute le dashboard avec `AppTest` sur un registre et des GeoPackages
+synthétiques, ouvre chaque onglet et relit les durées enregistrées par
+section.
+
+« Avant » est mesuré : le script monolithique de la révision `--avant`
+(extrait dans un worktree git, adresses Dropbox remplacées par les fichiers
+synthétiques) est relancé en entier avec `AppTest`, caches chauds, meilleur
+de `--essais` relances. C'est ce que coûtait alors toute interaction.
+« Après » = somme des sections que relance désormais l'interaction (la
+section fragment seule, ou le préambule et les sections de l'onglet ouvert
+pour un filtre de la barre latérale). Cette somme n'inclut pas le surcoût
+d'une relance `AppTest`, que « avant » inclut.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from streamlit.testing.v1 import AppTest
+
+# Dernière révision où chaque interaction relançait le script entier
+AVANT = "d1cda9f^"
+ESSAIS = 5
+# Sources du script monolithique (variable -> fichier synthétique)
+SOURCES_AVANT = {"url_excel": "Table_MGG.xlsx", "point_url": "Boite_aux_lettres.gpkg", "polygon_url": "lim_lefini.gpkg"}
+
+PREAMBULE = "Préambule (chargement, filtres, indicateurs)"
+ONGLETS = {
+    "📍 Carte": ["Carte"],
+    "📈 Analyse visuelle": [
+        "Type de dépôt / avancement", "Population et genre", "Nature par statut",
+        "Communautés", "Nature par genre", "Évolution, classement et durée",
+    ],
+    "📋 Données": ["Tableau"],
+}
+# Interaction -> sections relancées (fragment ou onglet ouvert)
+INTERACTIONS = {
+    "Zoom / clic sur la carte": ["Carte"],
+    "Radio « Affichage du genre »": ["Population et genre"],
+    "Radio « Afficher selon » (communautés)": ["Communautés"],
+    "Curseur « Top N natures »": ["Évolution, classement et durée"],
+    "Filtre barre latérale (onglet Carte)": [PREAMBULE, "Carte"],
+    "Filtre barre latérale (onglet Analyse)": [PREAMBULE] + ONGLETS["📈 Analyse visuelle"],
+}
+
+
+def preparer(n_rows, workdir):
+    from benchmarks.synthetic import make_geopackages, make_register
+
+    df = make_register(n_rows)
+    excel_path = os.path.join(workdir, SOURCES_AVANT["url_excel"])
+    df.to_excel(excel_path, index=False)
+    point_path, polygon_path = make_geopackages(workdir, df["Communaute"].unique())
+    os.environ.update({
+        "GRIEFPY_EXCEL_URL": excel_path,
+        "GRIEFPY_POINTS_URL": point_path,
+        "GRIEFPY_POLYGON_URL": polygon_path,
+    })
+
+
+def mesurer(workdir):
+    os.chdir(workdir)
+
+    at = AppTest.from_file(os.path.join(ROOT, "Python_VERIF.py"), default_timeout=600)
+    at.run()
+    # Premier passage : remplit les caches (instantané, cube, index, géo)
+    for onglet in ONGLETS:
+        at.session_state["onglet"] = onglet
+        at.run()
+    durees = {}
+    for onglet in ONGLETS:
+        at.session_state["onglet"] = onglet
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        durees.update({k: v["ms"] for k, v in at.session_state["section_timings"].items()})
+    return durees
+
+
+def relance_complete(script, workdir, essais):
+    """Meilleure durée (ms) d'une relance complète de `script`, caches chauds."""
+    os.chdir(workdir)
+    at = AppTest.from_file(script, default_timeout=600)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    best = float("inf")
+    for _ in range(essais):
+        t0 = time.perf_counter()
+        at.run()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def mesurer_avant(rev, workdir, essais):
+    """Relance complète du script de `rev`, dans un processus qui importe le `griefpy` de `rev`."""
+    racine = os.path.join(workdir, "avant")
+    subprocess.run(["git", "-C", ROOT, "worktree", "add", "--detach", racine, rev], check=True, capture_output=True)
+    try:
+        with open(os.path.join(racine, "Python_VERIF.py"), encoding="utf-8") as f:
+            script = f.read()
+        for var, nom in SOURCES_AVANT.items():
+            script = re.sub(rf'^{var} = ".*"$', f"{var} = {os.path.join(workdir, nom)!r}", script, flags=re.M)
+        chemin = os.path.join(racine, "_bench_avant.py")
+        with open(chemin, "w", encoding="utf-8") as f:
+            f.write(script)
+        # Processus séparé : le script importe le `griefpy` de `racine`, pas celui de ROOT
+        sortie = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--relance", chemin, "--racine", racine,
+             "--dossier", workdir, "--essais", str(essais)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        return float(sortie.split()[-1])
+    finally:
+        subprocess.run(["git", "-C", ROOT, "worktree", "remove", "--force", racine], capture_output=True)
+
+
+def main(n_rows, rev=AVANT, essais=ESSAIS):
+    with tempfile.TemporaryDirectory() as workdir:
+        preparer(n_rows, workdir)
+        complet = mesurer_avant(rev, workdir, essais)
+        durees = mesurer(workdir)
+
+    print(f"Registre synthétique : {n_rows} lignes (caches chauds)\n")
+    print(f"{'section':<46} | {'ms':>8}")
+    for name, ms in durees.items():
+        print(f"{name:<46} | {ms:>8.1f}")
+
+    print(f"\nRelance complète du script de {rev} : {complet:.1f} ms")
+    print(f"\n{'interaction':<46} | {'avant (ms)':>10} | {'après (ms)':>10}")
+    for interaction, sections in INTERACTIONS.items():
+        apres = sum(durees[s] for s in sections)
+        print(f"{interaction:<46} | {complet:>10.1f} | {apres:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coût de relance par section du dashboard")
+    parser.add_argument("n_lignes", type=int, nargs="?", default=20_000)
+    parser.add_argument("--avant", default=AVANT, help="révision du script monolithique")
+    parser.add_argument("--essais", type=int, default=ESSAIS)
+    # Usage interne (cf. mesurer_avant)
+    parser.add_argument("--relance", help=argparse.SUPPRESS)
+    parser.add_argument("--racine", help=argparse.SUPPRESS)
+    parser.add_argument("--dossier", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.relance:
+        sys.path[0] = args.racine
+        print(relance_complete(args.relance, args.dossier, args.essais))
+    else:
+        main(args.n_lignes, args.avant, args.essais)
@@ -0,0 +1,108 @@
+#*********************** Projet GriefPy ***************************
+#   Démarrage à froid : imports du dashboard avant tout affichage
+#******************************************************************
+"""Usage : python benchmarks/bench_startup.py [--essais N] [--reference fichier.json] [--enregistrer]
+
+Chaque mesure part d'un interpréteur neuf (meilleur de plusieurs essais).
+
+- Avant : bibliothèques importées en tête de Python_VERIF.py jusqu'ici
+  (pile géographique, Plotly Express, matplotlib inutilisé).
+- Après : imports de premier niveau du script actuel, relus dans sa source.
+
+Vérifie qu'aucune bibliothèque lourde n'est chargée au démarrage et compare
+le temps d'import à la référence de `benchmarks/suite.py` (clé « démarrage »),
+avec les mêmes seuils ; code de sortie 1 en cas de régression.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.suite import ECART_MIN_MS, REFERENCE, SEUIL_TEMPS
+
+SCRIPT = os.path.join(ROOT, "Python_VERIF.py")
+# Modules qui ne doivent être importés qu'à la première carte ou au premier graphique
+# (Streamlit charge lui-même `plotly.graph_objects`, à imports paresseux)
+DIFFERES = ["geopandas", "shapely", "folium", "branca", "streamlit_folium", "plotly.express", "matplotlib"]
+AVANT = """
+import os, time, pandas, streamlit
+import geopandas, folium, plotly.express, matplotlib.pyplot
+from shapely.geometry import Point
+from streamlit_folium import st_folium
+from branca.element import Template, MacroElement
+import griefpy.incremental, griefpy.remote, griefpy.refresh, griefpy.geo, griefpy.figures
+"""
+CARTE = "import folium, branca.element, streamlit_folium, griefpy.geo"
+GRAPHIQUES = "import plotly.express"
+
+
+def imports_de_tete(path):
+    """Instructions d'import de premier niveau (hors blocs) du script."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(
+        ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+def importer(code, deja=""):
+    """Temps d'import de `code` (ms) une fois `deja` importé, et modules chargés."""
+    sonde = "\n".join([
+        deja, "import sys, time, json", "t0 = time.perf_counter()", code,
+        "print(json.dumps([(time.perf_counter() - t0) * 1000, sorted(sys.modules)]))",
+    ])
+    sortie = subprocess.run(
+        [sys.executable, "-c", sonde], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(sortie.strip().splitlines()[-1])
+
+
+def meilleur(code, essais, deja=""):
+    mesures = [importer(code, deja) for _ in range(essais)]
+    return min(ms for ms, _ in mesures), mesures[0][1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Temps d'import au démarrage du dashboard")
+    parser.add_argument("--essais", type=int, default=5)
+    parser.add_argument("--reference", default=REFERENCE)
+    parser.add_argument("--enregistrer", action="store_true")
+    args = parser.parse_args(argv)
+
+    tete = imports_de_tete(SCRIPT)
+    t_avant, _ = meilleur(AVANT, args.essais)
+    t_apres, modules = meilleur(tete, args.essais)
+    t_carte, _ = meilleur(CARTE, args.essais, deja=tete)
+    t_graphiques, _ = meilleur(GRAPHIQUES, args.essais, deja=tete)
+    charges = [m for m in DIFFERES if m in modules]
+
+    print(f"{'avant : imports en tête du script':<40} | {t_avant:>8.0f} ms")
+    print(f"{'après : imports en tête du script':<40} | {t_apres:>8.0f} ms")
+    print(f"{'après : première carte (pile géo)':<40} | {t_carte:>8.0f} ms (différé)")
+    print(f"{'après : premier graphique (Plotly)':<40} | {t_graphiques:>8.0f} ms (différé)")
+
+    alertes = [f"module lourd importé au démarrage : {m}" for m in charges]
+    reference = {}
+    if os.path.exists(args.reference):
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+    if args.enregistrer:
+        reference["démarrage"] = {"ms": round(t_apres, 2)}
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump(reference, f, indent=2, ensure_ascii=False)
+        print(f"Référence enregistrée : {args.reference}")
+    elif "démarrage" in reference:
+        ref = reference["démarrage"]["ms"]
+        if t_apres > ref * SEUIL_TEMPS and t_apres - ref > ECART_MIN_MS:
+            alertes.append(f"démarrage : {t_apres:.0f} ms (référence {ref:.0f} ms)")
+    for alerte in alertes:
+        print(f"RÉGRESSION {alerte}")
+    return 1 if alertes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#*********************** Projet GriefPy ***************************
+#   Aperçu des données : table complète vs page côté serveur
+#******************************************************************
+"""Usage : python benchmarks/bench_table.py [n_lignes]
+
+- Avant : `st.dataframe` reçoit toutes les lignes filtrées, sérialisées en
+  Arrow et envoyées au navigateur à chaque relance.
+- Après : recherche et tri sur l'index `TableIndex`, seule la page visible
+  est sérialisée ; l'export CSV/Parquet est construit au clic, en mémoire.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register, with_calendar
+from griefpy.schema import compact_frame
+from griefpy.table import TableIndex, export_csv, export_parquet
+
+
+def chrono(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - t0) * 1000, result
+
+
+def taille(fichier):
+    fichier.seek(0, os.SEEK_END)
+    return fichier.tell()
+
+
+def main(n_rows):
+    df = compact_frame(with_calendar(make_register(n_rows)))
+    rows = np.flatnonzero(df["Année"].to_numpy() >= df["Année"].min() + 1)
+    colonnes = list(df.columns)
+
+    # Avant : toutes les lignes filtrées partent au navigateur
+    t_avant, octets = chrono(lambda: convert_pandas_df_to_arrow_bytes(df.take(rows)))
+
+    # Après : index (une fois par version), recherche, tri, page
+    index = TableIndex(df)
+    t_index, _ = chrono(lambda: [index._column(col) for col in ("Communaute", "Nb_jour")])
+    t_recherche, trouves = chrono(index.search, rows, "village_01", ["Communaute"])
+    t_tri, tries = chrono(index.sort, trouves, "Nb_jour", True)
+    t_page, page = chrono(index.page, tries, 1, 50, colonnes)
+    t_envoi, octets_page = chrono(convert_pandas_df_to_arrow_bytes, page.frame)
+
+    print(f"Registre synthétique : {n_rows} lignes, {len(rows)} filtrées, {len(trouves)} trouvées")
+    print(f"{'avant : table filtrée sérialisée':<36} | {t_avant:>8.1f} ms | {len(octets) / 2**20:>8.2f} Mo envoyés")
+    print(f"{'après : index (2 colonnes, 1 fois)':<36} | {t_index:>8.1f} ms |")
+    print(f"{'après : recherche':<36} | {t_recherche:>8.1f} ms |")
+    print(f"{'après : tri décroissant':<36} | {t_tri:>8.1f} ms |")
+    print(f"{'après : page de 50 sérialisée':<36} | {t_page + t_envoi:>8.1f} ms | {len(octets_page) / 2**20:>8.2f} Mo envoyés")
+
+    # Export au clic, hors relance
+    for nom, export in (("CSV", export_csv), ("Parquet", export_parquet)):
+        t_export, fichier = chrono(export, df, rows, colonnes)
+        print(f"{'export ' + nom + ' (au clic)':<36} | {t_export:>8.1f} ms | {taille(fichier) / 2**20:>8.2f} Mo")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,77 @@
+#*********************** Projet GriefPy ***************************
+#   Téléversement : lecture complète vs lecture en flux validée
+#******************************************************************
+"""Usage : python benchmarks/bench_upload.py [n_lignes]
+
+- Avant : `pd.read_excel` charge toutes les cellules en listes Python avant
+  de typer la table ; les colonnes ne sont vérifiées qu'ensuite.
+- Après : `stream_workbook` vérifie l'en-tête sur la première ligne puis
+  valide et type les lignes par blocs de `STREAM_CHUNK_ROWS`.
+
+Mesure le temps et le pic mémoire (tracemalloc) d'un fichier valide, et le
+temps de refus d'un fichier sans colonne requise ou à valeur invalide en tête.
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register
+from griefpy.ingestion import check_columns, read_workbook, stream_workbook
+
+
+def xlsx(df):
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def executer(func, *args):
+    try:
+        func(*args)
+    except ValueError as e:
+        return type(e).__name__
+    return None
+
+
+def mesurer(func, *args):
+    """(durée en s, pic mémoire en Mo, erreur levée ou None) ; pic relevé sur un second passage."""
+    t0 = time.perf_counter()
+    erreur = executer(func, *args)
+    duree = time.perf_counter() - t0
+    # tracemalloc ralentit fortement la lecture : hors chronométrage
+    tracemalloc.start()
+    executer(func, *args)
+    pic = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return duree, pic, erreur
+
+
+def avant(data):
+    raw = read_workbook(data)
+    check_columns(raw.columns)
+    return raw
+
+
+def main(n_rows):
+    raw = make_register(n_rows)
+    valide = xlsx(raw)
+    sans_colonne = xlsx(raw.drop(columns=["Sexe"]))
+    fautif = raw.copy()
+    fautif.loc[2, "Statut_traitement"] = "Inconnu"
+    fautif = xlsx(fautif)
+
+    print(f"Registre synthétique : {n_rows} lignes, classeur de {len(valide) / 2**20:.1f} Mo")
+    print(f"{'cas':<34} | {'avant':>18} | {'après (en flux)':>18}")
+    for nom, data in [("fichier valide", valide), ("colonne manquante", sans_colonne), ("statut invalide ligne 4", fautif)]:
+        cellules = []
+        for lire in (avant, stream_workbook):
+            duree, pic, erreur = mesurer(lire, data)
+            cellules.append(f"{duree:>6.2f} s {pic:>6.0f} Mo")
+        print(f"{nom:<34} | {cellules[0]:>18} | {cellules[1]:>18}{'  refusé : ' + erreur if erreur else ''}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
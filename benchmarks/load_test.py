@@ -0,0 +1,121 @@
+#*********************** Projet GriefPy ***************************
+#     Test de charge local : N sessions simultanées du dashboard
+#******************************************************************
+"""Usage : python benchmarks/load_test.py [n_lignes] [n_sessions ...]
+
+Simule N sessions en parallèle (un fil par session, comme les sessions du
+serveur Streamlit) qui enchaînent des relances : obtention de la table,
+filtres de la barre latérale (index bitmap + cube), indicateurs, résumé de
+la carte et extrait du tableau. Trois modes, du plus léger au plus lourd
+(la RSS d'un processus ne redescend guère) :
+
+- « partagé » : le `Snapshot` publié par le store, lu sans copie ;
+- « copie » : ce que fait `st.cache_data`, une table désérialisée à chaque
+  relance de chaque session (table compacte) ;
+- « copie texte » : idem avec les textes en objets Python (état initial).
+
+Rapporte les latences de relance p50/p95, le débit et la mémoire résidente
+(RSS) du processus. `AppTest` n'est pas utilisable ici : il ne sait pas
+exécuter plusieurs scripts à la fois dans un même processus.
+"""
+import os
+import pickle
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_register
+from griefpy.aggregation import community_summary
+from griefpy.filtres import FilterIndex, sidebar_criteria
+from griefpy.incremental import IncrementalStore
+from griefpy.schema import TEXT_COLS
+
+RELANCES = 20
+
+
+def rss_mo():
+    """Mémoire résidente actuelle du processus (Linux), sinon le pic."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def relance(df, cube, index, rng):
+    """Travail de données d'une relance du préambule avec des filtres tirés au hasard."""
+    # Options des filtres, lues dans la table comme dans la barre latérale
+    annees = sorted(df["Année"].unique())
+    statuts = [s for s in df["Statut_traitement"].unique().tolist() if rng.random() < 0.8]
+    types = df["Type_depot"].unique().tolist()
+    annee = annees[rng.integers(len(annees))]
+    rows = index.rows(sidebar_criteria(annee, types, statuts))
+    cube_filtered = cube.slice(annee, types, statuts)
+    cube_filtered.count_where("Statut_traitement", ["Achevé", "Grief non recevable"])
+    community_summary(cube_filtered)
+    return df.take(rows[:1000])
+
+
+def session(obtenir, cube, index, seed, latences):
+    rng = np.random.default_rng(seed)
+    for _ in range(RELANCES):
+        t0 = time.perf_counter()
+        relance(obtenir(), cube, index, rng)
+        latences.append((time.perf_counter() - t0) * 1000)
+
+
+def charge(n_sessions, obtenir, cube, index):
+    latences = []
+    rss = [rss_mo()]
+    fils = [
+        threading.Thread(target=session, args=(obtenir, cube, index, seed, latences))
+        for seed in range(n_sessions)
+    ]
+    t0 = time.perf_counter()
+    for fil in fils:
+        fil.start()
+    # Échantillonnage de la RSS pendant la charge
+    while any(fil.is_alive() for fil in fils):
+        rss.append(rss_mo())
+        time.sleep(0.05)
+    duree = time.perf_counter() - t0
+    return np.array(latences), duree, max(rss)
+
+
+def main(n_rows, paliers):
+    with tempfile.TemporaryDirectory() as state_dir:
+        store = IncrementalStore(state_dir)
+        store.update(make_register(n_rows), "v1")
+        snapshot = store.snapshot
+        index = FilterIndex(snapshot.frame)
+        # Ce que st.cache_data garde en cache et désérialise à chaque appel
+        compacte = pickle.dumps(snapshot.frame)
+        texte = pickle.dumps(snapshot.frame.astype({col: object for col in TEXT_COLS}))
+        modes = {
+            "partagé": lambda: store.snapshot.frame,
+            "copie": lambda: pickle.loads(compacte),
+            "copie texte": lambda: pickle.loads(texte),
+        }
+        print(f"Registre synthétique : {n_rows} lignes, {RELANCES} relances par session")
+        print(f"RSS après chargement : {rss_mo():.0f} Mo\n")
+        print(f"{'mode':<12} | {'sessions':>8} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'relances/s':>10} | {'RSS max (Mo)':>12}")
+        for nom, obtenir in modes.items():
+            for n_sessions in paliers:
+                latences, duree, rss = charge(n_sessions, obtenir, snapshot.cube, index)
+                print(
+                    f"{nom:<12} | {n_sessions:>8} | {np.percentile(latences, 50):>9.1f} | "
+                    f"{np.percentile(latences, 95):>9.1f} | {len(latences) / duree:>10.1f} | {rss:>12.0f}"
+                )
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 200_000, args[1:] or [1, 10, 50])
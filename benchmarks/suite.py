@@ -0,0 +1,215 @@
+#*********************** Projet GriefPy ***************************
+#   Suite de mesures sans interface : passage à l'échelle 1k → 1M
+#******************************************************************
+"""Usage : python benchmarks/suite.py [--tailles N ...] [--communautes N]
+       [--natures N] [--debut AAAA-MM-JJ] [--fin AAAA-MM-JJ]
+       [--reference fichier.json] [--enregistrer]
+
+Pour chaque taille, génère un registre et des GeoPackages synthétiques puis
+exécute, sans Streamlit, les fonctions qu'enchaîne le dashboard :
+ingestion (typage, dates, table compacte, cube), filtres, agrégations,
+carte (GeoPackages, jointure, HTML Folium), figures Plotly et tableau.
+Chaque étape est chronométrée (meilleur de plusieurs essais) puis
+rejouée une fois sous `tracemalloc` pour son pic mémoire (allocations
+Python et numpy ; les tampons Arrow n'y figurent pas). La mémoire résidente
+maximale du processus est rapportée à la fin.
+
+`--enregistrer` écrit les mesures dans le fichier de référence ; sinon,
+si ce fichier existe, toute étape plus lente ou plus gourmande que la
+référence au-delà des seuils est signalée et le code de sortie vaut 1.
+La référence dépend de la machine : l'enregistrer sur celle qui compare.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import folium
+import plotly.express as px
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.bench_figures import build_nature
+from benchmarks.synthetic import make_geopackages, make_register
+from griefpy.aggregation import community_summary
+from griefpy.filtres import FilterIndex, sidebar_criteria
+from griefpy.figures import BASE_TEMPLATE
+from griefpy.geo import add_markers, load_geo_assets
+from griefpy.incremental import IncrementalStore
+from griefpy.table import TableIndex
+
+TAILLES = [1_000, 10_000, 100_000, 1_000_000]
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference.json")
+ESSAIS = 5
+# Régression : au-delà du ratio ET de l'écart absolu (bruit des petites mesures)
+SEUIL_TEMPS, ECART_MIN_MS = 1.50, 10.0
+SEUIL_MEMOIRE, ECART_MIN_MO = 1.20, 1.0
+
+#==================================================================
+# ---------------------- Étapes du dashboard ----------------------
+#==================================================================
+def etape_ingestion(ctx):
+    with tempfile.TemporaryDirectory() as state_dir:
+        store = IncrementalStore(state_dir)
+        store.update(ctx["brut"], "v1")
+    ctx["snapshot"] = store.snapshot
+
+
+def etape_filtres(ctx):
+    df, cube = ctx["snapshot"].frame, ctx["snapshot"].cube
+    annees = sorted(df["Année"].unique())
+    annee = annees[-1]
+    statuts = df["Statut_traitement"].dropna().unique().tolist()
+    types = df["Type_depot"].unique().tolist()
+    index = FilterIndex(df)
+    ctx["rows"] = index.rows(sidebar_criteria(annee, types, statuts))
+    ctx["cube_filtre"] = cube.slice(annee, types, statuts)
+    ctx["durees_filtre"] = ctx["snapshot"].durees.slice(annee, types, statuts)
+
+
+def etape_agregations(ctx):
+    cube = ctx["cube_filtre"]
+    ctx["resume"] = community_summary(cube)
+    for dim in ["Type_depot", "Statut_traitement", "Nature_plainte", "Communaute"]:
+        cube.value_counts(dim)
+    ctx["durees_filtre"].duration_stats("Nature_plainte")
+
+
+def etape_carte(ctx):
+    geo = load_geo_assets(*ctx["gpkg"])
+    cols = ["Total_griefs", "Acheve", "En_cours", "Perdu_de_vue", "A_traiter"]
+    points = geo.points.merge(ctx["resume"], left_on="name", right_on="Communaute", how="left")
+    points[cols] = points[cols].fillna(0).astype(int)
+    m = folium.Map(location=[-0.7, 17], zoom_start=6, tiles="CartoDB dark_matter")
+    folium.GeoJson(geo.polygon_geojson, name="Domaine").add_to(m)
+    add_markers(m, points)
+    ctx["octets_carte"] = len(m.get_root().render())
+
+
+def etape_figures(ctx):
+    cube = ctx["cube_filtre"]
+    comm = cube.value_counts("Communaute").sort_values()
+    figs = [
+        build_nature(cube),
+        px.bar(x=comm.index, y=comm.values, title="Nombre total de griefs par communauté", template=BASE_TEMPLATE),
+    ]
+    ctx["octets_figures"] = sum(len(fig.to_json()) for fig in figs)
+
+
+def etape_tableau(ctx):
+    index = TableIndex(ctx["snapshot"].frame)
+    rows = index.search(ctx["rows"], "village_01", ["Communaute"])
+    rows = index.sort(rows, "Nb_jour", descending=True)
+    index.page(rows, 1, 50, list(ctx["snapshot"].frame.columns))
+
+
+ETAPES = {
+    "ingestion": etape_ingestion,
+    "filtres": etape_filtres,
+    "agrégations": etape_agregations,
+    "carte": etape_carte,
+    "figures": etape_figures,
+    "tableau": etape_tableau,
+}
+
+#==================================================================
+# ---------------------------- Mesures ----------------------------
+#==================================================================
+def chrono(etape, ctx, essais):
+    best = float("inf")
+    for _ in range(essais):
+        t0 = time.perf_counter()
+        etape(ctx)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def pic_memoire(etape, ctx):
+    tracemalloc.start()
+    try:
+        etape(ctx)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def mesurer(n_rows, args, workdir):
+    ctx = {
+        "brut": make_register(
+            n_rows, n_communities=args.communautes, start=args.debut, end=args.fin, n_natures=args.natures
+        ),
+    }
+    ctx["gpkg"] = make_geopackages(workdir, ctx["brut"]["Communaute"].unique())
+    resultats = {}
+    for nom, etape in ETAPES.items():
+        # L'ingestion à 1M de lignes dure plusieurs secondes : un seul essai
+        essais = 1 if nom == "ingestion" else ESSAIS
+        ms = chrono(etape, ctx, essais)
+        resultats[nom] = {"ms": round(ms, 2), "pic_mo": round(pic_memoire(etape, ctx), 2)}
+    return resultats
+
+
+def regressions(mesures, reference):
+    """Étapes au-delà des seuils par rapport à la référence."""
+    alertes = []
+    for taille, etapes in mesures.items():
+        for nom, m in etapes.items():
+            ref = reference.get(taille, {}).get(nom)
+            if ref is None:
+                continue
+            if m["ms"] > ref["ms"] * SEUIL_TEMPS and m["ms"] - ref["ms"] > ECART_MIN_MS:
+                alertes.append(f"{taille} lignes, {nom} : {m['ms']:.1f} ms (référence {ref['ms']:.1f} ms)")
+            if m["pic_mo"] > ref["pic_mo"] * SEUIL_MEMOIRE and m["pic_mo"] - ref["pic_mo"] > ECART_MIN_MO:
+                alertes.append(f"{taille} lignes, {nom} : {m['pic_mo']:.1f} Mo (référence {ref['pic_mo']:.1f} Mo)")
+    return alertes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suite de mesures GriefPy sans interface")
+    parser.add_argument("--tailles", type=int, nargs="+", default=TAILLES)
+    parser.add_argument("--communautes", type=int, default=40)
+    parser.add_argument("--natures", type=int, default=None)
+    parser.add_argument("--debut", default="2020-01-01")
+    parser.add_argument("--fin", default="2025-12-31")
+    parser.add_argument("--reference", default=REFERENCE)
+    parser.add_argument("--enregistrer", action="store_true")
+    args = parser.parse_args(argv)
+
+    mesures = {}
+    print(f"{'lignes':>9} | " + " | ".join(f"{nom:>20}" for nom in ETAPES))
+    for n_rows in args.tailles:
+        with tempfile.TemporaryDirectory() as workdir:
+            mesures[str(n_rows)] = mesurer(n_rows, args, workdir)
+        print(f"{n_rows:>9} | " + " | ".join(
+            f"{m['ms']:>9.1f} ms {m['pic_mo']:>6.1f} Mo" for m in mesures[str(n_rows)].values()
+        ))
+
+    print(f"\nRSS maximale du processus : {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} Mo")
+    if args.enregistrer:
+        # Les autres entrées (démarrage, cf. bench_startup.py) sont conservées
+        reference = {}
+        if os.path.exists(args.reference):
+            with open(args.reference, encoding="utf-8") as f:
+                reference = json.load(f)
+        reference.update(mesures)
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump(reference, f, indent=2, ensure_ascii=False)
+        print(f"Référence enregistrée : {args.reference}")
+        return 0
+    if not os.path.exists(args.reference):
+        print("Aucune référence : relancer avec --enregistrer pour fixer les seuils.")
+        return 0
+    with open(args.reference, encoding="utf-8") as f:
+        alertes = regressions(mesures, json.load(f))
+    for alerte in alertes:
+        print(f"RÉGRESSION {alerte}")
+    print(f"{len(alertes)} régression(s) (seuils : temps x{SEUIL_TEMPS}, mémoire x{SEUIL_MEMOIRE})")
+    return 1 if alertes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#*********************** Projet GriefPy ***************************
+#     Registre de griefs synthétique pour les mesures de perf.
+#******************************************************************
+"""Génère un registre au schéma de `cols_req` avec des valeurs plausibles."""
+import os
+
+import numpy as np
+import pandas as pd
+
+from griefpy.calendrier import prepare_calendar
+
+TYPES_DEPOT = ["Sur place", "Boite aux lettres", "3eme œil", "Agent FNC"]
+TYPES_POP = ["Bantou", "Autochtone", "Non nationale"]
+STATUTS = ["Achevé", "En cours", "Perdu de vue", "Grief non recevable", "A traiter"]
+NATURES = [
+    "Land and housing", "Local employment and supply chain", "Economic loss",
+    "Social conduct and security", "Nuisances / Environment", "Safety",
+]
+CATEGORIES = ["Statut PAP", "Réclam. Surface", "Changement de catégorie"]
+
+
+def make_register(n_rows, n_communities=40, start="2020-01-01", end="2025-12-31", seed=0, n_natures=None):
+    """Registre de `n_rows` griefs répartis sur `n_communities` communautés.
+
+    `n_natures` remplace les natures réelles (et leurs fréquences) par autant
+    de natures tirées uniformément.
+    """
+    rng = np.random.default_rng(seed)
+    communautes = [f"Village_{i:03d}" for i in range(n_communities)]
+    if n_natures is None:
+        natures, p_natures = NATURES, [0.8, 0.06, 0.06, 0.04, 0.02, 0.02]
+    else:
+        natures = (NATURES + [f"Nature_{i:03d}" for i in range(n_natures)])[:n_natures]
+        p_natures = None
+    jours = (pd.Timestamp(end) - pd.Timestamp(start)).days
+
+    def tirage(valeurs, p=None):
+        return np.asarray(valeurs, dtype=object)[rng.choice(len(valeurs), n_rows, p=p)]
+
+    df = pd.DataFrame({
+        "ID": np.arange(1, n_rows + 1),
+        "Type_depot": tirage(TYPES_DEPOT, [0.85, 0.07, 0.07, 0.01]),
+        "Type": tirage(TYPES_POP, [0.95, 0.04, 0.01]),
+        "Statut_traitement": tirage(STATUTS, [0.5, 0.25, 0.18, 0.05, 0.02]),
+        "Nature_plainte": tirage(natures, p_natures),
+        "Categorie": tirage(CATEGORIES),
+        "Date_reception": pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, jours, n_rows), unit="D"),
+        "Nb_jour": rng.gamma(1.5, 40, n_rows).astype(int),
+        "Communaute": tirage(communautes),
+        "Sexe": tirage(["F", "H"]),
+        "Classement": tirage(["NON", "OUI"], [0.95, 0.05]),
+    })
+    # Quelques valeurs manquantes, comme dans le registre réel
+    for col in ["Sexe", "Nature_plainte", "Type"]:
+        df.loc[rng.random(n_rows) < 0.01, col] = np.nan
+    return df
+
+
+def with_calendar(df):
+    """Ajoute les colonnes calendaires calculées par le dashboard."""
+    return prepare_calendar(df.copy())
+
+
+def make_geopackages(directory, communautes, seed=0):
+    """Écrit deux GeoPackages (boîtes aux lettres + limite) ; renvoie leurs chemins."""
+    import geopandas as gpd
+    from shapely.geometry import Point, box
+
+    rng = np.random.default_rng(seed)
+    lon = rng.uniform(15.8, 16.2, len(communautes))
+    lat = rng.uniform(-1.0, -0.6, len(communautes))
+    points = gpd.GeoDataFrame(
+        {"name": list(communautes)},
+        geometry=[Point(x, y) for x, y in zip(lon, lat)],
+        crs=4326,
+    ).to_crs(32733)
+    polygon = gpd.GeoDataFrame(
+        {"nom": ["Lefini"]},
+        geometry=[box(15.8, -1.0, 16.2, -0.6).buffer(0.01, 64)],
+        crs=4326,
+    ).to_crs(32733)
+
+    point_path = os.path.join(directory, "Boite_aux_lettres.gpkg")
+    polygon_path = os.path.join(directory, "lim_lefini.gpkg")
+    points.to_file(point_path)
+    polygon.to_file(polygon_path)
+    return point_path, polygon_path
@@ -0,0 +1,3 @@
+#*********************** Projet GriefPy ***************************
+#     Modules de calcul partagés par le dashboard GriefPy
+#******************************************************************
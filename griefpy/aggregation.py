@@ -0,0 +1,248 @@
+#*********************** Projet GriefPy ***************************
+#        Cube d'agrégats pré-calculé pour tout le dashboard
+#******************************************************************
+"""Cube de comptage creux sur les dimensions utilisées par le dashboard.
+
+Le cube est construit une seule fois par version des données : une cellule
+par combinaison observée des dimensions, avec le nombre de griefs et les
+mesures somme/effectif de `Nb_jour`. Chaque indicateur et chaque graphique
+est ensuite servi en découpant puis en sommant le cube, sans parcourir à
+nouveau les lignes brutes.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from griefpy.schema import canonical_text
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+CUBE_DIMS = [
+    "Année", "Trimestre", "Mois", "Type_depot", "Statut_traitement",
+    "Nature_plainte", "Type", "Sexe", "Communaute", "Classement",
+]
+# Dimension ajoutée par la consolidation multi-projets (cf. griefpy.consolidation)
+PROJECT_COL = "Projet"
+
+# Statuts comptés sur la carte -> colonne du résumé
+STATUT_COLS = {
+    "Achevé": "Acheve",
+    "En cours": "En_cours",
+    "Perdu de vue": "Perdu_de_vue",
+    "A traiter": "A_traiter",
+}
+SUMMARY_COLS = ["Total_griefs"] + list(STATUT_COLS.values())
+
+# Cartes d'indicateurs : statuts comptés dans chaque carte (hors total)
+KPI_STATUTS = {
+    "acheves": ["Achevé", "Grief non recevable"],
+    "en_cours": ["En cours", "Perdu de vue"],
+    "a_traiter": ["A traiter"],
+}
+Kpis = namedtuple("Kpis", ["total"] + list(KPI_STATUTS))
+
+# Valeurs textuelles assimilées à un statut manquant
+STATUT_VIDES = ["nan", "NaN", "None", ""]
+
+# Rang d'apparition stable d'une ligne (posé par l'ingestion incrémentale) ;
+# à défaut, la position de la ligne dans la table
+ORDER_COL = "_ordre"
+MEASURES = ["n", "nb_jour_sum", "nb_jour_count"]
+
+#==================================================================
+# ----------------------------- Cube ------------------------------
+#==================================================================
+class AggregateCube:
+    """Cellules du cube : dimensions + `n`, `nb_jour_sum`, `nb_jour_count`.
+
+    `premier` garde la position de la première ligne de chaque cellule pour
+    restituer l'ordre d'apparition (ordre des légendes et couleurs Plotly).
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @staticmethod
+    def _keys(df, dims):
+        keys = pd.DataFrame({dim: df[dim] for dim in dims})
+        # Communautés comparées sans casse ni espaces (carte et graphiques)
+        keys["Communaute"] = canonical_text(df["Communaute"], lower=True)
+        # Sommes en float64 même si `Nb_jour` est stocké réduit
+        keys["Nb_jour"] = pd.to_numeric(df["Nb_jour"], errors="coerce").astype("float64")
+        keys["_position"] = df[ORDER_COL].to_numpy() if ORDER_COL in df.columns else np.arange(len(df))
+        return keys
+
+    @classmethod
+    def _cells(cls, df, dims):
+        return (
+            cls._keys(df, dims).groupby(dims, dropna=False, observed=True, sort=True)
+            .agg(
+                n=("Nb_jour", "size"),
+                nb_jour_sum=("Nb_jour", "sum"),
+                nb_jour_count=("Nb_jour", "count"),
+                premier=("_position", "min"),
+            )
+            .reset_index()
+        )
+
+    @classmethod
+    def from_frame(cls, df, dims=CUBE_DIMS):
+        return cls(cls._cells(df, dims))
+
+    # --- Mise à jour incrémentale ---
+    def apply_delta(self, added, removed, table, dims=CUBE_DIMS):
+        """Cube mis à jour : lignes `added` ajoutées, lignes `removed` retranchées.
+
+        `table` est la table après mise à jour ; elle ne sert qu'à retrouver
+        la première ligne des cellules dont la première ligne a été retirée.
+        """
+        parts = [self.cells]
+        if len(added):
+            parts.append(self._cells(added, dims))
+        if len(removed):
+            retrait = self._cells(removed, dims)
+            retrait[MEASURES] = -retrait[MEASURES]
+            retrait["premier"] = np.nan
+            parts.append(retrait)
+        if len(parts) == 1:
+            return self
+        cells = (
+            _concat_aligned(parts).groupby(dims, dropna=False, observed=True, sort=True)
+            .agg(n=("n", "sum"), nb_jour_sum=("nb_jour_sum", "sum"),
+                 nb_jour_count=("nb_jour_count", "sum"), premier=("premier", "min"))
+            .reset_index()
+        )
+        cells = cells[cells["n"] > 0].reset_index(drop=True)
+
+        # Première ligne retirée : on la recherche parmi les lignes restantes
+        if len(removed):
+            perimes = cells["premier"].isin(removed[ORDER_COL])
+            if perimes.any():
+                stale = cells.loc[perimes, dims]
+                # Pré-sélection des lignes candidates sur les dimensions numériques
+                # (calendrier), rapides à comparer ; le reste par la jointure
+                candidats = np.ones(len(table), dtype=bool)
+                for dim in dims:
+                    if pd.api.types.is_numeric_dtype(table[dim].dtype):
+                        candidats &= table[dim].isin(stale[dim].unique()).to_numpy()
+                premiers = (
+                    self._keys(table[candidats], dims)
+                    .merge(stale, on=dims, how="inner")
+                    .groupby(dims, dropna=False, observed=True)["_position"].min()
+                    .rename("recalcule").reset_index()
+                )
+                cells = cells.merge(premiers, on=dims, how="left")
+                cells["premier"] = cells["recalcule"].fillna(cells["premier"])
+                cells = cells.drop(columns="recalcule")
+        cells["premier"] = cells["premier"].astype(self.cells["premier"].dtype)
+        return AggregateCube(cells)
+
+    # --- Découpe selon les filtres ---
+    def slice(self, annee=None, types=None, statuts=None, trimestre=None, projets=None):
+        """Sous-cube correspondant aux filtres (None = pas de filtre).
+
+        `projets` ne s'applique qu'à un cube consolidé (dimension `Projet`).
+        """
+        cells = self.cells
+        mask = np.ones(len(cells), dtype=bool)
+        if projets is not None and PROJECT_COL in cells.columns:
+            mask &= cells[PROJECT_COL].isin(projets).to_numpy()
+        if annee:
+            mask &= (cells["Année"] == annee).to_numpy()
+        if types is not None:
+            mask &= cells["Type_depot"].isin(types).to_numpy()
+        if statuts is not None:
+            mask &= cells["Statut_traitement"].isin(statuts).to_numpy()
+        if trimestre is not None:
+            mask &= (cells["Trimestre"] == trimestre).to_numpy()
+        return type(self)(cells[mask])
+
+    def where(self, dim, values):
+        """Sous-cube limité aux cellules dont `dim` est dans `values`."""
+        return type(self)(self.cells[self.cells[dim].isin(values)])
+
+    # --- Mesures ---
+    @property
+    def total(self):
+        return int(self.cells["n"].sum())
+
+    def count_where(self, dim, values):
+        return int(self.cells.loc[self.cells[dim].isin(values), "n"].sum())
+
+    def counts(self, dims, dropna=True, appearance=False):
+        """Nombre de griefs par combinaison de `dims` (équivaut à groupby().size()).
+
+        Avec `appearance=True`, les groupes suivent l'ordre d'apparition dans
+        les lignes brutes au lieu de l'ordre trié.
+        """
+        groups = self.cells.groupby(dims, dropna=dropna, observed=True, sort=True)
+        if not appearance:
+            return groups["n"].sum()
+        agg = groups.agg(n=("n", "sum"), premier=("premier", "min"))
+        return agg.sort_values("premier", kind="stable")["n"]
+
+    def value_counts(self, dim):
+        """Équivalent de `Series.value_counts()` sur la colonne brute."""
+        return self.counts(dim).sort_values(ascending=False)
+
+def _used_categories(values):
+    """Catégories effectivement présentes (comptage des codes, sans hachage)."""
+    values = pd.Categorical(values)
+    counts = np.bincount(values.codes + 1, minlength=len(values.categories) + 1)[1:]
+    return values.categories[counts > 0]
+
+
+def _recode(values, categories):
+    """`values` sur les catégories `categories` (les catégories inutilisées sont abandonnées)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.set_categories(categories)
+    return pd.Categorical(values, categories=categories)
+
+
+def _concat_aligned(frames):
+    """Concaténation qui conserve les colonnes catégorielles (catégories réunies).
+
+    Seules les catégories encore présentes sont gardées : le résultat a le
+    même type qu'une construction directe des mêmes lignes.
+    """
+    frames = list(frames)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            categories = _used_categories(frames[0][col])
+            for f in frames[1:]:
+                categories = categories.union(_used_categories(f[col]), sort=False)
+            categories = categories.sort_values()
+            frames = [f.assign(**{col: _recode(f[col], categories)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+#==================================================================
+# ------------------- Résumé pour la carte ------------------------
+#==================================================================
+def community_summary(cube):
+    """Résumé par communauté, calculé sur un cube déjà découpé par les filtres."""
+    cells = cube.cells[["Communaute", "Statut_traitement", "n"]]
+
+    # Un statut vide ne compte ni dans le total ni dans les colonnes de statut
+    statut = cells["Statut_traitement"].astype(object)
+    valide = statut.notna() & ~statut.isin(STATUT_VIDES)
+    n = cells["n"].to_numpy()
+
+    # Une colonne pondérée par statut, puis une seule somme groupée
+    parts = {"Total_griefs": np.where(valide, n, 0)}
+    for statut_val, col in STATUT_COLS.items():
+        parts[col] = np.where(statut == statut_val, n, 0)
+    summary = (
+        pd.DataFrame(parts, index=cells.index)
+        .groupby(cells["Communaute"], sort=True)
+        .sum()
+    )
+    return summary[SUMMARY_COLS].astype(int).reset_index()
+
+#==================================================================
+# -------------------------- Indicateurs --------------------------
+#==================================================================
+def kpi_counts(cube):
+    """Indicateurs des cartes (total, achevés, en cours, à traiter) d'un cube découpé."""
+    return Kpis(cube.total, *(cube.count_where("Statut_traitement", statuts) for statuts in KPI_STATUTS.values()))
@@ -0,0 +1,302 @@
+#*********************** Projet GriefPy ***************************
+#   API JSON des indicateurs, à côté du dashboard Streamlit
+#******************************************************************
+"""Indicateurs et agrégats du dashboard servis en JSON (sans Streamlit).
+
+Usage : python -m griefpy.api [--registre R | --manifeste M] [--hote H] [--port P]
+
+Routes (GET) :
+
+- /api/indicateurs : cartes total / acheves / en_cours / a_traiter ;
+- /api/comptes/<dimension> : griefs par Type_depot, Nature_plainte ou Communaute ;
+- /api/evolution?top=5 : griefs par mois, au total et pour les `top` natures
+  les plus fréquentes (courbe « Évolution temporelle ») ;
+- /api/agregats : tout ce qui précède en une réponse ;
+- /api/version : version des données et valeurs possibles des filtres.
+
+Filtres (paramètres répétables) : `annee`, `type`, `statut`, `projet`, avec
+la même règle que la barre latérale (`AggregateCube.slice`) : un filtre
+absent ne restreint rien, une année vide vaut toutes les années.
+
+Les réponses sont calculées sur le cube du `Snapshot` publié par le store
+(jamais de lecture du classeur ni de Plotly) et mémorisées par (version,
+route, filtres). L'ETag dérive de cette clé : une requête `If-None-Match`
+à jour reçoit un 304 sans aucun calcul. Le store est rafraîchi en tâche de
+fond par un `BackgroundRefresher`, comme dans le dashboard.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from griefpy.aggregation import PROJECT_COL, kpi_counts
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+API_HOST = "127.0.0.1"
+API_PORT = 8502
+API_CACHE_SIZE = 1024
+# Dimensions exposées par /api/comptes (graphiques du dashboard)
+COUNT_DIMS = ["Type_depot", "Nature_plainte", "Communaute"]
+# Natures de la courbe d'évolution (curseur « Top N natures » du dashboard)
+TOP_N = 5
+TOP_N_MAX = 50
+
+# Filtres normalisés (valeurs triées) ; None = pas de filtre
+Filtres = namedtuple("Filtres", ["annee", "types", "statuts", "projets"])
+ApiResponse = namedtuple("ApiResponse", ["status", "etag", "body"])
+
+
+class ApiError(ValueError):
+    """Requête refusée : `status` HTTP et message renvoyé au client."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+#==================================================================
+# ---------------------------- Filtres ----------------------------
+#==================================================================
+def _values(query, name):
+    values = query.get(name)
+    return None if values is None else tuple(sorted(set(values)))
+
+
+def parse_filters(query):
+    """Filtres de la barre latérale lus dans `query` (`parse_qs`)."""
+    annee = query.get("annee", [""])[-1]
+    try:
+        annee = int(annee) if annee else None
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Année invalide : {annee}") from None
+    return Filtres(annee, _values(query, "type"), _values(query, "statut"), _values(query, "projet"))
+
+
+def _jsonable(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return str(value)
+
+#==================================================================
+# ----------------------------- Agrégats --------------------------
+#==================================================================
+def count_payload(cube, dim):
+    """Griefs par valeur de `dim`, du plus fréquent au moins fréquent."""
+    return {str(k): int(v) for k, v in cube.value_counts(dim).items()}
+
+
+def trend_payload(cube, top_n=TOP_N):
+    """Griefs par mois : total et `top_n` natures les plus fréquentes (0 les mois sans grief)."""
+    total = cube.counts("Mois")
+    top_natures = cube.value_counts("Nature_plainte").nlargest(top_n).index
+    par_nature = cube.where("Nature_plainte", top_natures).counts(["Mois", "Nature_plainte"]).unstack(fill_value=0)
+    par_nature = par_nature.reindex(index=total.index, columns=top_natures, fill_value=0)
+    return {
+        "mois": [m.strftime("%Y-%m") for m in total.index],
+        "total": total.astype(int).tolist(),
+        "natures": {str(nature): par_nature[nature].astype(int).tolist() for nature in top_natures},
+    }
+
+
+def filter_values(cube):
+    """Valeurs possibles de chaque filtre (cellules du cube)."""
+    cells = cube.cells
+    values = {
+        "annee": sorted(cells["Année"].unique()),
+        "type": sorted(cells["Type_depot"].dropna().unique()),
+        "statut": sorted(cells["Statut_traitement"].dropna().unique()),
+    }
+    if PROJECT_COL in cells.columns:
+        values["projet"] = sorted(cells[PROJECT_COL].dropna().unique())
+    return values
+
+#==================================================================
+# ----------------------------- Service ---------------------------
+#==================================================================
+class AggregateService:
+    """Réponses JSON mémorisées par (version, route, filtres), LRU de `maxsize` entrées.
+
+    `store` : tout objet exposant le `Snapshot` publié (`IncrementalStore`,
+    `ConsolidatedStore`).
+    """
+
+    def __init__(self, store, maxsize=API_CACHE_SIZE):
+        self.store = store
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag(key):
+        return '"' + hashlib.sha1(repr(key).encode()).hexdigest()[:20] + '"'
+
+    def _payload(self, snapshot, route, filtres, top_n):
+        if route == "version":
+            return filter_values(snapshot.cube)
+        cube = snapshot.cube.slice(filtres.annee, filtres.types, filtres.statuts, projets=filtres.projets)
+        if route == "indicateurs":
+            return kpi_counts(cube)._asdict()
+        if route.startswith("comptes/"):
+            return count_payload(cube, route.split("/", 1)[1])
+        if route == "evolution":
+            return trend_payload(cube, top_n)
+        return {
+            "indicateurs": kpi_counts(cube)._asdict(),
+            "comptes": {dim: count_payload(cube, dim) for dim in COUNT_DIMS},
+            "evolution": trend_payload(cube, top_n),
+        }
+
+    @staticmethod
+    def _top_n(query):
+        try:
+            top_n = int(query.get("top", [TOP_N])[-1])
+        except ValueError:
+            top_n = 0
+        if not 1 <= top_n <= TOP_N_MAX:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"top doit être compris entre 1 et {TOP_N_MAX}")
+        return top_n
+
+    def get(self, route, query, if_none_match=None):
+        """`ApiResponse` de `route` ; 304 (corps vide) si `if_none_match` est à jour."""
+        if route not in ("version", "indicateurs", "evolution", "agregats") and not (
+            route.startswith("comptes/") and route.split("/", 1)[1] in COUNT_DIMS
+        ):
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Route inconnue : /api/{route}")
+        snapshot = self.store.snapshot
+        if snapshot is None:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "Données pas encore chargées")
+        filtres = parse_filters(query)
+        top_n = self._top_n(query) if route in ("evolution", "agregats") else None
+        key = (snapshot.version, route, filtres, top_n)
+        etag = self.etag(key)
+        if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+            return ApiResponse(HTTPStatus.NOT_MODIFIED, etag, b"")
+
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ApiResponse(HTTPStatus.OK, etag, body)
+        self.misses += 1
+        # Calcul hors verrou : deux requêtes identiques simultanées peuvent le faire en double
+        document = {
+            "version": snapshot.version,
+            "filtres": {k: v for k, v in filtres._asdict().items() if v is not None},
+            "donnees": self._payload(snapshot, route, filtres, top_n),
+        }
+        body = json.dumps(document, ensure_ascii=False, default=_jsonable).encode("utf-8")
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return ApiResponse(HTTPStatus.OK, etag, body)
+
+#==================================================================
+# ------------------------------ HTTP -----------------------------
+#==================================================================
+class ApiHandler(BaseHTTPRequestHandler):
+    """Requêtes GET `/api/...` ; le service est porté par le serveur (`server.service`)."""
+
+    # Connexions persistantes : indispensables à quelques centaines de requêtes/s ;
+    # sans Nagle, le corps écrit après les en-têtes part sans attendre l'ACK (~40 ms)
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if not url.path.startswith("/api/"):
+            return self._send_error(ApiError(HTTPStatus.NOT_FOUND, f"Route inconnue : {url.path}"))
+        try:
+            response = self.server.service.get(
+                url.path[len("/api/"):].strip("/"), parse_qs(url.query), self.headers.get("If-None-Match")
+            )
+        except ApiError as e:
+            return self._send_error(e)
+        self.send_response(response.status)
+        self.send_header("ETag", response.etag)
+        # Revalidation à chaque usage : une nouvelle version change l'ETag
+        self.send_header("Cache-Control", "no-cache")
+        if response.status == HTTPStatus.OK:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(response.body)))
+        self.end_headers()
+        self.wfile.write(response.body)
+
+    def _send_error(self, error):
+        body = json.dumps({"erreur": str(error)}, ensure_ascii=False).encode("utf-8")
+        self.send_response(error.status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Journal d'accès coupé : une ligne par requête ralentirait le service
+        pass
+
+
+def make_server(store, host=API_HOST, port=API_PORT):
+    """Serveur HTTP (un fil par connexion) des agrégats de `store` ; port 0 = port libre."""
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.service = AggregateService(store)
+    return server
+
+#==================================================================
+# ----------------------------- CLI -------------------------------
+#==================================================================
+def main(argv=None):
+    from griefpy.consolidation import ConsolidatedStore
+    from griefpy.incremental import INCREMENTAL_DIR, IncrementalStore, source_state_dir
+    from griefpy.refresh import REFRESH_INTERVAL, BackgroundRefresher
+    from griefpy.remote import RemoteFetcher
+
+    parser = argparse.ArgumentParser(description="API JSON des indicateurs du dashboard")
+    parser.add_argument("--registre", default=os.environ.get("GRIEFPY_EXCEL_URL"), help="classeur (chemin ou URL)")
+    parser.add_argument("--manifeste", default=os.environ.get("GRIEFPY_MANIFEST"), help="manifeste multi-projets")
+    parser.add_argument("--hote", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--intervalle", type=float,
+                        default=float(os.environ.get("GRIEFPY_REFRESH_SECONDS", REFRESH_INTERVAL)))
+    args = parser.parse_args(argv)
+    if not (args.registre or args.manifeste):
+        parser.error("--registre ou --manifeste (ou GRIEFPY_EXCEL_URL, GRIEFPY_MANIFEST)")
+
+    # Même état incrémental que le dashboard : un registre inchangé n'est pas relu
+    fetcher = RemoteFetcher()
+    source = args.manifeste or args.registre
+    if args.manifeste:
+        store = ConsolidatedStore(fetcher, INCREMENTAL_DIR)
+    else:
+        store = IncrementalStore(source_state_dir(source))
+    refresher = BackgroundRefresher(fetcher, store, source, interval=args.intervalle)
+    if store.snapshot is None:
+        refresher.poll()
+    refresher.start()
+
+    server = make_server(store, args.hote, args.port)
+    print(f"API GriefPy sur http://{args.hote}:{server.server_address[1]}/api/indicateurs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        refresher.stop(0)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#*********************** Projet GriefPy ***************************
+#     Dates de réception : analyse vectorisée + colonnes calendaires
+#******************************************************************
+"""Analyse de `Date_reception` et colonnes `Année`, `Trimestre`, `Mois`.
+
+Un classeur mêle souvent de vraies dates Excel, des numéros de série et des
+dates saisies en texte. Plutôt que de laisser pandas deviner le format
+élément par élément, chaque valeur distincte est analysée une seule fois :
+les textes avec des formats explicites essayés dans l'ordre de
+`DATE_FORMATS`, les nombres comme numéros de série Excel. Les colonnes
+calendaires sont calculées sur les seuls trimestres et mois distincts et
+stockées en types compacts (entier court, catégories, dates).
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+DATE_COL = "Date_reception"
+
+# Formats des dates saisies en texte, jour en premier comme dans le registre
+DATE_FORMATS = [
+    "%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%y",
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%m-%Y", "%d.%m.%Y",
+]
+
+# Numéros de série Excel (calendrier 1900) : origine et bornes plausibles
+EXCEL_ORIGIN = pd.Timestamp("1899-12-30")
+EXCEL_SERIAL_RANGE = (1, 2958465)
+
+# rows : lignes analysées ; coerced : valeurs non vides devenues NaT ;
+# missing : valeurs vides ; formats : {format ou nature: nombre de lignes}
+DateReport = namedtuple("DateReport", ["rows", "coerced", "missing", "formats"])
+
+#==================================================================
+# ---------------------- Analyse des dates ------------------------
+#==================================================================
+def _from_serials(values):
+    serials = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float, copy=True)
+    serials[(serials < EXCEL_SERIAL_RANGE[0]) | (serials > EXCEL_SERIAL_RANGE[1])] = np.nan
+    return EXCEL_ORIGIN + pd.to_timedelta(serials, unit="D")
+
+
+def parse_dates(values):
+    """Dates de `values` (Series) et rapport d'analyse `DateReport`."""
+    n_missing = int(values.isna().sum())
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values, DateReport(len(values), 0, n_missing, {"datetime": len(values) - n_missing})
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        dates = pd.Series(_from_serials(values.to_numpy()), index=values.index)
+        n_ok = int(dates.notna().sum())
+        return dates, DateReport(len(values), len(values) - n_missing - n_ok, n_missing, {"série Excel": n_ok})
+
+    # Chaque valeur distincte n'est analysée qu'une fois
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = pd.Series(np.asarray(uniques, dtype=object))
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[us]")
+    kinds = pd.Series(None, index=uniques.index, dtype=object)
+
+    is_date = uniques.map(lambda v: hasattr(v, "year"))
+    is_num = uniques.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool))
+    if is_date.any():
+        parsed[is_date] = pd.to_datetime(uniques[is_date].tolist(), errors="coerce")
+        kinds[is_date] = "datetime"
+    if is_num.any():
+        parsed[is_num] = _from_serials(uniques[is_num].to_numpy())
+        kinds[is_num] = "série Excel"
+
+    texts = uniques[~is_date & ~is_num].astype(str).str.strip()
+    # Colonne mixte convertie en texte à l'ingestion : numéros de série en texte
+    serial = texts.str.fullmatch(r"\d{5}(\.\d+)?")
+    if serial.any():
+        parsed[serial[serial].index] = _from_serials(texts[serial].to_numpy())
+        kinds[serial[serial].index] = "série Excel"
+        texts = texts[~serial]
+    for fmt in DATE_FORMATS:
+        if texts.empty:
+            break
+        essai = pd.to_datetime(texts, format=fmt, errors="coerce")
+        ok = essai.notna()
+        parsed[ok[ok].index] = essai[ok]
+        kinds[ok[ok].index] = fmt
+        texts = texts[~ok]
+    if not texts.empty:
+        # Derniers recours (formats imprévus) : inférence, sur les seules valeurs restantes
+        essai = pd.to_datetime(texts, errors="coerce", dayfirst=True, format="mixed")
+        ok = essai.notna()
+        parsed[ok[ok].index] = essai[ok]
+        kinds[ok[ok].index] = "autre"
+    kinds[parsed.isna()] = None
+
+    dates = pd.Series(parsed.to_numpy()[codes], index=values.index)
+    dates[codes < 0] = pd.NaT
+    rows_kind = pd.Series(kinds.to_numpy()[codes[codes >= 0]]).value_counts()
+    n_ok = int(dates.notna().sum())
+    return dates, DateReport(len(values), len(values) - n_missing - n_ok, n_missing, rows_kind.to_dict())
+
+
+def calendar_columns(dates):
+    """`Année` (int16), `Trimestre` ("2024Q1", catégorie) et `Mois` (1er du mois).
+
+    Chaque trimestre et chaque mois distinct n'est formaté qu'une fois ; `Mois`
+    reste une date (axe temporel des graphiques).
+    """
+    annee = dates.dt.year.to_numpy()
+    mois = dates.dt.month.to_numpy()
+
+    trimestres, t_codes = np.unique(annee * 4 + (mois - 1) // 3, return_inverse=True)
+    labels = [f"{t // 4}Q{t % 4 + 1}" for t in trimestres]
+    mois_uniques, m_codes = np.unique(annee * 12 + mois - 1, return_inverse=True)
+    debuts = pd.to_datetime({"year": mois_uniques // 12, "month": mois_uniques % 12 + 1, "day": 1})
+    return pd.DataFrame({
+        "Année": annee.astype("int16"),
+        "Trimestre": pd.Categorical.from_codes(t_codes, labels),
+        "Mois": debuts.to_numpy()[m_codes],
+    }, index=dates.index)
+
+
+def prepare_calendar(df):
+    """Date de réception analysée, lignes sans date écartées, colonnes calendaires.
+
+    Le rapport d'analyse est rangé dans `df.attrs["dates"]`.
+    """
+    if DATE_COL not in df.columns:
+        return df
+    dates, report = parse_dates(df[DATE_COL])
+    df[DATE_COL] = dates
+    df = df[dates.notna().to_numpy()].copy()
+    for col, values in calendar_columns(df[DATE_COL]).items():
+        df[col] = values
+    df.attrs["dates"] = report
+    return df
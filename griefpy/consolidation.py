@@ -0,0 +1,246 @@
+#*********************** Projet GriefPy ***************************
+#   Consolidation multi-projets : un registre par projet, fusionnés
+#******************************************************************
+"""Registres de plusieurs projets décrits par un manifeste, publiés fusionnés.
+
+Le manifeste (JSON) liste les projets et leurs sources, chemins locaux ou
+URL ; un chemin relatif part du dossier du manifeste :
+
+    {"projets": [
+        {"nom": "Lefini", "registre": "Lefini/Table_MGG.xlsx",
+         "boites": "Lefini/Boite_aux_lettres.gpkg", "limite": "Lefini/limite.gpkg"}
+    ]}
+
+Chaque registre a son propre store incrémental (même dossier d'état que le
+mode source unique) : un classeur inchangé n'est ni relu ni retypé. Les
+sources sont revalidées et hachées en parallèle (fils : réseau, disque et
+SHA-256 libèrent le GIL), les classeurs modifiés analysés dans un pool de
+processus (openpyxl ne libère pas le GIL), puis les tables publiées sont
+concaténées avec une colonne `Projet` et les cubes (et histogrammes des
+durées) réunis sans repasser sur les lignes, `Projet` devenant une
+dimension du cube.
+"""
+import json
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+from griefpy.aggregation import PROJECT_COL, AggregateCube, _concat_aligned
+from griefpy.durees import DurationSketches
+from griefpy.incremental import INCREMENTAL_DIR, IncrementalStore, RefreshStats, Snapshot, source_state_dir
+from griefpy.ingestion import REQUIRED_COLS, MissingColumnsError, content_hash, read_source_bytes, read_workbook
+from griefpy.remote import RemoteFetchError
+from griefpy.schema import MemoryReport
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+MAX_WORKERS = 4
+
+# boites / limite : GeoPackages de la carte (None si absents)
+Project = namedtuple("Project", ["name", "registre", "boites", "limite"])
+
+# version : version du registre ; missing_cols : colonnes requises absentes ;
+# error : message si le projet n'a pas pu être chargé ; offline : copie locale servie
+ProjectResult = namedtuple("ProjectResult", ["project", "version", "stats", "missing_cols", "error", "offline"])
+
+#==================================================================
+# --------------------------- Manifeste ---------------------------
+#==================================================================
+def _resolve(source, base_dir):
+    if not source or urlparse(source).scheme.startswith("http") or os.path.isabs(source):
+        return source
+    return os.path.join(base_dir, source)
+
+
+def load_manifest(path):
+    """Projets du manifeste `path` ; ValueError si le manifeste est invalide."""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f).get("projets")
+    if not entries:
+        raise ValueError(f"Manifeste sans projet : {path}")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    projects = []
+    for entry in entries:
+        if not entry.get("nom") or not entry.get("registre"):
+            raise ValueError(f"Projet sans « nom » ou « registre » dans {path} : {entry}")
+        projects.append(Project(
+            entry["nom"], _resolve(entry["registre"], base_dir),
+            _resolve(entry.get("boites"), base_dir), _resolve(entry.get("limite"), base_dir),
+        ))
+    noms = [p.name for p in projects]
+    if len(set(noms)) != len(noms):
+        raise ValueError(f"Noms de projets en double dans {path} : {noms}")
+    return projects
+
+def _constant(value, n):
+    """Colonne catégorielle d'une seule valeur (un octet par ligne)."""
+    return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[value])
+
+def _attempt(func, *args):
+    """Résultat de `func(*args)`, ou l'exception levée (un projet n'arrête pas les autres)."""
+    try:
+        return func(*args)
+    except Exception as e:
+        return e
+
+
+def _message(error):
+    return f"{type(error).__name__} : {error}"
+
+#==================================================================
+# ---------------------------- Store ------------------------------
+#==================================================================
+class ConsolidatedStore:
+    """Stores incrémentaux des projets d'un manifeste et `Snapshot` fusionné.
+
+    S'utilise comme un `IncrementalStore` (attribut `snapshot`, méthode
+    `refresh`), notamment par le `BackgroundRefresher`.
+    """
+
+    def __init__(self, fetcher, state_dir=INCREMENTAL_DIR, required_cols=REQUIRED_COLS, max_workers=MAX_WORKERS):
+        self.fetcher = fetcher
+        self.state_dir = state_dir
+        self.required_cols = list(required_cols)
+        self.max_workers = max_workers
+        self.projects = []
+        self.results = {}
+        self.stores = {}
+        self.version = None
+        self.snapshot = None
+        self._lock = threading.Lock()
+
+    def store_for(self, project):
+        """Store du registre de `project` (même dossier que le mode source unique)."""
+        with self._lock:
+            store = self.stores.get(project.registre)
+            if store is None:
+                store = self.stores[project.registre] = IncrementalStore(
+                    source_state_dir(project.registre, self.state_dir), required_cols=self.required_cols
+                )
+            return store
+
+    def _fetch_project(self, project):
+        """Revalide les sources du projet ; octets du registre s'il a changé (sinon None)."""
+        registre = self.fetcher.fetch(project.registre)
+        store = self.store_for(project)
+        data = read_source_bytes(registre.path)
+        version = content_hash(data)
+        # GeoPackages revalidés ici aussi : la carte ne lit que les copies locales
+        geo = [self.fetcher.fetch(url) for url in (project.boites, project.limite) if url]
+        offline = any(r.status == "offline" for r in [registre] + geo)
+        return store, version, data if version != store.version else None, offline
+
+    def _read_changed(self, datas):
+        """Registres bruts des classeurs modifiés ; exception à la place d'un classeur illisible.
+
+        L'analyse openpyxl est du Python pur (GIL) : plusieurs classeurs
+        modifiés sont lus dans des processus (démarrés par `spawn`, sûrs
+        dans un serveur multi-fils) s'il y a plusieurs cœurs ; sinon ici.
+        """
+        n_proc = min(self.max_workers, len(datas), os.cpu_count() or 1)
+        if n_proc <= 1:
+            return [_attempt(read_workbook, data) for data in datas]
+        with ProcessPoolExecutor(n_proc, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(read_workbook, data) for data in datas]
+            return [_attempt(future.result) for future in futures]
+
+    def _update_project(self, project, fetched, raw):
+        if isinstance(fetched, Exception):
+            return ProjectResult(project.name, None, None, [], _message(fetched), False)
+        store, version, _, offline = fetched
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            stats = store.update(raw, version) if raw is not None else RefreshStats(
+                version, "unchanged", 0, 0, 0, len(store.table)
+            )
+            missing = [col for col in self.required_cols if col not in store.snapshot.frame.columns]
+            return ProjectResult(project.name, stats.version, stats, missing, None, offline)
+        except MissingColumnsError as e:
+            return ProjectResult(project.name, None, None, e.missing, None, offline)
+        except Exception as e:
+            return ProjectResult(project.name, None, None, [], _message(e), offline)
+
+    def refresh(self, manifest):
+        """Recharge les projets du manifeste en parallèle ; publie la fusion si elle a changé.
+
+        Les projets en erreur ou incomplets sont écartés de la fusion (voir
+        `results`). Lève RemoteFetchError, après publication, si une source
+        n'a pu être revalidée ou si aucun projet n'est exploitable.
+        """
+        projects = load_manifest(manifest)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(projects)))) as pool:
+            # Revalidation et hachage en parallèle (réseau, disque, SHA-256 hors GIL)
+            fetched = list(pool.map(lambda p: _attempt(self._fetch_project, p), projects))
+            changed = [i for i, f in enumerate(fetched) if not isinstance(f, Exception) and f[2] is not None]
+            raws = [None] * len(projects)
+            for i, raw in zip(changed, self._read_changed([fetched[i][2] for i in changed])):
+                raws[i] = raw
+            # Deltas appliqués en parallèle, un store par projet
+            results = list(pool.map(self._update_project, projects, fetched, raws))
+        valides = [(p, r) for p, r in zip(projects, results) if r.error is None and not r.missing_cols]
+        version = content_hash(
+            json.dumps([[p.name, r.version] for p, r in valides]).encode()
+        ) if valides else None
+
+        with self._lock:
+            self.projects = projects
+            self.results = {r.project: r for r in results}
+            mode = "unchanged" if version == self.version else "delta" if self.version else "full"
+            if version != self.version:
+                self.version = version
+                self.snapshot = self._merge(valides, version) if valides else None
+
+        if not valides:
+            raise RemoteFetchError("Aucun projet exploitable : " + " ; ".join(
+                f"{r.project} ({r.error or 'colonnes manquantes : ' + ', '.join(r.missing_cols)})" for r in results
+            ))
+        hors_ligne = [r.project for r in results if r.offline]
+        if hors_ligne:
+            raise RemoteFetchError(f"Source injoignable : projet(s) {', '.join(hors_ligne)}")
+        rows = len(self.snapshot.frame)
+        return RefreshStats(
+            version, mode,
+            *(sum(getattr(r.stats, attr) for _, r in valides) for attr in ("added", "modified", "deleted")),
+            rows,
+        )
+
+    def _merge(self, valides, version):
+        """Tables publiées des projets concaténées (colonne `Projet`) et cubes réunis."""
+        frames, cells, durees, offset = [], [], [], 0
+        sans_date, avant, apres = 0, 0, 0
+        for project, _ in valides:
+            snapshot = self.stores[project.registre].snapshot
+            frame = snapshot.frame.copy(deep=False)
+            frame.insert(0, PROJECT_COL, _constant(project.name, len(frame)))
+            frames.append(frame)
+            # Rang d'apparition décalé : les lignes d'un projet suivent celles du précédent
+            part = snapshot.cube.cells.copy(deep=False)
+            part.insert(0, PROJECT_COL, _constant(project.name, len(part)))
+            cells.append(part.assign(premier=part["premier"] + offset))
+            offset += int(part["premier"].max()) + 1 if len(part) else 0
+            part = snapshot.durees.cells.copy(deep=False)
+            part.insert(0, PROJECT_COL, _constant(project.name, len(part)))
+            durees.append(part)
+            sans_date += frame.attrs.get("sans_date", 0)
+            memoire = frame.attrs.get("memoire")
+            if memoire:
+                avant, apres = avant + memoire.before, apres + memoire.after
+
+        # Colonnes propres à certains classeurs : vides pour les autres projets
+        columns = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+        frame = _concat_aligned([f.reindex(columns=columns) for f in frames])
+        frame.attrs.update({
+            "version": version, "sans_date": sans_date,
+            "memoire": MemoryReport(avant, apres), "projets": [p.name for p, _ in valides],
+        })
+        return Snapshot(
+            version, frame, AggregateCube(_concat_aligned(cells)), DurationSketches(_concat_aligned(durees))
+        )
@@ -0,0 +1,157 @@
+#*********************** Projet GriefPy ***************************
+#   Durées de traitement : histogrammes fusionnables de `Nb_jour`
+#******************************************************************
+"""Quantiles (p50/p90/p99) et taux de dépassement du délai cible de `Nb_jour`.
+
+Pour chaque cellule des dimensions filtrables (`DURATION_DIMS` : filtres de
+la barre latérale, trimestre, nature, communauté), on garde l'histogramme
+des durées : une ligne par (cellule, classe) avec son effectif. Les classes sont
+exactes en jours jusqu'à `EXACT_MAX_DAYS` (une durée non entière est
+arrondie au jour supérieur, une durée négative ramenée à 0), puis
+logarithmiques à `RELATIVE_ERROR` près au-delà.
+
+Les histogrammes se fusionnent par simple somme des effectifs : tout
+découpage des filtres (`slice`, `where`, hérités du cube) donne les
+quantiles sans relire les lignes. Contrairement à un t-digest ou un KLL,
+ils se soustraient aussi : les lignes modifiées ou supprimées d'une version
+à l'autre en sont retranchées (mise à jour incrémentale).
+"""
+import numpy as np
+import pandas as pd
+
+from griefpy.aggregation import AggregateCube, _concat_aligned
+from griefpy.schema import canonical_text
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+# Sous-ensemble des dimensions du cube : moins de cellules que le cube complet
+DURATION_DIMS = ["Année", "Trimestre", "Type_depot", "Statut_traitement", "Nature_plainte", "Communaute"]
+EXACT_MAX_DAYS = 730
+RELATIVE_ERROR = 0.01
+GAMMA = (1 + RELATIVE_ERROR) / (1 - RELATIVE_ERROR)
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+# Délai de traitement cible par défaut (jours)
+SLA_DAYS = 30
+
+BUCKET_COL = "classe"
+
+#==================================================================
+# ---------------------------- Classes ----------------------------
+#==================================================================
+def bucket_of(values):
+    """Classe de chaque durée (entier) ; -1 pour une durée manquante."""
+    values = np.asarray(values, dtype="float64")
+    buckets = np.full(len(values), -1, dtype="int64")
+    ok = ~np.isnan(values)
+    jours = np.ceil(np.clip(values[ok], 0, None))
+    long = jours > EXACT_MAX_DAYS
+    jours[long] = EXACT_MAX_DAYS + np.ceil(np.log(jours[long] / EXACT_MAX_DAYS) / np.log(GAMMA))
+    buckets[ok] = jours.astype("int64")
+    return buckets
+
+
+def bucket_value(buckets):
+    """Durée représentative de chaque classe (exacte jusqu'à `EXACT_MAX_DAYS`)."""
+    buckets = np.asarray(buckets, dtype="float64")
+    # Milieu relatif de la classe logarithmique ]γ^(j-1), γ^j] : erreur ≤ RELATIVE_ERROR
+    log = EXACT_MAX_DAYS * GAMMA ** (buckets - EXACT_MAX_DAYS) * 2 / (1 + GAMMA)
+    return np.where(buckets > EXACT_MAX_DAYS, log, buckets)
+
+#==================================================================
+# -------------------------- Histogrammes -------------------------
+#==================================================================
+class DurationSketches(AggregateCube):
+    """Cellules : `DURATION_DIMS` + `classe` + `n` (durées dans la classe).
+
+    Découpé par les mêmes filtres que le cube (`slice`, `where`).
+    """
+
+    @classmethod
+    def from_frame(cls, df, dims=DURATION_DIMS):
+        return cls(cls._cells(df, dims))
+
+    @classmethod
+    def _cells(cls, df, dims):
+        keys = pd.DataFrame({dim: df[dim] for dim in dims})
+        keys["Communaute"] = canonical_text(df["Communaute"], lower=True)
+        keys[BUCKET_COL] = bucket_of(pd.to_numeric(df["Nb_jour"], errors="coerce"))
+        keys = keys[keys[BUCKET_COL] >= 0]
+        return (
+            keys.groupby(dims + [BUCKET_COL], dropna=False, observed=True, sort=True)
+            .size().rename("n").reset_index()
+        )
+
+    # --- Mise à jour incrémentale ---
+    def apply_delta(self, added, removed, table=None, dims=DURATION_DIMS):
+        """Histogrammes mis à jour : lignes `added` ajoutées, lignes `removed` retranchées."""
+        parts = [self.cells]
+        if len(added):
+            parts.append(self._cells(added, dims))
+        if len(removed):
+            retrait = self._cells(removed, dims)
+            retrait["n"] = -retrait["n"]
+            parts.append(retrait)
+        if len(parts) == 1:
+            return self
+        cells = (
+            _concat_aligned(parts).groupby(dims + [BUCKET_COL], dropna=False, observed=True, sort=True)["n"]
+            .sum().reset_index()
+        )
+        return DurationSketches(cells[cells["n"] > 0].reset_index(drop=True))
+
+    # --- Mesures ---
+    def _histograms(self, dim):
+        """Effectifs par (valeur de `dim`, classe), classes croissantes dans chaque groupe."""
+        if dim is None:
+            hist = self.cells.groupby(BUCKET_COL, sort=True)["n"].sum()
+            return pd.Index([None]), np.zeros(len(hist), dtype="int64"), hist.index.to_numpy(), hist.to_numpy()
+        hist = self.cells.groupby([dim, BUCKET_COL], observed=True, sort=True)["n"].sum()
+        hist = hist[hist > 0]
+        groups, codes = np.unique(hist.index.codes[0], return_inverse=True)
+        return (hist.index.levels[0][groups].rename(dim), codes,
+                hist.index.get_level_values(BUCKET_COL).to_numpy(), hist.to_numpy())
+
+    @staticmethod
+    def _stats(codes, buckets, counts, quantiles, sla_days):
+        """Quantiles, dépassements et effectifs de chaque groupe (un seul passage vectorisé)."""
+        cumul = counts.cumsum()
+        debuts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype="int64")
+        base = np.where(debuts > 0, cumul[debuts - 1], 0)
+        totaux = np.add.reduceat(counts, debuts) if len(debuts) else np.array([], dtype="int64")
+        # Rang le plus proche : première classe dont l'effectif cumulé atteint ceil(q × n)
+        rangs = np.maximum(np.ceil(np.outer(totaux, list(quantiles.values()))), 1)
+        positions = np.searchsorted(cumul, base[:, None] + rangs)
+        # Classes au-delà de celle du délai : exact jusqu'à EXACT_MAX_DAYS, à RELATIVE_ERROR près ensuite
+        seuil = bucket_of([sla_days])[0]
+        depasse = np.add.reduceat(np.where(buckets > seuil, counts, 0), debuts) if len(debuts) else totaux
+        return bucket_value(buckets[positions]), depasse / totaux, totaux
+
+    def duration_stats(self, dim=None, sla_days=SLA_DAYS, quantiles=QUANTILES):
+        """Quantiles (colonnes `quantiles`), taux de dépassement de `sla_days` et effectif de
+        durées, par valeur de `dim` ou globaux (`dim=None` : une ligne).
+
+        Rang le plus proche : la plus petite durée dont la fréquence cumulée
+        atteint q (`np.quantile(..., method="inverted_cdf")`).
+        """
+        index, codes, buckets, counts = self._histograms(dim)
+        if not counts.sum():
+            index = index[:0]
+        valeurs, depassement, totaux = self._stats(codes, buckets, counts, quantiles, sla_days)
+        stats = pd.DataFrame(valeurs, columns=list(quantiles), index=index, dtype="float64")
+        stats["depassement"] = depassement
+        stats["n"] = totaux
+        return stats
+
+    def quantiles(self, dim=None, quantiles=QUANTILES):
+        """Quantiles de `Nb_jour`, par valeur de `dim` ou globaux (Series)."""
+        stats = self.duration_stats(dim, quantiles=quantiles)[list(quantiles)]
+        return stats.iloc[0] if dim is None and len(stats) else stats
+
+    def breach_rate(self, sla_days=SLA_DAYS, dim=None):
+        """Part des durées supérieures à `sla_days` (jours), par valeur de `dim` ou globale."""
+        stats = self.duration_stats(dim, sla_days)["depassement"]
+        if dim is None:
+            return float(stats.iloc[0]) if len(stats) else np.nan
+        return stats
@@ -0,0 +1,103 @@
+#*********************** Projet GriefPy ***************************
+#      Cache LRU des figures Plotly (données, filtres, thème)
+#******************************************************************
+"""Figures Plotly mémorisées entre les relances et les sessions.
+
+Une figure de base (agrégats + Plotly Express, sans couleurs de thème) est
+construite une fois par clé `(version des données, filtres, figure,
+paramètres)`. Le thème n'est qu'un correctif de mise en page appliqué sur une
+copie, elle aussi gardée en cache : basculer Clair/Sombre ou le plein écran ne
+relance donc jamais Plotly Express.
+
+Plotly n'est importé qu'à la première figure mise aux couleurs du thème.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+FIGURE_CACHE_SIZE = 256
+
+# Gabarit des figures de base : Plotly Express y lit les couleurs des traces
+# au moment de la construction (même palette que plotly_white/plotly_dark) ;
+# le défaut global ne convient pas, Streamlit le remplace par le sien
+BASE_TEMPLATE = "plotly"
+
+# Couleurs dépendant du thème (cf. « Apparence / Thème » du dashboard)
+FigureTheme = namedtuple("FigureTheme", ["template", "bg_color", "font_color"])
+
+
+def filter_key(version, annee, types, statuts, projets=None):
+    """Clé stable des filtres de la barre latérale (ordre de sélection ignoré)."""
+    key = (version, annee, frozenset(map(str, types)), frozenset(map(str, statuts)))
+    return key if projets is None else key + (frozenset(map(str, projets)),)
+
+
+def apply_theme(base, theme):
+    """Copie de `base` aux couleurs de `theme` (gabarit, fonds, police, titre)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(base)
+    fig.update_layout(
+        template=theme.template,
+        title_font=dict(color=theme.font_color, size=18),
+        plot_bgcolor=theme.bg_color, paper_bgcolor=theme.bg_color,
+        font=dict(color=theme.font_color)
+    )
+    return fig
+
+#==================================================================
+# ----------------------------- Cache -----------------------------
+#==================================================================
+class FigureCache:
+    """LRU commun aux figures de base et à leurs variantes thémées.
+
+    Les figures renvoyées sont partagées : elles ne doivent pas être modifiées
+    (`st.plotly_chart` n'en lit qu'une copie).
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        with self._lock:
+            fig = self._entries.get(key)
+            if fig is not None:
+                self._entries.move_to_end(key)
+            return fig
+
+    def _store(self, key, fig):
+        with self._lock:
+            self._entries[key] = fig
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key, build, theme):
+        """Figure thémée pour `key` ; `build()` n'est appelé que sans figure de base."""
+        fig = self._lookup(("theme", key, theme))
+        if fig is not None:
+            self.hits += 1
+            return fig
+        self.misses += 1
+        base = self._lookup(("base", key))
+        if base is None:
+            # Construction hors verrou : deux sessions peuvent bâtir la même
+            # figure en parallèle, la dernière écrite est conservée
+            base = build()
+            self._store(("base", key), base)
+        fig = apply_theme(base, theme)
+        self._store(("theme", key, theme), fig)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
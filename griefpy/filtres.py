@@ -0,0 +1,79 @@
+#*********************** Projet GriefPy ***************************
+#       Index bitmap des filtres de la barre latérale
+#******************************************************************
+"""Bitmaps de lignes par valeur pour Année, Type_depot et Statut_traitement.
+
+L'index est construit une fois par version des données. Une combinaison de
+filtres se résout par OU binaire entre les valeurs d'une même dimension puis
+ET binaire entre dimensions, sur des bitmaps compactés (1 bit par ligne) ;
+les consommateurs reçoivent un tableau de positions et ne copient que les
+lignes dont ils ont besoin.
+"""
+import numpy as np
+import pandas as pd
+
+from griefpy.aggregation import PROJECT_COL
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+FILTER_DIMS = ["Année", "Type_depot", "Statut_traitement"]
+
+# Clé commune à toutes les valeurs manquantes (NaN, None, pd.NA)
+_NA = object()
+
+
+def _key(value):
+    return _NA if pd.isna(value) else value
+
+#==================================================================
+# ----------------------------- Index -----------------------------
+#==================================================================
+class FilterIndex:
+    """Bitmaps compactés `{dimension: {valeur: uint8[]}}` sur les lignes de `df`."""
+
+    def __init__(self, df, dims=None):
+        if dims is None:
+            # Table consolidée : le projet est aussi un filtre
+            dims = FILTER_DIMS + [PROJECT_COL] if PROJECT_COL in df.columns else FILTER_DIMS
+        self.n_rows = len(df)
+        self._bitmaps = {}
+        for dim in dims:
+            codes, uniques = pd.factorize(df[dim], use_na_sentinel=True)
+            bitmaps = {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+            if (codes == -1).any():
+                bitmaps[_NA] = np.packbits(codes == -1)
+            self._bitmaps[dim] = bitmaps
+        self._all = np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def mask(self, criteria):
+        """Bitmap des lignes retenues ; `criteria` = {dimension: valeurs}."""
+        mask = self._all.copy()
+        for dim, values in criteria.items():
+            if values is None:
+                continue
+            if np.isscalar(values):
+                values = [values]
+            bitmaps = self._bitmaps[dim]
+            dim_mask = np.zeros_like(mask)
+            for value in values:
+                bitmap = bitmaps.get(_key(value))
+                if bitmap is not None:
+                    dim_mask |= bitmap
+            mask &= dim_mask
+        return mask
+
+    def rows(self, criteria):
+        """Positions (croissantes) des lignes retenues, à passer à `df.iloc`/`take`."""
+        return np.flatnonzero(np.unpackbits(self.mask(criteria), count=self.n_rows))
+
+
+def sidebar_criteria(annee, types, statuts, projets=None):
+    """Critères de la barre latérale (une année vide = toutes les années).
+
+    `projets` (table consolidée) : None = tous les projets.
+    """
+    criteria = {"Année": annee or None, "Type_depot": types, "Statut_traitement": statuts}
+    if projets is not None:
+        criteria[PROJECT_COL] = projets
+    return criteria
@@ -0,0 +1,248 @@
+#*********************** Projet GriefPy ***************************
+#    Couches géographiques : boîtes à griefs et limite du projet
+#******************************************************************
+"""Lecture, reprojection et sérialisation des GeoPackages du projet.
+
+Les couches lues (reprojetées, limite pré-sérialisée en GeoJSON) sont gardées
+par `GeoCache` avec pour clé le chemin et l'empreinte du fichier renvoyés par
+`RemoteFetcher` : aucune relance n'a à refaire la lecture GDAL ni la
+reprojection tant que les fichiers sont inchangés.
+
+Les marqueurs des communautés sont rendus soit en une seule couche
+`FastMarkerCluster` (comptes par statut transmis comme propriétés, popup
+construit dans le navigateur), soit marqueur par marqueur (mode détaillé).
+"""
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+
+import folium
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement, Template
+from folium.plugins import FastMarkerCluster, MarkerCluster
+
+from griefpy.aggregation import SUMMARY_COLS, community_summary
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+# Écart maximal (degrés, ~1 km) entre un clic et le marqueur retenu
+CLICK_TOLERANCE = 0.01
+
+GeoAssets = namedtuple("GeoAssets", ["points", "polygon", "polygon_geojson"])
+
+# Modes de rendu des marqueurs (libellé affiché -> clé)
+MARKER_MODES = {"Rapide (couche unique)": "fast", "Détaillé (un marqueur par point)": "detail"}
+
+# Vue initiale de la carte (République du Congo)
+MAP_CENTER, MAP_ZOOM = [-0.7, 17], 6
+
+# Propriétés transmises au navigateur pour chaque communauté
+MARKER_PROPS = ["Communaute", "Total_griefs", "Acheve", "En_cours", "Perdu_de_vue", "A_traiter"]
+
+# Marqueur + popup construits côté client à partir des propriétés
+_MARKER_CALLBACK = """function (row) {
+    var p = row[2];
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 6, color: "white", fill: true, fillColor: p.couleur, fillOpacity: 0.9
+    });
+    marker.bindPopup(function () {
+        return "<b>Communauté :</b> " + p.Communaute + "<br>"
+            + "<b>Total griefs :</b> " + p.Total_griefs + "<br>"
+            + "<b>Achevé :</b> " + p.Acheve + "<br>"
+            + "<b>En cours :</b> " + p.En_cours + "<br>"
+            + "<b>Perdu de vue :</b> " + p.Perdu_de_vue + "<br>"
+            + "<b>A traiter :</b> " + p.A_traiter;
+    }, {maxWidth: 250});
+    return marker;
+}"""
+
+#==================================================================
+# ---------------------------- Lecture ----------------------------
+#==================================================================
+def load_points(path):
+    """Boîtes à griefs en WGS84 avec noms normalisés pour la jointure."""
+    points = gpd.read_file(path).to_crs(epsg=4326)
+    points["name"] = points["name"].str.strip().str.lower()
+    return points
+
+
+def load_polygon(path):
+    return gpd.read_file(path).to_crs(epsg=4326)
+
+
+def polygon_geojson(polygon):
+    """GeoJSON pré-sérialisé de la limite, géométrie d'origine (nette à tout zoom)."""
+    return polygon.to_json()
+
+
+def load_geo_assets(point_path, polygon_path):
+    polygon = load_polygon(polygon_path)
+    return GeoAssets(load_points(point_path), polygon, polygon_geojson(polygon))
+
+
+def _load_limit(path):
+    polygon = load_polygon(path)
+    return polygon, polygon_geojson(polygon)
+
+
+class GeoCache:
+    """Couches lues une fois par fichier, éventuellement avant l'affichage de la carte.
+
+    `warm()` est appelé par le fil de téléchargement dès qu'un GeoPackage
+    arrive ; `assets()` attend une lecture déjà en cours au lieu de la
+    refaire. Clé : chemin + empreinte (un fichier local modifié est relu).
+    """
+
+    LOADERS = {"points": load_points, "polygon": _load_limit}
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, kind, path, stamp):
+        key = (kind, path, stamp)
+        with self._lock:
+            future = self._entries.get(key)
+            owner = future is None
+            if owner:
+                future = self._entries[key] = Future()
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        if owner:
+            try:
+                future.set_result(self.LOADERS[kind](path))
+            except Exception as e:
+                # Échec non mémorisé : le prochain appel relit le fichier
+                with self._lock:
+                    self._entries.pop(key, None)
+                future.set_exception(e)
+        return future.result()
+
+    def warm(self, kind, path, stamp):
+        """Lecture anticipée (`kind` : "points" ou "polygon")."""
+        self._get(kind, path, stamp)
+
+    def assets(self, point_path, polygon_path, stamps):
+        polygon, geojson = self._get("polygon", polygon_path, stamps[1])
+        return GeoAssets(self._get("points", point_path, stamps[0]), polygon, geojson)
+
+#==================================================================
+# --------------------------- Marqueurs ---------------------------
+#==================================================================
+def marker_colors(totals):
+    """Gris sans grief, bleu sinon."""
+    return np.where(np.asarray(totals) == 0, "gray", "blue")
+
+
+def marker_rows(points):
+    """Lignes `[lat, lon, propriétés]` de la couche rapide (sans boucle par ligne)."""
+    props = points[MARKER_PROPS].copy()
+    props["Communaute"] = props["Communaute"].astype(object).map(str)
+    props["couleur"] = marker_colors(props["Total_griefs"])
+    return list(zip(points.geometry.y.tolist(), points.geometry.x.tolist(), props.to_dict("records")))
+
+
+def add_markers(m, points, mode="fast", name="📍 Communautés"):
+    """Ajoute à `m` les communautés de `points` (boîtes jointes au résumé)."""
+    if mode == "fast":
+        return FastMarkerCluster(marker_rows(points), callback=_MARKER_CALLBACK, name=name).add_to(m)
+
+    marker_cluster = MarkerCluster(name=name).add_to(m)
+    for _, row in points.iterrows():
+        total = row.get("Total_griefs", 0)
+        popup_html = f"""
+        <b>Communauté :</b> {row.get('Communaute', 'Inconnue')}<br>
+        <b>Total griefs :</b> {total}<br>
+        <b>Achevé :</b> {row.get('Acheve', 0)}<br>
+        <b>En cours :</b> {row.get('En_cours', 0)}<br>
+        <b>Perdu de vue :</b> {row.get('Perdu_de_vue', 0)}<br>
+        <b>A traiter :</b> {row.get('A_traiter', 0)}
+        """
+        folium.CircleMarker(
+            location=[row.geometry.y, row.geometry.x],
+            radius=6,
+            color="white",
+            fill=True,
+            fill_color=marker_colors(total).item(),
+            fill_opacity=0.9,
+            popup=folium.Popup(popup_html, max_width=250)
+        ).add_to(marker_cluster)
+    return marker_cluster
+
+
+def summary_points(points, cube):
+    """Boîtes jointes au résumé par communauté de `cube` (comptes à 0 sans grief)."""
+    points = points.merge(community_summary(cube), left_on="name", right_on="Communaute", how="left")
+    points[SUMMARY_COLS] = points[SUMMARY_COLS].fillna(0).astype(int)
+    return points
+
+#==================================================================
+# ----------------------------- Carte -----------------------------
+#==================================================================
+_LAYER_CONTROL_CSS = """
+    {% macro html(this, kwargs) %}
+    <style>
+    .leaflet-control-layers {
+        font-size: 10px !important;
+        line-height: 1.1 !important;
+        max-height: 150px !important;
+        overflow-y: auto !important;
+    }
+    </style>
+    {% endmacro %}
+    """
+
+
+def build_map(layers, mode="fast", interactive=False):
+    """Carte Folium : une couche (limite + communautés) par élément de `layers`.
+
+    `layers` : [(projet ou None, GeoAssets, points joints au résumé)].
+    En mode interactif, le polygone ne capte pas les clics : seuls les
+    marqueurs filtrent.
+    """
+    m = folium.Map(location=MAP_CENTER, zoom_start=MAP_ZOOM, tiles="CartoDB dark_matter")
+
+    # --- Une couche par projet (consolidation) : limite + communautés ---
+    for nom, geo_assets, points in layers:
+        parent = m if nom is None else folium.FeatureGroup(name=f"🗂️ {nom}").add_to(m)
+
+        # --- Ajout du polygone (GeoJSON pré-sérialisé) ---
+        folium.GeoJson(
+            geo_assets.polygon_geojson,
+            name="Domaine" if nom is None else f"Domaine {nom}",
+            style_function=lambda x: {"fillColor": "#ff7800","color": "#ffffff","weight": 2,"fillOpacity": 0.3},
+            **({"interactive": False} if interactive else {"tooltip": "Zone de projet" if nom is None else nom}),
+        ).add_to(parent)
+
+        # --- Cluster des villages : couche unique (popups côté navigateur) ou détaillée ---
+        add_markers(parent, points, mode, **({} if nom is None else {"name": f"📍 {nom}"}))
+    if len(layers) > 1:
+        minx, miny, maxx, maxy = pd.concat([points for _, _, points in layers], ignore_index=True).total_bounds
+        m.fit_bounds([[miny, minx], [maxy, maxx]])
+
+    # --- Layer control ---
+    folium.LayerControl(collapsed=False).add_to(m)
+
+    # --- CSS LayerControl ---
+    macro = MacroElement()
+    macro._template = Template(_LAYER_CONTROL_CSS)
+    m.get_root().add_child(macro)
+    return m
+
+
+def nearest_name(points, lat, lng, max_distance=CLICK_TOLERANCE):
+    """Nom du point le plus proche de (lat, lng) : marqueur cliqué sur la carte.
+
+    None au-delà de `max_distance` degrés : le clic n'a pas visé un marqueur.
+    """
+    d2 = (points.geometry.y.to_numpy() - lat) ** 2 + (points.geometry.x.to_numpy() - lng) ** 2
+    if not len(d2):
+        return None
+    i = int(np.argmin(d2))
+    if max_distance is not None and d2[i] > max_distance ** 2:
+        return None
+    return points["name"].iloc[i]
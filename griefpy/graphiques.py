@@ -0,0 +1,114 @@
+#*********************** Projet GriefPy ***************************
+#     Figures du dashboard construites à partir du cube filtré
+#******************************************************************
+"""Figures de base (sans couleurs de thème) partagées par le dashboard et
+les rapports hors ligne (`griefpy.rapports`).
+
+Chaque fonction ne lit que le cube déjà découpé par les filtres ; le thème
+est appliqué ensuite (`griefpy.figures.apply_theme`). Plotly Express n'est
+importé qu'à la première figure.
+"""
+from griefpy.durees import QUANTILES
+from griefpy.figures import BASE_TEMPLATE
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+STATUS_COLORS = {
+    "Achevé": "#00ff99",
+    "Grief non recevable": "#ffcc00",
+    "En cours": "#636efa",
+    "A traiter": "#ff6666"
+}
+
+#==================================================================
+# ---------------------------- Figures ----------------------------
+#==================================================================
+def build_nature(cube):
+    """Nature de griefs par statut de traitement (barres horizontales empilées)."""
+    import plotly.express as px
+
+    ordre_nature = cube.value_counts("Nature_plainte").sort_values().index.tolist()
+    nature_statut = cube.counts(["Nature_plainte", "Statut_traitement"], appearance=True).reset_index(name="Nombre")
+    fig = px.bar(
+        nature_statut, y="Nature_plainte", x="Nombre", color="Statut_traitement", text_auto=True,
+        category_orders={"Nature_plainte": ordre_nature}, orientation="h",
+        title="Nature de griefs par traitement",
+        color_discrete_map=STATUS_COLORS, template=BASE_TEMPLATE, height=400
+    )
+    # Style du graphique
+    fig.update_traces(marker_line_width=0)
+    fig.update_layout(
+        xaxis_title="Nombre", yaxis_title="Nature de griefs",
+        legend_title_text="Statut de traitement"
+    )
+    return fig
+
+
+def build_communautes(cube):
+    """Nombre total de griefs par communauté (ordre croissant)."""
+    import plotly.express as px
+
+    # Comptage correct des griefs par communauté
+    comm_counts = (
+        cube.counts("Communaute", dropna=False)
+        .reset_index(name="Nombre_de_griefs")
+        .sort_values(by="Nombre_de_griefs", ascending=True)
+    )
+
+    fig = px.bar(
+        comm_counts,
+        x="Communaute",
+        y="Nombre_de_griefs",
+        text="Nombre_de_griefs",
+        title="Nombre total de griefs par communauté",
+        template=BASE_TEMPLATE,
+        height=400,
+        color_discrete_sequence=["#00ccff"]
+    )
+
+    fig.update_traces(textposition="outside", cliponaxis=False, marker_line_width=0)
+    fig.update_layout(
+        xaxis_title="Village / Localité",
+        yaxis_title="Nombre de griefs",
+        showlegend=False,
+    )
+    return fig
+
+
+def build_evolution(cube, top_n):
+    """Évolution mensuelle des `top_n` natures les plus fréquentes."""
+    import plotly.express as px
+
+    top_natures = cube.value_counts("Nature_plainte").nlargest(top_n).index
+    df_line = cube.where("Nature_plainte", top_natures).counts(["Mois","Nature_plainte"]).reset_index(name="Nombre")
+    fig = px.line(df_line, x="Mois", y="Nombre", color="Nature_plainte", markers=True,
+        title=f"Top {top_n} évolution", template=BASE_TEMPLATE, height=400)
+    fig.update_layout(legend_title_text="Nature de griefs")
+
+    # Style du graphique
+    fig.update_xaxes(dtick="M1", tickformat="%b", tickangle=-45)
+    return fig
+
+
+def build_duree(durees, sla_days):
+    """Durées de traitement par nature : p50, p90 et p99, délai cible en pointillés."""
+    import plotly.express as px
+
+    stats = durees.duration_stats("Nature_plainte", sla_days).sort_values("p90")
+    df_duree = stats.reset_index().melt(
+        id_vars=["Nature_plainte", "depassement", "n"], value_vars=list(QUANTILES),
+        var_name="Quantile", value_name="Nb_jour"
+    )
+    fig = px.bar(df_duree, x="Nature_plainte", y="Nb_jour", color="Quantile", barmode="group", text_auto=".0f",
+        custom_data=["depassement", "n"], title="Durée de traitement par nature (p50 / p90 / p99)",
+        template=BASE_TEMPLATE, height=400)
+    fig.update_traces(
+        marker_line_width=0,
+        hovertemplate="%{x}<br>%{y:.0f} jours<br>Au-delà du délai : %{customdata[0]:.0%} (%{customdata[1]} griefs)"
+    )
+    fig.add_hline(y=sla_days, line_dash="dash", annotation_text=f"Délai cible : {sla_days} j")
+
+    # Style du graphique
+    fig.update_layout(xaxis_title="Nature de griefs", yaxis_title="Durée (jours)")
+    return fig
@@ -0,0 +1,436 @@
+#*********************** Projet GriefPy ***************************
+#   Ingestion incrémentale : seules les lignes nouvelles ou modifiées
+#******************************************************************
+"""Table préparée (typée + colonnes calendaires) et cube tenus à jour par deltas.
+
+Chaque ligne du classeur est identifiée par sa clé (`ID` si elle est unique,
+sinon l'empreinte de la ligne) et résumée par une empreinte de son contenu.
+À chaque nouvelle version du classeur, on compare les empreintes aux
+précédentes : seules les lignes ajoutées ou modifiées sont typées, datées et
+ajoutées au cube ; les lignes supprimées ou remplacées en sont retranchées.
+
+Les empreintes sont recalculées sur tout le classeur à chaque version (comme
+sa lecture) : le gain se limite au typage et aux agrégats des lignes
+inchangées. Il ne dépasse le coût de la fusion des deltas que sur une grande
+table peu modifiée ; sinon la table est reconstruite (`DELTA_MIN_ROWS`,
+`DELTA_MAX_SHARE`).
+
+Sur disque, l'état est une base Parquet suivie de fichiers delta ajoutés à
+chaque rafraîchissement ; la base est recompactée au-delà de `MAX_DELTAS`.
+Le même dossier peut être partagé par plusieurs processus (dashboard, API,
+rapports) : chaque mise à jour prend un verrou de fichier (`state.lock`),
+repart de l'état sur disque s'il a avancé, écrit ses fichiers sous des noms
+neufs puis les publie en remplaçant `state.json` d'un coup ; les fichiers
+qui ne sont plus référencés ne sont supprimés qu'ensuite.
+
+Les histogrammes de durées (`griefpy.durees`) suivent les mêmes deltas.
+
+En mémoire, un seul `Snapshot` (version, table, cube, durées) est publié par
+processus et lu sans copie par toutes les sessions ; une nouvelle version le
+remplace d'une seule affectation, les sessions en cours gardant l'ancien.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from griefpy.aggregation import ORDER_COL, AggregateCube, _concat_aligned
+from griefpy.calendrier import prepare_calendar
+from griefpy.durees import DurationSketches
+from griefpy.ingestion import (
+    REQUIRED_COLS, _typed_frame, check_columns, content_hash, read_source_bytes, read_workbook,
+)
+from griefpy.schema import MemoryReport, compact_frame, memory_usage
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+INCREMENTAL_DIR = os.path.join("cache_griefpy", "incremental")
+MAX_DELTAS = 20
+# En deçà (lignes de la table) ou au-delà (part de lignes changées), la fusion des
+# deltas dans le cube et les histogrammes coûte plus qu'une reconstruction
+# (benchmarks/bench_incremental.py : seuils mesurés sur registre synthétique)
+DELTA_MIN_ROWS = 200_000
+DELTA_MAX_SHARE = 0.2
+
+# Fichiers téléversés : un état par contenu, supprimé après une journée sans usage
+# (le registre contient des données personnelles : noms, téléphones des plaignants)
+UPLOAD_DIR = os.path.join("cache_griefpy", "uploads")
+UPLOAD_MAX_AGE = 24 * 3600
+# États des sources configurées qui ne sont plus consultées
+STATE_MAX_AGE = 7 * 24 * 3600
+
+# Verrou inter-processus et point de publication de l'état
+LOCK_NAME = "state.lock"
+STATE_NAME = "state.json"
+
+# Identifiant des griefs dans le registre
+KEY_COL = "ID"
+# Colonnes internes de la table (clé de ligne, rang d'apparition)
+ROW_KEY = "_cle"
+INTERNAL_COLS = [ROW_KEY, ORDER_COL]
+
+# Version publiée : table sans colonnes internes + cube + histogrammes des durées, jamais modifiés
+Snapshot = namedtuple("Snapshot", ["version", "frame", "cube", "durees"])
+
+# mode : "unchanged", "full" (reconstruction) ou "delta"
+RefreshStats = namedtuple("RefreshStats", ["version", "mode", "added", "modified", "deleted", "rows"])
+
+#==================================================================
+# ---------------------- Empreintes de lignes ---------------------
+#==================================================================
+def row_registry(raw, key_col=KEY_COL):
+    """Clé et empreinte de contenu de chaque ligne brute du classeur.
+
+    Les deux sont des entiers uint64 (comparaisons vectorisées) ; la clé est
+    l'empreinte de `ID`, ou à défaut celle de la ligne et de son rang parmi
+    les lignes identiques.
+    """
+    # Textes passés en catégories : chaque valeur distincte n'est hachée qu'une
+    # fois, empreintes identiques à celles des textes eux-mêmes (5x plus rapide)
+    textes = {
+        col: "category" for col, dtype in raw.dtypes.items()
+        if pd.api.types.is_string_dtype(dtype) or pd.api.types.is_object_dtype(dtype)
+    }
+    hashes = pd.util.hash_pandas_object(raw.astype(textes), index=False).to_numpy()
+    if key_col in raw.columns and raw[key_col].notna().all() and raw[key_col].is_unique:
+        keys = pd.util.hash_pandas_object(raw[key_col], index=False).to_numpy()
+    else:
+        occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+        keys = pd.util.hash_pandas_object(pd.DataFrame({"h": hashes, "k": occurrence}), index=False).to_numpy()
+    return pd.DataFrame({ROW_KEY: keys, "_hash": hashes})
+
+
+def delta_worthwhile(n_rows, n_changes):
+    """Vrai si appliquer `n_changes` lignes changées à une table de `n_rows` lignes coûte
+    moins que de la reconstruire."""
+    return n_rows >= DELTA_MIN_ROWS and n_changes <= DELTA_MAX_SHARE * n_rows
+
+
+def _align(part, like):
+    """Ramène les colonnes de `part` aux types de la table existante."""
+    for col in part.columns.intersection(like.columns):
+        dtype = like[col].dtype
+        if part[col].dtype == dtype or isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            part[col] = part[col].map(lambda v: v if pd.isna(v) else str(v)).astype(dtype)
+        else:
+            try:
+                part[col] = part[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return part
+
+#==================================================================
+# --------------------- Verrou inter-processus ---------------------
+#==================================================================
+@contextmanager
+def state_lock(state_dir):
+    """Verrou exclusif sur l'état de `state_dir`, partagé entre processus."""
+    with open(os.path.join(state_dir, LOCK_NAME), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK abandonne après 10 s : on réessaie
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+#==================================================================
+# ---------------------- Purge des états ---------------------------
+#==================================================================
+def source_state_dir(source, root=INCREMENTAL_DIR):
+    """Dossier d'état d'une source (chemin ou URL), partagé par le dashboard et les rapports."""
+    return os.path.join(root, content_hash(str(source).encode())[:16])
+
+
+def touch_state(state_dir):
+    """Marque l'état comme utilisé (date de modification du dossier)."""
+    try:
+        os.utime(state_dir)
+    except OSError:
+        pass
+
+
+def purge_states(root, max_age, keep=(), now=None):
+    """Supprime les états de `root` inutilisés depuis `max_age` s, sauf ceux de `keep`.
+
+    Renvoie les dossiers supprimés.
+    """
+    now = time.time() if now is None else now
+    keep = {os.path.abspath(path) for path in keep}
+    removed = []
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return removed
+    for entry in entries:
+        if not entry.is_dir() or os.path.abspath(entry.path) in keep:
+            continue
+        try:
+            if now - entry.stat().st_mtime < max_age:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        removed.append(entry.path)
+    return removed
+
+#==================================================================
+# ------------------------------ Store ----------------------------
+#==================================================================
+class IncrementalStore:
+    """Table préparée + cube d'une source, rafraîchis par deltas de lignes."""
+
+    def __init__(self, state_dir=INCREMENTAL_DIR, max_deltas=MAX_DELTAS, required_cols=REQUIRED_COLS):
+        self.state_dir = state_dir
+        self.max_deltas = max_deltas
+        self.required_cols = list(required_cols)
+        self.version = None
+        self.table = None
+        self.cube = None
+        self.durees = None
+        self.registry = None
+        self.memory = None
+        self.snapshot = None
+        self._schema = None
+        self._base = None
+        self._deltas = []
+        self._lock = threading.Lock()
+        os.makedirs(state_dir, exist_ok=True)
+        with state_lock(state_dir):
+            self._restore()
+
+    def _publish(self):
+        """Remplace le `Snapshot` publié (une affectation : bascule atomique).
+
+        La table publiée partage les données de la table interne (sans
+        copie) ; les sessions en dérivent des vues ou des copies.
+        """
+        frame = self.table.drop(columns=INTERNAL_COLS)
+        frame.attrs["version"] = self.version
+        # Lignes du classeur écartées faute de date de réception valide
+        frame.attrs["sans_date"] = len(self.registry) - len(self.table)
+        frame.attrs["memoire"] = self.memory
+        self.snapshot = Snapshot(self.version, frame, self.cube, self.durees)
+
+    # --- Rafraîchissement ---
+    def refresh(self, source, reader=read_workbook, version=None):
+        """Met à jour l'état depuis les octets de `source` (classeur Excel).
+
+        `reader(data)` renvoie le registre brut (ex. `stream_workbook` pour un
+        fichier téléversé, validé en flux). `version` : empreinte des octets,
+        si l'appelant l'a déjà calculée.
+        """
+        data = read_source_bytes(source)
+        version = version or content_hash(data)
+        with self._lock:
+            if version == self.version:
+                return RefreshStats(version, "unchanged", 0, 0, 0, len(self.table))
+            # Version déjà appliquée par un autre processus : relue sur disque, sans analyse
+            if self._disk_version() == version:
+                with state_lock(self.state_dir):
+                    self._restore()
+                if version == self.version:
+                    return RefreshStats(version, "unchanged", 0, 0, 0, len(self.table))
+        # La lecture du classeur reste complète : le format xlsx ne permet pas
+        # de n'en lire que les lignes modifiées
+        return self.update(reader(data), version)
+
+    def update(self, raw, version):
+        """Applique la version `version` du registre brut `raw` (deltas de lignes).
+
+        Lève MissingColumnsError, avant tout calcul, si une colonne requise
+        manque : la version publiée reste alors la précédente.
+        """
+        with self._lock, state_lock(self.state_dir):
+            # Un autre processus a pu faire avancer l'état partagé
+            if self._disk_version() != self.version:
+                self._restore()
+            if version == self.version:
+                return RefreshStats(version, "unchanged", 0, 0, 0, len(self.table))
+            check_columns(raw.columns, self.required_cols)
+            registry = row_registry(raw)
+            # Colonnes ou types bruts changés : les empreintes ne sont plus comparables
+            schema = [[col, str(dtype)] for col, dtype in raw.dtypes.items()]
+            if self.table is None or schema != self._schema:
+                stats = self._rebuild(raw, registry, version)
+            else:
+                stats = self._apply(raw, registry, version)
+            self.registry = registry
+            self.version = version
+            self.memory = MemoryReport(memory_usage(raw), memory_usage(self.table))
+            self._schema = schema
+            self._save_state()
+            self._publish()
+            return stats
+
+    def _prepare(self, raw, keys, ordres):
+        rows = _typed_frame(raw.copy())
+        rows[ROW_KEY] = np.asarray(keys, dtype="uint64")
+        rows[ORDER_COL] = np.asarray(ordres, dtype="int64")
+        return compact_frame(prepare_calendar(rows))
+
+    def _rebuild(self, raw, registry, version):
+        self.table = self._prepare(raw, registry[ROW_KEY], np.arange(len(raw))).reset_index(drop=True)
+        self.cube = AggregateCube.from_frame(self.table)
+        self.durees = DurationSketches.from_frame(self.table)
+        self._write_base()
+        return RefreshStats(version, "full", len(raw), 0, 0, len(self.table))
+
+    def _apply(self, raw, registry, version):
+        old_keys = pd.Index(self.registry[ROW_KEY])
+        pos = old_keys.get_indexer(registry[ROW_KEY])
+        old_hash = np.where(pos >= 0, self.registry["_hash"].to_numpy()[pos], 0)
+        added = pos < 0
+        modified = (pos >= 0) & (old_hash != registry["_hash"].to_numpy())
+        deleted_keys = old_keys[~old_keys.isin(registry[ROW_KEY])]
+        changed = added | modified
+        if not changed.any() and not len(deleted_keys):
+            return RefreshStats(version, "delta", 0, 0, 0, len(self.table))
+        if not delta_worthwhile(len(self.table), int(changed.sum()) + len(deleted_keys)):
+            return self._rebuild(raw, registry, version)
+
+        # Lignes retirées de la table : supprimées ou remplacées par leur nouvelle version
+        retires = np.union1d(deleted_keys.to_numpy(), registry.loc[modified, ROW_KEY].to_numpy())
+        retire_mask = self.table[ROW_KEY].isin(retires).to_numpy()
+        removed = self.table[retire_mask]
+
+        # Rang d'apparition : conservé pour une ligne modifiée, à la suite pour une nouvelle
+        ordre_par_cle = dict(zip(removed[ROW_KEY], removed[ORDER_COL]))
+        suivant = int(self.table[ORDER_COL].max()) + 1 if len(self.table) else 0
+        keys = registry.loc[changed, ROW_KEY].to_numpy()
+        ordres = [ordre_par_cle.get(k, -1) for k in keys]
+        nouveaux = [i for i, o in enumerate(ordres) if o < 0]
+        for rang, i in enumerate(nouveaux):
+            ordres[i] = suivant + rang
+        added_rows = _align(self._prepare(raw[changed], keys, ordres), self.table)
+
+        table = _concat_aligned([self.table[~retire_mask], added_rows])
+        if len(removed):
+            table = table.sort_values(ORDER_COL, kind="stable")
+        self.table = table.reset_index(drop=True)
+        self.cube = self.cube.apply_delta(added_rows, removed, self.table)
+        self.durees = self.durees.apply_delta(added_rows, removed)
+        self._write_delta(added_rows, retires)
+        return RefreshStats(
+            version, "delta", int(added.sum()), int(modified.sum()), len(deleted_keys), len(self.table)
+        )
+
+    # --- Persistance : base + deltas ajoutés ---
+    # Toujours sous `state_lock` ; fichiers Parquet sous des noms neufs, publiés par `state.json`
+    def _path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    def _write_parquet(self, df, prefix):
+        """Écrit `df` sous un nom neuf (jamais celui d'un fichier référencé) ; renvoie ce nom."""
+        name = f"{prefix}-{uuid.uuid4().hex[:16]}.parquet"
+        tmp_path = f"{self._path(name)}.{os.getpid()}.tmp"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+        os.replace(tmp_path, self._path(name))
+        return name
+
+    def _write_base(self):
+        self._deltas = []
+        self._base = self._write_parquet(self.table, "base")
+
+    def _write_delta(self, rows, removed_keys):
+        if len(self._deltas) >= self.max_deltas:
+            self._write_base()
+            return
+        name = self._write_parquet(rows, "delta")
+        self._deltas.append({"file": name, "removed": [int(k) for k in removed_keys]})
+
+    def _save_state(self):
+        files = {
+            "registry": self._write_parquet(self.registry, "registry"),
+            "cube": self._write_parquet(self.cube.cells, "cube"),
+            "durees": self._write_parquet(self.durees.cells, "durees"),
+        }
+        tmp_path = f"{self._path(STATE_NAME)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.version, "schema": self._schema, "base": self._base, "deltas": self._deltas,
+                "files": files, "memory": list(self.memory),
+            }, f)
+        # Publication : l'ancien état reste entier jusqu'à ce remplacement
+        os.replace(tmp_path, self._path(STATE_NAME))
+        self._remove_unreferenced({self._base, *files.values(), *(d["file"] for d in self._deltas)})
+
+    def _remove_unreferenced(self, keep):
+        for entry in os.scandir(self.state_dir):
+            if entry.name.endswith(".parquet") and entry.name not in keep:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def _disk_version(self):
+        try:
+            with open(self._path(STATE_NAME), encoding="utf-8") as f:
+                return json.load(f).get("version")
+        except (OSError, ValueError):
+            return None
+
+    def _restore(self):
+        """Relit la base, rejoue les deltas ; état absent ou illisible = reconstruction."""
+        try:
+            with open(self._path(STATE_NAME), encoding="utf-8") as f:
+                state = json.load(f)
+            # États écrits avant les noms de fichiers uniques
+            base = state.get("base", "base.parquet")
+            files = state.get("files", {
+                "registry": "registry.parquet", "cube": "cube.parquet", "durees": "durees.parquet",
+            })
+            table = pq.read_table(self._path(base)).to_pandas()
+            for delta in state["deltas"]:
+                rows = pq.read_table(self._path(delta["file"])).to_pandas()
+                table = table[~table[ROW_KEY].isin(np.array(delta["removed"], dtype="uint64"))]
+                table = _concat_aligned([table, rows]).sort_values(ORDER_COL, kind="stable")
+            self.table = table.reset_index(drop=True)
+            self.registry = pq.read_table(self._path(files["registry"])).to_pandas()
+            self.cube = AggregateCube(pq.read_table(self._path(files["cube"])).to_pandas())
+            # État antérieur aux histogrammes : reconstruits depuis la table
+            try:
+                self.durees = DurationSketches(pq.read_table(self._path(files["durees"])).to_pandas())
+            except OSError:
+                self.durees = DurationSketches.from_frame(self.table)
+            self.version = state["version"]
+            self._schema = state["schema"]
+            self._base = base
+            self._deltas = state["deltas"]
+            self.memory = MemoryReport(*state["memory"])
+            self._publish()
+        except (OSError, ValueError, KeyError):
+            self.version = self.table = self.cube = self.durees = self.registry = self._schema = self.memory = None
+            self.snapshot = None
+            self._base = None
+            self._deltas = []
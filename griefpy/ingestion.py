@@ -0,0 +1,218 @@
+#*********************** Projet GriefPy ***************************
+#   Ingestion du registre : lecture, colonnes requises, typage
+#******************************************************************
+"""Lecture du classeur des griefs et typage colonnaire de ses lignes.
+
+Le classeur est identifié par l'empreinte SHA-256 de ses octets (version) ;
+`griefpy.incremental` n'en type que les lignes nouvelles ou modifiées.
+
+Les fichiers téléversés sont lus en flux (`stream_workbook`) : en-tête
+vérifié sur la première ligne, puis lignes validées et typées par blocs ;
+un fichier invalide est refusé dès le premier bloc fautif.
+"""
+import hashlib
+import io
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import requests
+from pandas.io.parsers import TextParser
+
+from griefpy.calendrier import DATE_COL, parse_dates
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+# Colonnes sans lesquelles ni la table préparée ni le cube ne peuvent être construits
+REQUIRED_COLS = [
+    "Type_depot", "Type", "Statut_traitement", "Nature_plainte",
+    "Categorie", "Date_reception", "Nb_jour", "Communaute", "Sexe",
+    "Classement",
+]
+
+# Colonnes à faible cardinalité stockées en catégories
+CATEGORICAL_COLS = ["Type_depot", "Statut_traitement", "Nature_plainte", "Communaute", "Sexe"]
+
+# Valeurs admises de `Statut_traitement` (fichiers téléversés, espaces retirés)
+STATUS_VALUES = ["Achevé", "En cours", "Perdu de vue", "A traiter", "Grief non recevable"]
+
+# Lecture en flux : lignes validées et typées par bloc, erreurs citées au plus
+STREAM_CHUNK_ROWS = 5_000
+MAX_REPORTED_ERRORS = 10
+
+# Instantanés Parquet des versions précédentes (remplacés par l'état incrémental)
+LEGACY_SNAPSHOT_DIR = os.path.join("cache_griefpy", "snapshots")
+
+
+class MissingColumnsError(ValueError):
+    """Registre sans certaines colonnes requises (liste dans `missing`)."""
+
+    def __init__(self, missing):
+        super().__init__(f"Colonnes manquantes dans le fichier : {missing}")
+        self.missing = list(missing)
+
+
+class InvalidRowsError(ValueError):
+    """Lignes aux valeurs invalides : `errors` = [(ligne Excel, colonne, valeur)]."""
+
+    def __init__(self, errors):
+        details = " ; ".join(f"ligne {ligne}, {col} = {valeur!r}" for ligne, col, valeur in errors)
+        super().__init__(f"Valeurs invalides dans le fichier : {details}")
+        self.errors = list(errors)
+
+
+def check_columns(columns, required=REQUIRED_COLS):
+    """Lève MissingColumnsError si une colonne de `required` manque à `columns`."""
+    missing = [col for col in required if col not in columns]
+    if missing:
+        raise MissingColumnsError(missing)
+
+
+def remove_legacy_snapshots(snapshot_dir=LEGACY_SNAPSHOT_DIR):
+    """Supprime les instantanés d'anciennes versions (copies du registre devenues inutiles)."""
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+#==================================================================
+# ------------------------ Lecture source -------------------------
+#==================================================================
+def read_source_bytes(source):
+    """Renvoie les octets d'un chemin, d'une URL ou d'un fichier téléversé (ou `source` même)."""
+    if isinstance(source, bytes):
+        return source
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        return source.read()
+    source = str(source)
+    if source.startswith(("http://", "https://")):
+        r = requests.get(source, timeout=60)
+        r.raise_for_status()
+        return r.content
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_workbook(data):
+    """Registre brut depuis les octets du classeur (fonction de module : exécutable dans un autre processus)."""
+    return pd.read_excel(io.BytesIO(data), engine="openpyxl")
+
+
+def _cell(value):
+    """Valeur de cellule comme la lit `pd.read_excel` (vide = "", réel entier = int)."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _sheet_rows(sheet):
+    """Lignes de cellules converties ; lignes vides de fin de feuille omises."""
+    vides = []
+    for row in sheet.iter_rows(values_only=True):
+        row = [_cell(v) for v in row]
+        while row and row[-1] == "":
+            row.pop()
+        if not row:
+            vides.append(row)
+            continue
+        yield from vides
+        vides.clear()
+        yield row
+
+
+def _invalid_rows(chunk, first_line, statuses):
+    """Convertit dates et durées du bloc ; renvoie les valeurs refusées."""
+    errors = []
+
+    def refuser(col, mask):
+        for i in np.flatnonzero(mask.to_numpy())[:MAX_REPORTED_ERRORS]:
+            errors.append((first_line + int(i), col, chunk[col].iloc[i]))
+
+    if DATE_COL in chunk:
+        dates, report = parse_dates(chunk[DATE_COL])
+        if report.coerced:
+            refuser(DATE_COL, chunk[DATE_COL].notna() & dates.isna())
+        chunk[DATE_COL] = dates
+    if "Nb_jour" in chunk:
+        durees = pd.to_numeric(chunk["Nb_jour"], errors="coerce")
+        refuser("Nb_jour", chunk["Nb_jour"].notna() & durees.isna())
+        chunk["Nb_jour"] = durees
+    if statuses is not None and "Statut_traitement" in chunk:
+        statuts = chunk["Statut_traitement"]
+        refuser("Statut_traitement", statuts.notna() & ~statuts.astype(str).str.strip().isin(statuses))
+    return sorted(errors)[:MAX_REPORTED_ERRORS]
+
+
+def _read_chunk(header, rows, lues, statuses):
+    """Bloc typé comme par `pd.read_excel` (même analyseur), puis validé."""
+    chunk = TextParser([header] + rows, header=0).read()
+    # Ligne Excel de la première ligne du bloc (en-tête en ligne 1)
+    errors = _invalid_rows(chunk, lues + 2, statuses)
+    if errors:
+        raise InvalidRowsError(errors)
+    return chunk
+
+
+def stream_workbook(data, required=REQUIRED_COLS, statuses=STATUS_VALUES,
+                    chunk_rows=STREAM_CHUNK_ROWS, progress=None):
+    """Registre brut lu en flux (openpyxl en lecture seule), validé bloc par bloc.
+
+    Lève MissingColumnsError d'après la seule ligne d'en-tête, puis
+    InvalidRowsError dès le premier bloc contenant une date illisible, une
+    durée non numérique ou un statut hors de `statuses` (None : tout statut).
+    `progress(lignes_lues, total)` est appelé après chaque bloc ; `total` est
+    estimé d'après les dimensions de la feuille (None si absentes).
+    """
+    import openpyxl
+
+    book = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = book.worksheets[0]
+        total = sheet.max_row - 1 if sheet.max_row else None
+        # Dimensions déclarées parfois fausses : lignes lues sans les borner
+        sheet.reset_dimensions()
+        rows = _sheet_rows(sheet)
+        header = next(rows, [])
+        check_columns(header, required)
+
+        chunks, lues, bloc = [], 0, []
+        for row in rows:
+            bloc.append(row[:len(header)] + [""] * (len(header) - len(row)))
+            if len(bloc) < chunk_rows:
+                continue
+            chunks.append(_read_chunk(header, bloc, lues, statuses))
+            lues += len(bloc)
+            bloc = []
+            if progress is not None:
+                progress(lues, total)
+        if bloc or not chunks:
+            chunks.append(_read_chunk(header, bloc, lues, statuses))
+            lues += len(bloc)
+            if progress is not None:
+                progress(lues, total)
+    finally:
+        book.close()
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+#==================================================================
+# ---------------------- Typage colonnaire ------------------------
+#==================================================================
+def _typed_frame(df):
+    """Catégories pour les colonnes de filtre, texte pour les colonnes mixtes."""
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        # Arrow refuse les colonnes mêlant nombres et textes (ex. "Age", "N°")
+        if pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
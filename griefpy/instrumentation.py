@@ -0,0 +1,144 @@
+#*********************** Projet GriefPy ***************************
+#            Mesure du temps d'exécution des sections
+#******************************************************************
+"""Chronométrage des sections du dashboard.
+
+Chaque section décorée enregistre sa dernière durée dans un registre
+(`st.session_state` côté dashboard) ; on voit ainsi ce que coûte la relance
+d'une section seule par rapport à une exécution complète du script.
+
+`Recorder` détaille les étapes (chargement, filtres, carte, figures,
+tableau) avec la taille des données produites ; les mesures s'exportent en
+lignes JSON ou au format texte Prometheus.
+"""
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+
+
+def record(registry, name, t0):
+    """Enregistre la durée écoulée depuis `t0` (perf_counter) ; renvoie les ms."""
+    ms = (time.perf_counter() - t0) * 1000
+    registry[name] = {"ms": ms, "at": time.time()}
+    return ms
+
+
+def timed(registry, name, on_done=None):
+    """Décorateur : enregistre la durée de chaque appel dans `registry()[name]`.
+
+    `registry` est un appelable pour être résolu à chaque appel (l'état de
+    session Streamlit n'existe qu'en cours d'exécution) ; `on_done(name, ms)`
+    permet d'afficher la durée à la fin de la section.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                ms = record(registry(), name, t0)
+                if on_done:
+                    on_done(name, ms)
+        return wrapper
+    return decorator
+
+#==================================================================
+# ---------------------- Étapes et export --------------------------
+#==================================================================
+MAX_RECORDS = 2000
+# Contexte vide partagé : coût quasi nul quand l'instrumentation est coupée
+_DISABLED = nullcontext()
+
+
+class _Stage:
+    def __init__(self, recorder, name, size):
+        self.recorder = recorder
+        self.name = name
+        self.size = size
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.t0) * 1000
+        # Taille évaluée seulement si l'étape a abouti
+        nbytes = int(self.size()) if self.size is not None and exc_type is None else None
+        self.recorder.add(self.name, ms, nbytes)
+        return False
+
+
+class Recorder:
+    """Mesures d'une session : durée et taille produite (octets) de chaque étape.
+
+    Les étapes d'une même exécution du script partagent un numéro `run` ;
+    les fragments relancés seuls ajoutent leurs mesures à la dernière.
+    """
+
+    def __init__(self, max_records=MAX_RECORDS):
+        self.enabled = False
+        self.run = 0
+        self.records = deque(maxlen=max_records)
+
+    def new_run(self):
+        self.run += 1
+
+    def add(self, stage, ms, nbytes=None):
+        if self.enabled:
+            self.records.append(
+                {"run": self.run, "stage": stage, "ms": round(ms, 3), "bytes": nbytes, "at": time.time()}
+            )
+
+    def stage(self, name, size=None):
+        """Contexte chronométrant l'étape `name` ; `size()` donne la taille produite.
+
+        Désactivé, renvoie un contexte vide et `size` n'est jamais appelé.
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _Stage(self, name, size)
+
+    def latest(self):
+        """Dernière mesure de chaque étape, dans l'ordre d'exécution."""
+        latest = {}
+        for record in self.records:
+            latest.pop(record["stage"], None)
+            latest[record["stage"]] = record
+        return list(latest.values())
+
+
+def to_jsonl(records):
+    """Une mesure JSON par ligne (analyse hors ligne)."""
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(records, prefix="griefpy"):
+    """Format texte Prometheus : résumé des durées et dernière taille par étape."""
+    stats = {}
+    for record in records:
+        count, total, nbytes = stats.get(record["stage"], (0, 0.0, None))
+        if record["bytes"] is not None:
+            nbytes = record["bytes"]
+        stats[record["stage"]] = (count + 1, total + record["ms"] / 1000, nbytes)
+    lines = [
+        f"# HELP {prefix}_stage_seconds Durée des étapes du dashboard.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for stage, (count, total, _) in stats.items():
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{_label(stage)}"}} {count}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{_label(stage)}"}} {total:.6f}')
+    lines += [
+        f"# HELP {prefix}_stage_payload_bytes Taille des données produites par l'étape (dernière mesure).",
+        f"# TYPE {prefix}_stage_payload_bytes gauge",
+    ]
+    for stage, (_, _, nbytes) in stats.items():
+        if nbytes is not None:
+            lines.append(f'{prefix}_stage_payload_bytes{{stage="{_label(stage)}"}} {nbytes}')
+    return "\n".join(lines) + "\n"
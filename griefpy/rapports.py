@@ -0,0 +1,251 @@
+#*********************** Projet GriefPy ***************************
+#   Rapports hors ligne : un dossier par année et par communauté
+#******************************************************************
+"""Génération en lot des rapports statiques (sans Streamlit).
+
+Usage : python -m griefpy.rapports [--registre R] [--points P] [--limite L]
+        [--sortie rapports] [--annees 2023 2024] [--processus N]
+
+Chaque rapport (année × communauté, plus « toutes » les communautés) reprend
+les cartes d'indicateurs, les figures du dashboard (`griefpy.graphiques`) et
+la carte Folium, calculées sur le cube découpé : aucune ligne brute n'est
+relue. Le registre est préparé une seule fois (même état incrémental que le
+dashboard) ; le cube et les couches sont transmis une fois à chaque
+processus du pool (sans copie avec `fork`). Un rapport dont l'empreinte
+(cellules du cube découpé, couches, gabarit) n'a pas changé n'est pas
+régénéré.
+
+Les figures sont aussi écrites en PNG si `kaleido` est installé.
+"""
+import argparse
+import hashlib
+import html
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from griefpy.aggregation import kpi_counts
+from griefpy.durees import SLA_DAYS
+from griefpy.figures import FigureTheme, apply_theme
+from griefpy.graphiques import build_communautes, build_duree, build_evolution, build_nature
+from griefpy.incremental import INCREMENTAL_DIR, IncrementalStore, source_state_dir
+from griefpy.remote import RemoteFetcher, content_stamp
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+REPORT_DIR = "rapports"
+MAX_WORKERS = 4
+# À incrémenter quand le gabarit ou les figures changent : tout est régénéré
+REPORT_LAYOUT = "3"
+MANIFEST_NAME = "empreintes.json"
+ALL_COMMUNITIES = "toutes"
+
+# Thème clair du dashboard, cartes d'indicateurs comprises
+REPORT_THEME = FigureTheme("plotly_white", "#efefef", "#000000")
+CARD_COLORS = ["#87CEFA", "#90EE90", "#FFD700", "#FF7F7F"]
+TOP_N = 5
+
+# cube, durees : cube et histogrammes des durées complets ; geo : GeoAssets de la carte ; geo_stamps : empreintes des GeoPackages
+ReportDataset = namedtuple("ReportDataset", ["version", "cube", "durees", "geo", "geo_stamps"])
+# communaute : None pour le rapport de toutes les communautés
+ReportPack = namedtuple("ReportPack", ["annee", "communaute", "dossier", "empreinte"])
+ReportStats = namedtuple("ReportStats", ["rendered", "skipped"])
+
+_PAGE = """<!DOCTYPE html>
+<html lang="fr">
+<head><meta charset="utf-8"><title>{titre}</title>
+<style>
+body {{ font-family: sans-serif; background: #f5f5f5; max-width: 1100px; margin: auto; }}
+h1 {{ color: #1a73e8; }}
+.cartes {{ display: flex; gap: 12px; }}
+.carte {{ flex: 1; padding: 15px; border-radius: 15px; }}
+.carte p {{ margin: 4px 0; font-weight: bold; color: black; }}
+iframe {{ width: 100%; height: 450px; border: 0; }}
+</style></head>
+<body>
+<h1>{titre}</h1>
+<div class="cartes">{cartes}</div>
+{figures}
+<h2>Carte de localisation des boîtes à grief</h2>
+<iframe src="carte.html"></iframe>
+</body></html>
+"""
+
+#==================================================================
+# ---------------------------- Données ----------------------------
+#==================================================================
+def load_dataset(registre, points, limite, fetcher=None, state_root=INCREMENTAL_DIR):
+    """Registre préparé et couches de la carte.
+
+    L'état incrémental est celui du dashboard (`state_root`) : `refresh` le met
+    à jour sous le verrou de `state_lock`, et un dashboard lancé sur le même
+    dossier relit l'état publié avant sa prochaine mise à jour.
+    """
+    from griefpy.geo import load_geo_assets
+
+    fetcher = fetcher or RemoteFetcher()
+    store = IncrementalStore(source_state_dir(registre, state_root))
+    store.refresh(fetcher.fetch(registre).path)
+    couches = [fetcher.fetch(url) for url in (points, limite)]
+    geo = load_geo_assets(couches[0].path, couches[1].path)
+    snapshot = store.snapshot
+    return ReportDataset(snapshot.version, snapshot.cube, snapshot.durees, geo, tuple(content_stamp(r) for r in couches))
+
+
+def slug(nom):
+    """Nom de dossier sûr pour une communauté."""
+    return re.sub(r"[^\w-]+", "_", str(nom)).strip("_") or "sans_nom"
+
+
+def pack_cube(cube, annee, communaute):
+    """Cube (ou histogrammes des durées) d'un rapport."""
+    cube = cube.slice(annee)
+    return cube if communaute is None else cube.where("Communaute", [communaute])
+
+
+def pack_hash(cubes, geo_stamps):
+    """Empreinte du contenu d'un rapport : cellules des cubes découpés, couches et gabarit."""
+    digest = hashlib.sha256(REPORT_LAYOUT.encode())
+    digest.update(json.dumps(geo_stamps).encode())
+    for cube in cubes:
+        cells = cube.cells.reset_index(drop=True)
+        digest.update(",".join(cells.columns).encode())
+        digest.update(pd.util.hash_pandas_object(cells, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def plan_packs(dataset, sortie, annees=None):
+    """Rapports à produire (année × communauté ayant des griefs), avec leur empreinte."""
+    cells = dataset.cube.cells
+    annees = sorted(cells["Année"].unique()) if annees is None else annees
+    packs = []
+    for annee in annees:
+        cube_annee = dataset.cube.slice(annee)
+        communautes = sorted(cube_annee.cells["Communaute"].dropna().unique())
+        for communaute in [None] + communautes:
+            cube = pack_cube(dataset.cube, annee, communaute)
+            if not cube.total:
+                continue
+            dossier = os.path.join(sortie, str(annee), ALL_COMMUNITIES if communaute is None else slug(communaute))
+            durees = pack_cube(dataset.durees, annee, communaute)
+            packs.append(ReportPack(annee, communaute, dossier, pack_hash([cube, durees], dataset.geo_stamps)))
+    return packs
+
+#==================================================================
+# ---------------------------- Rendu ------------------------------
+#==================================================================
+_DATASET = None
+
+
+def _init_worker(dataset):
+    """Jeu de données du processus : reçu une fois, partagé par tous ses rapports."""
+    global _DATASET
+    _DATASET = dataset
+
+
+def _cards(kpis):
+    labels = ["Total", "Achevés", "En cours", "A traiter"]
+    return "".join(
+        f"<div class='carte' style='background:{color}'><p style='font-size:28px'>{val}</p><p>{label}</p></div>"
+        for val, label, color in zip(kpis, labels, CARD_COLORS)
+    )
+
+
+def render_pack(pack, dataset=None):
+    """Écrit le rapport `pack` : page HTML, carte, indicateurs (JSON) et PNG éventuels."""
+    from griefpy.geo import MARKER_MODES, build_map, summary_points
+
+    dataset = dataset or _DATASET
+    cube = pack_cube(dataset.cube, pack.annee, pack.communaute)
+    os.makedirs(pack.dossier, exist_ok=True)
+
+    durees = pack_cube(dataset.durees, pack.annee, pack.communaute)
+    kpis = kpi_counts(cube)
+    figures = [build_nature(cube), build_communautes(cube), build_evolution(cube, TOP_N)]
+    if durees.total:
+        figures.append(build_duree(durees, SLA_DAYS))
+    figures = [apply_theme(fig, REPORT_THEME) for fig in figures]
+    if importlib.util.find_spec("kaleido") is not None:
+        for i, fig in enumerate(figures):
+            fig.write_image(os.path.join(pack.dossier, f"figure_{i + 1}.png"))
+
+    points = summary_points(dataset.geo.points, cube)
+    build_map([(None, dataset.geo, points)], MARKER_MODES["Rapide (couche unique)"]).save(
+        os.path.join(pack.dossier, "carte.html")
+    )
+
+    titre = f"Suivi MGG {pack.annee} — " + ("toutes communautés" if pack.communaute is None else pack.communaute)
+    corps = "\n".join(
+        fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False) for i, fig in enumerate(figures)
+    )
+    with open(os.path.join(pack.dossier, "index.html"), "w", encoding="utf-8") as f:
+        f.write(_PAGE.format(titre=html.escape(titre), cartes=_cards(kpis), figures=corps))
+    with open(os.path.join(pack.dossier, "indicateurs.json"), "w", encoding="utf-8") as f:
+        json.dump(kpis._asdict(), f, indent=1)
+    return pack
+
+
+def _read_manifest(sortie):
+    try:
+        with open(os.path.join(sortie, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_reports(dataset, sortie=REPORT_DIR, annees=None, max_workers=MAX_WORKERS):
+    """Produit les rapports absents ou dont l'empreinte a changé ; renvoie un `ReportStats`."""
+    packs = plan_packs(dataset, sortie, annees)
+    anciennes = _read_manifest(sortie)
+    a_faire = [
+        p for p in packs
+        if anciennes.get(os.path.relpath(p.dossier, sortie)) != p.empreinte
+        or not os.path.exists(os.path.join(p.dossier, "index.html"))
+    ]
+
+    n_proc = min(max_workers, len(a_faire), os.cpu_count() or 1)
+    if n_proc > 1:
+        # fork : le jeu de données du parent est hérité sans copie ; spawn : transmis une fois par processus
+        methode = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        with ProcessPoolExecutor(n_proc, mp_context=multiprocessing.get_context(methode),
+                                 initializer=_init_worker, initargs=(dataset,)) as pool:
+            list(pool.map(render_pack, a_faire))
+    else:
+        for pack in a_faire:
+            render_pack(pack, dataset)
+
+    os.makedirs(sortie, exist_ok=True)
+    empreintes = {os.path.relpath(p.dossier, sortie): p.empreinte for p in packs}
+    with open(os.path.join(sortie, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(empreintes, f, indent=1, sort_keys=True)
+    return ReportStats(len(a_faire), len(packs) - len(a_faire))
+
+#==================================================================
+# ----------------------------- CLI -------------------------------
+#==================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapports statiques par année et par communauté")
+    parser.add_argument("--registre", default=os.environ.get("GRIEFPY_EXCEL_URL"), help="classeur (chemin ou URL)")
+    parser.add_argument("--points", default=os.environ.get("GRIEFPY_POINTS_URL"), help="GeoPackage des boîtes")
+    parser.add_argument("--limite", default=os.environ.get("GRIEFPY_POLYGON_URL"), help="GeoPackage de la limite")
+    parser.add_argument("--sortie", default=REPORT_DIR)
+    parser.add_argument("--annees", type=int, nargs="*")
+    parser.add_argument("--processus", type=int, default=MAX_WORKERS)
+    args = parser.parse_args(argv)
+    if not (args.registre and args.points and args.limite):
+        parser.error("--registre, --points et --limite (ou GRIEFPY_EXCEL_URL, GRIEFPY_POINTS_URL, GRIEFPY_POLYGON_URL)")
+
+    dataset = load_dataset(args.registre, args.points, args.limite)
+    stats = build_reports(dataset, args.sortie, args.annees, args.processus)
+    print(f"{stats.rendered} rapport(s) générés, {stats.skipped} inchangé(s) -> {args.sortie}")
+
+
+if __name__ == "__main__":
+    main()
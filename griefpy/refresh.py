@@ -0,0 +1,127 @@
+#*********************** Projet GriefPy ***************************
+#     Rafraîchissement des sources en tâche de fond (hors relance)
+#******************************************************************
+"""Scrutation périodique des sources, hors du chemin des requêtes.
+
+Un fil par source revalide le classeur et les GeoPackages auprès du
+`RemoteFetcher` (requêtes conditionnelles), prépare la nouvelle version dans
+le store incrémental puis la publie d'une seule affectation. Les relances
+ne font que lire la version publiée ; aucune n'attend un téléchargement.
+En cas d'échec, l'intervalle double jusqu'à `MAX_BACKOFF` ; la dernière
+version valide reste servie.
+
+Les sources sont récupérées en parallèle : la durée d'une scrutation est
+proche de celle du plus long téléchargement. `on_fetched` est appelé dans le
+fil de chaque source dès que sa copie locale est prête (ex. lecture anticipée
+des GeoPackages pendant que le classeur se télécharge encore).
+"""
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from griefpy.remote import RemoteFetchError
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+REFRESH_INTERVAL = 30
+MAX_BACKOFF = 15 * 60
+
+# checked_at : dernière scrutation réussie (données « à jour au ») ;
+# failures : échecs consécutifs ; next_at : prochaine scrutation prévue
+RefreshStatus = namedtuple(
+    "RefreshStatus", ["version", "checked_at", "changed_at", "failures", "last_error", "next_at"]
+)
+
+
+def backoff_delay(interval, failures, max_backoff=MAX_BACKOFF):
+    """Délai avant la prochaine scrutation après `failures` échecs consécutifs."""
+    return min(interval * 2 ** failures, max_backoff) if failures else interval
+
+#==================================================================
+# -------------------------- Scrutateur ---------------------------
+#==================================================================
+class BackgroundRefresher:
+    """Scrute `url` (classeur) et `extra_urls` (GeoPackages) toutes les `interval` s.
+
+    `poll()` peut aussi être appelé directement (premier chargement, tests
+    avec un fichier local ou un serveur HTTP de substitution). `timeouts`
+    donne un délai maximal (s) par URL, à défaut celui du récupérateur.
+    """
+
+    def __init__(self, fetcher, store, url, extra_urls=(), interval=REFRESH_INTERVAL,
+                 max_backoff=MAX_BACKOFF, clock=time.time, timeouts=None, on_fetched=None):
+        self.fetcher = fetcher
+        self.store = store
+        self.url = url
+        self.extra_urls = list(extra_urls)
+        self.timeouts = dict(timeouts or {})
+        self.on_fetched = on_fetched
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.status = RefreshStatus(store.version, None, None, 0, None, clock())
+        # Exception du dernier échec (ex. MissingColumnsError, détaillée par le dashboard)
+        self.error = None
+        self._stop = threading.Event()
+        self._poll_lock = threading.Lock()
+        self._thread = None
+
+    def _fetch(self, url):
+        result = self.fetcher.fetch(url, timeout=self.timeouts.get(url))
+        if self.on_fetched is not None:
+            try:
+                self.on_fetched(result)
+            except Exception:
+                # Lecture anticipée seulement : l'erreur ressortira à l'usage
+                pass
+        return result
+
+    def poll(self):
+        """Une scrutation : revalidation des sources, publication si le classeur a changé."""
+        with self._poll_lock:
+            status = self.status
+            try:
+                urls = [self.url] + self.extra_urls
+                with ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="griefpy-fetch") as pool:
+                    futures = [pool.submit(self._fetch, url) for url in urls]
+                    # Classeur préparé dès son arrivée, GeoPackages encore en cours
+                    stats = self.store.refresh(futures[0].result().path)
+                    results = [f.result() for f in futures]
+                # Copie locale servie faute de réponse : la source reste en échec
+                hors_ligne = [r.url for r in results if r.status == "offline"]
+                if hors_ligne:
+                    raise RemoteFetchError(f"Source injoignable : {', '.join(hors_ligne)}")
+            except Exception as e:
+                self.error = e
+                failures = status.failures + 1
+                # Classeur éventuellement publié avant l'échec d'une autre source
+                self.status = status._replace(
+                    version=self.store.version, failures=failures, last_error=f"{type(e).__name__} : {e}",
+                    next_at=self.clock() + backoff_delay(self.interval, failures, self.max_backoff),
+                )
+                return self.status
+            self.error = None
+            now = self.clock()
+            changed_at = status.changed_at if stats.mode == "unchanged" and status.changed_at else now
+            self.status = RefreshStatus(stats.version, now, changed_at, 0, None, now + self.interval)
+            return self.status
+
+    # --- Fil de fond ---
+    def start(self):
+        """Démarre le fil de scrutation (sans effet s'il tourne déjà)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"griefpy-refresh {self.url}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(max(self.status.next_at - self.clock(), 0)):
+            self.poll()
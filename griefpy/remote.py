@@ -0,0 +1,186 @@
+#*********************** Projet GriefPy ***************************
+#   Téléchargement conditionnel des sources distantes (Dropbox)
+#******************************************************************
+"""Récupération des fichiers distants avec cache local adressé par contenu.
+
+Chaque URL est revalidée par requête conditionnelle (If-None-Match /
+If-Modified-Since) : un fichier inchangé ne coûte qu'une réponse 304, voire
+aucun appel réseau tant que la copie locale a moins de `max_age` secondes.
+En cas de coupure réseau, la dernière copie valide est servie.
+
+Le corps est écrit sur disque par blocs de `CHUNK_SIZE` (mémoire bornée) ;
+`timeout` borne à la fois chaque attente réseau et la durée totale du
+téléchargement d'une source.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+REMOTE_CACHE_DIR = os.path.join("cache_griefpy", "remote")
+CHUNK_SIZE = 1024 * 1024
+
+# status : "downloaded", "not_modified", "cached" (pas d'appel), "offline"
+# ou "local" (chemin local transmis tel quel)
+FetchResult = namedtuple("FetchResult", ["url", "path", "sha256", "status"])
+
+
+class RemoteFetchError(Exception):
+    """Source injoignable et aucune copie locale disponible."""
+
+
+def content_stamp(result):
+    """SHA-256 d'une copie téléchargée ; date et taille d'un fichier local (modifiable sur place)."""
+    if result.sha256:
+        return result.sha256
+    stat = os.stat(result.path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+#==================================================================
+# ------------------------- Récupérateur --------------------------
+#==================================================================
+class RemoteFetcher:
+    """Session HTTP mutualisée + cache disque des sources distantes."""
+
+    def __init__(self, cache_dir=REMOTE_CACHE_DIR, max_age=0, timeout=30, session=None):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.timeout = timeout
+        self.session = session or self._make_session()
+        self._objects_dir = os.path.join(cache_dir, "objects")
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._index = self._read_index()
+
+    @staticmethod
+    def _make_session():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    # --- Index url -> {etag, last_modified, sha256, suffix, checked_at} ---
+    def _read_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self):
+        tmp_path = f"{self._index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(tmp_path, self._index_path)
+
+    def _object_path(self, sha256, suffix):
+        return os.path.join(self._objects_dir, f"{sha256}{suffix}")
+
+    def cached_path(self, url):
+        """Chemin de la dernière copie valide de `url`, ou None."""
+        entry = self._index.get(url)
+        if entry:
+            path = self._object_path(entry["sha256"], entry["suffix"])
+            if os.path.exists(path):
+                return path
+        return None
+
+    # --- Téléchargement ---
+    def _download(self, response, suffix, deadline=None):
+        """Écrit le corps par blocs puis le renomme d'après son empreinte.
+
+        Au-delà de `deadline` (`time.monotonic()`), le téléchargement est abandonné.
+        """
+        digest = hashlib.sha256()
+        tmp_path = os.path.join(self._objects_dir, f".{os.getpid()}.{threading.get_ident()}.part")
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise requests.Timeout(f"délai dépassé pendant le téléchargement de {response.url}")
+                    digest.update(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            os.replace(tmp_path, self._object_path(sha256, suffix))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return sha256
+
+    def fetch(self, url, max_age=None, timeout=None):
+        """Renvoie un `FetchResult` pointant sur une copie locale à jour de `url`.
+
+        `timeout` (s) remplace celui du récupérateur pour cette source.
+        """
+        # Chemin local (source surchargée, bancs d'essai) : rien à télécharger
+        if not urlparse(url).scheme.startswith("http"):
+            return FetchResult(url, url, None, "local")
+        max_age = self.max_age if max_age is None else max_age
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            entry = self._index.get(url)
+        cached = self.cached_path(url)
+
+        # Copie encore fraîche : aucun appel réseau
+        if cached and time.time() - entry["checked_at"] < max_age:
+            return FetchResult(url, cached, entry["sha256"], "cached")
+
+        headers = {}
+        if cached:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                if r.status_code == 304 and cached:
+                    with self._lock:
+                        entry["checked_at"] = time.time()
+                        self._write_index()
+                    return FetchResult(url, cached, entry["sha256"], "not_modified")
+                r.raise_for_status()
+                suffix = os.path.splitext(urlparse(url).path)[1]
+                sha256 = self._download(r, suffix, deadline)
+                new_entry = {
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "sha256": sha256,
+                    "suffix": suffix,
+                    "checked_at": time.time(),
+                }
+        except requests.RequestException as e:
+            # Hors ligne : on sert la dernière copie valide
+            if cached:
+                return FetchResult(url, cached, entry["sha256"], "offline")
+            raise RemoteFetchError(f"Téléchargement impossible : {url} ({e})") from e
+
+        with self._lock:
+            old_entry = self._index.get(url)
+            self._index[url] = new_entry
+            self._write_index()
+        if old_entry and old_entry["sha256"] != sha256:
+            self._drop_unreferenced(old_entry)
+        return FetchResult(url, self._object_path(sha256, suffix), sha256, "downloaded")
+
+    def _drop_unreferenced(self, old_entry):
+        """Supprime un ancien objet si plus aucune URL ne le référence."""
+        with self._lock:
+            if any(e["sha256"] == old_entry["sha256"] for e in self._index.values()):
+                return
+        try:
+            os.remove(self._object_path(old_entry["sha256"], old_entry["suffix"]))
+        except OSError:
+            pass
@@ -0,0 +1,78 @@
+#*********************** Projet GriefPy ***************************
+#      Schéma compact du registre (catégories, types réduits)
+#******************************************************************
+"""Forme canonique et compacte de la table des griefs.
+
+Les colonnes textuelles sont normalisées une seule fois au chargement
+(espaces retirés, communautés en minuscules) et stockées en catégories :
+chaque valeur distincte n'existe qu'une fois en mémoire, les lignes n'en
+gardent qu'un code. `Nb_jour` est réduit en entier 32 bits. La table obtenue est
+partagée en lecture seule par toutes les sessions.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+# Colonnes textuelles du registre stockées en catégories
+TEXT_COLS = [
+    "Type_depot", "Type", "Statut_traitement", "Nature_plainte",
+    "Categorie", "Communaute", "Sexe", "Classement",
+]
+# Colonnes comparées sans casse (jointure avec les noms de la carte)
+LOWER_COLS = ["Communaute"]
+
+# Durées en jours : entiers 32 bits (valeurs manquantes permises), float32
+# si le registre contient des durées fractionnaires
+DURATION_COL = "Nb_jour"
+DURATION_DTYPES = ("Int32", "float32")
+
+# Octets occupés par la table brute (types pandas par défaut) et compacte
+MemoryReport = namedtuple("MemoryReport", ["before", "after"])
+
+#==================================================================
+# ------------------------- Normalisation -------------------------
+#==================================================================
+def canonical_text(values, lower=False):
+    """Catégories aux valeurs sans espaces superflus (et en minuscules).
+
+    La normalisation porte sur les valeurs distinctes, pas sur les lignes ;
+    les valeurs manquantes le restent.
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    categories = values.cat.categories.astype(str).str.strip()
+    if lower:
+        categories = categories.str.lower()
+    canoniques = pd.Index(categories.unique()).sort_values()
+    remap = np.append(canoniques.get_indexer(categories), -1)
+    codes = remap[values.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, canoniques), index=values.index, name=values.name)
+
+
+def compact_frame(df):
+    """Table canonique : textes en catégories normalisées, `Nb_jour` réduit."""
+    for col in TEXT_COLS:
+        if col in df.columns:
+            df[col] = canonical_text(df[col], lower=col in LOWER_COLS)
+    if DURATION_COL in df.columns:
+        df[DURATION_COL] = compact_duration(df[DURATION_COL])
+    return df
+
+
+def compact_duration(values):
+    """`Nb_jour` numérique réduit : Int32 si toutes les durées sont entières."""
+    values = pd.to_numeric(values, errors="coerce")
+    entier, flottant = DURATION_DTYPES
+    finies = values.dropna().to_numpy(dtype="float64")
+    if (np.mod(finies, 1) == 0).all() and (np.abs(finies) < 2**31).all():
+        return values.astype(entier)
+    return values.astype(flottant)
+
+
+def memory_usage(df):
+    """Octets occupés par `df`, textes compris."""
+    return int(df.memory_usage(deep=True, index=False).sum())
@@ -0,0 +1,118 @@
+#*********************** Projet GriefPy ***************************
+#   Tableau paginé : recherche, tri et export évalués côté serveur
+#******************************************************************
+"""Index de colonnes pour l'aperçu des données et exports par blocs.
+
+L'index est construit une fois par version des données, colonne par colonne
+à la demande : chaque colonne est factorisée en codes triés (le code sert de
+rang pour le tri) et ses valeurs distinctes mises en minuscules pour la
+recherche. Recherche et tri portent sur les positions des lignes filtrées ;
+seule la page affichée est extraite de la table et envoyée au navigateur.
+"""
+import io
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+#==================================================================
+# --------------------------- Paramètres --------------------------
+#==================================================================
+PAGE_SIZES = [25, 50, 100, 250]
+# Lignes converties à la fois : la copie pandas et le texte CSV intermédiaires
+# restent bornés, le fichier exporté est entièrement en mémoire
+EXPORT_CHUNK_ROWS = 50_000
+
+# frame : lignes de la page ; start : rang de la première ligne (0 = début)
+TablePage = namedtuple("TablePage", ["frame", "page", "pages", "start", "total"])
+
+#==================================================================
+# ----------------------------- Index -----------------------------
+#==================================================================
+class TableIndex:
+    """Codes triés et valeurs distinctes (minuscules) de chaque colonne de `df`."""
+
+    def __init__(self, df):
+        self.df = df
+        self._codes = {}
+        self._lower = {}
+
+    def _column(self, col):
+        codes = self._codes.get(col)
+        if codes is None:
+            values = self.df[col]
+            try:
+                codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=True)
+            except TypeError:
+                # Types non comparables entre eux (colonne mixte) : ordre du texte
+                codes, uniques = pd.factorize(values.astype(str), sort=True, use_na_sentinel=True)
+            # Valeurs manquantes classées en dernier
+            codes = np.where(codes < 0, len(uniques), codes).astype(np.int32)
+            self._codes[col] = codes
+            # Une entrée de plus, vide, pour le code des valeurs manquantes
+            lower = pd.Index(uniques).astype(str).str.lower().to_numpy(dtype=object)
+            self._lower[col] = pd.Series(np.append(lower, ""), dtype="str")
+        return self._codes[col]
+
+    def search(self, rows, query, columns):
+        """Positions de `rows` dont une des `columns` contient `query` (sans casse)."""
+        query = query.strip().lower()
+        if not query:
+            return rows
+        found = np.zeros(len(rows), dtype=bool)
+        for col in columns:
+            codes = self._column(col)
+            hits = self._lower[col].str.contains(query, regex=False).to_numpy(dtype=bool)
+            found |= hits[codes[rows]]
+        return rows[found]
+
+    def sort(self, rows, col, descending=False):
+        """`rows` triées selon `col` (tri stable, valeurs manquantes en dernier)."""
+        codes = self._column(col)[rows]
+        if not descending:
+            return rows[np.argsort(codes, kind="stable")]
+        missing = codes == len(self._lower[col]) - 1
+        return rows[np.lexsort((-codes, missing))]
+
+    def page(self, rows, page, size, columns):
+        """Page `page` (à partir de 1) des lignes `rows`, limitée à `columns`."""
+        pages = max(1, -(-len(rows) // size))
+        page = min(max(1, page), pages)
+        start = (page - 1) * size
+        frame = self.df.take(rows[start:start + size])[columns]
+        return TablePage(frame, page, pages, start, len(rows))
+
+#==================================================================
+# ----------------------------- Export ----------------------------
+#==================================================================
+def _chunks(df, rows, columns, chunk_rows):
+    for start in range(0, max(len(rows), 1), chunk_rows):
+        yield df.take(rows[start:start + chunk_rows])[columns]
+
+
+def export_csv(df, rows, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Fichier CSV (UTF-8 avec BOM, lisible par Excel) en mémoire, converti bloc par bloc.
+
+    Renvoie un `io.BytesIO`, type accepté par `st.download_button`.
+    """
+    out = io.BytesIO()
+    for i, chunk in enumerate(_chunks(df, rows, columns, chunk_rows)):
+        out.write(chunk.to_csv(index=False, header=i == 0).encode("utf-8-sig" if i == 0 else "utf-8"))
+    out.seek(0)
+    return out
+
+
+def export_parquet(df, rows, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Fichier Parquet en mémoire (`io.BytesIO`), un groupe de lignes par bloc."""
+    out = io.BytesIO()
+    writer = None
+    for chunk in _chunks(df, rows, columns, chunk_rows):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(out, table.schema)
+        writer.write_table(table.cast(writer.schema))
+    writer.close()
+    out.seek(0)
+    return out
@@ -0,0 +1,75 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : source HTTP locale (ETag, 304, pannes simulées), deltas
+#******************************************************************
+import hashlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class SourceLocale:
+    """Serveur HTTP local : contenu servi, pannes à simuler, requêtes reçues.
+
+    `delais` : attente (s) avant de répondre, par nom de fichier.
+    """
+
+    def __init__(self):
+        self.body = b""
+        self.pannes = 0
+        self.delais = {}
+        self.requetes = []
+        source = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                source.requetes.append(self.headers.get("If-None-Match"))
+                time.sleep(source.delais.get(self.path.lstrip("/"), 0))
+                if source.pannes:
+                    source.pannes -= 1
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                etag = '"%s"' % hashlib.md5(source.body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(source.body)))
+                self.end_headers()
+                self.wfile.write(source.body)
+
+        self.serveur = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.serveur.serve_forever, daemon=True).start()
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.serveur.server_port}/{name}"
+
+    def arreter(self):
+        if self.serveur.fileno() < 0:
+            return
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+
+@pytest.fixture
+def source_http():
+    source = SourceLocale()
+    yield source
+    source.arreter()
+
+
+@pytest.fixture(autouse=True)
+def deltas_sur_petits_registres(monkeypatch):
+    """Chemin des deltas suivi même sur les petits registres des tests."""
+    monkeypatch.setattr("griefpy.incremental.DELTA_MIN_ROWS", 0)
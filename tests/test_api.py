@@ -0,0 +1,98 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : API JSON des indicateurs (filtres, ETag, versions)
+#******************************************************************
+import threading
+
+import pytest
+import requests
+
+from benchmarks.synthetic import make_register
+from griefpy.api import make_server
+from griefpy.incremental import IncrementalStore
+
+
+@pytest.fixture
+def raw():
+    return make_register(400, n_communities=5)
+
+
+@pytest.fixture
+def store(raw, tmp_path):
+    store = IncrementalStore(str(tmp_path / "etat"))
+    store.update(raw, "v1")
+    return store
+
+
+@pytest.fixture
+def api(store):
+    server = make_server(store, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api", server.service
+    server.shutdown()
+    server.server_close()
+
+
+def test_memes_chiffres_que_la_barre_laterale(api, store):
+    base, _ = api
+    table = store.snapshot.frame
+    annee = int(table["Année"].iloc[0])
+    types = ["Boite aux lettres", "Agent FNC"]
+    lignes = table[(table["Année"] == annee) & table["Type_depot"].isin(types)]
+
+    reponse = requests.get(f"{base}/agregats", params={"annee": annee, "type": types, "top": 3})
+    assert reponse.status_code == 200
+    document = reponse.json()
+    assert document["version"] == "v1" and document["filtres"]["annee"] == annee
+
+    donnees = document["donnees"]
+    statuts = lignes["Statut_traitement"]
+    assert donnees["indicateurs"] == {
+        "total": len(lignes),
+        "acheves": int(statuts.isin(["Achevé", "Grief non recevable"]).sum()),
+        "en_cours": int(statuts.isin(["En cours", "Perdu de vue"]).sum()),
+        "a_traiter": int((statuts == "A traiter").sum()),
+    }
+    natures = lignes["Nature_plainte"].value_counts()
+    assert donnees["comptes"]["Nature_plainte"] == natures[natures > 0].to_dict()
+    assert sum(donnees["comptes"]["Communaute"].values()) == len(lignes)
+
+    evolution = donnees["evolution"]
+    par_mois = lignes.groupby(lignes["Mois"].dt.strftime("%Y-%m")).size()
+    assert evolution["mois"] == par_mois.index.tolist() and evolution["total"] == par_mois.tolist()
+    top = natures[natures > 0].nlargest(3).index
+    assert list(evolution["natures"]) == [str(n) for n in top]
+    assert sum(evolution["natures"][str(top[0])]) == (lignes["Nature_plainte"] == top[0]).sum()
+
+    # Statut absent des données : aucun grief, comme une sélection vide
+    vide = requests.get(f"{base}/indicateurs", params={"statut": "Inconnu"}).json()["donnees"]
+    assert vide == {"total": 0, "acheves": 0, "en_cours": 0, "a_traiter": 0}
+    assert requests.get(f"{base}/evolution", params={"statut": "Inconnu"}).json()["donnees"]["mois"] == []
+
+
+def test_etag_et_nouvelle_version(api, store, raw):
+    base, service = api
+    session = requests.Session()
+    premiere = session.get(f"{base}/comptes/Type_depot", params={"type": ["Agent FNC", "Boite aux lettres"]})
+    etag = premiere.headers["ETag"]
+    # Ordre des valeurs indifférent ; 304 sans corps ni calcul
+    misses = service.misses
+    revalidee = session.get(f"{base}/comptes/Type_depot", params={"type": ["Boite aux lettres", "Agent FNC"]},
+                            headers={"If-None-Match": etag})
+    assert revalidee.status_code == 304 and revalidee.content == b""
+    assert service.misses == misses
+
+    # Nouvelle version : nouvel ETag, chiffres à jour
+    store.update(raw.drop(index=range(50)).reset_index(drop=True), "v2")
+    reponse = session.get(f"{base}/indicateurs", headers={"If-None-Match": etag})
+    assert reponse.status_code == 200 and reponse.headers["ETag"] != etag
+    assert reponse.json()["donnees"]["total"] == 350
+
+
+def test_erreurs(api, tmp_path):
+    base, service = api
+    assert requests.get(f"{base}/comptes/Sexe").status_code == 404
+    assert requests.get(f"{base}/indicateurs", params={"annee": "deux mille"}).status_code == 400
+    assert requests.get(f"{base}/evolution", params={"top": 0}).status_code == 400
+    service.store = IncrementalStore(str(tmp_path / "vide"))
+    assert requests.get(f"{base}/indicateurs").status_code == 503
@@ -0,0 +1,105 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : consolidation multi-projets (manifeste, fusion, cube)
+#******************************************************************
+import json
+import os
+
+import pytest
+
+from benchmarks.synthetic import make_register
+from griefpy.aggregation import PROJECT_COL, AggregateCube
+from griefpy.consolidation import ConsolidatedStore, load_manifest
+from griefpy.filtres import FilterIndex, sidebar_criteria
+from griefpy.remote import RemoteFetcher, RemoteFetchError
+
+
+def ecrire_projets(dossier, registres):
+    """Classeurs `{nom: registre}` et manifeste (chemins relatifs) ; renvoie le manifeste."""
+    projets = []
+    for nom, raw in registres.items():
+        raw.to_excel(dossier / f"{nom}.xlsx", index=False)
+        projets.append({"nom": nom, "registre": f"{nom}.xlsx"})
+    manifeste = dossier / "manifeste.json"
+    manifeste.write_text(json.dumps({"projets": projets}), encoding="utf-8")
+    return str(manifeste)
+
+
+@pytest.fixture
+def registres():
+    return {
+        "Lefini": make_register(120, n_communities=4, seed=1),
+        "Bateke": make_register(80, n_communities=3, seed=2),
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConsolidatedStore(RemoteFetcher(str(tmp_path / "copies")), str(tmp_path / "etat"))
+
+
+def test_manifeste(tmp_path):
+    manifeste = tmp_path / "m.json"
+    manifeste.write_text(json.dumps({"projets": [
+        {"nom": "A", "registre": "a/t.xlsx", "boites": "https://exemple.org/b.gpkg"},
+    ]}), encoding="utf-8")
+    (projet,) = load_manifest(str(manifeste))
+    assert projet.registre == os.path.join(str(tmp_path), "a/t.xlsx")
+    assert projet.boites == "https://exemple.org/b.gpkg" and projet.limite is None
+
+    manifeste.write_text(json.dumps({"projets": [{"nom": "A", "registre": "x"}] * 2}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_manifest(str(manifeste))
+
+
+def test_fusion_et_dimension_projet(tmp_path, store, registres):
+    stats = store.refresh(ecrire_projets(tmp_path, registres))
+    assert stats.mode == "full" and stats.rows == 200
+
+    frame, cube = store.snapshot.frame, store.snapshot.cube
+    assert frame.columns[0] == PROJECT_COL
+    assert frame[PROJECT_COL].value_counts().to_dict() == {"Lefini": 120, "Bateke": 80}
+    # Cube fusionné = cube construit sur la table fusionnée
+    attendu = AggregateCube.from_frame(frame, dims=[PROJECT_COL] + [c for c in cube.cells.columns[1:11]])
+    assert cube.counts([PROJECT_COL, "Communaute"]).equals(attendu.counts([PROJECT_COL, "Communaute"]))
+    assert cube.slice(projets=["Bateke"]).total == 80
+    assert cube.slice(projets=["Bateke"]).total == store.stores[str(tmp_path / "Bateke.xlsx")].snapshot.cube.total
+    # Histogrammes des durées réunis de même
+    durees = store.snapshot.durees.slice(projets=["Bateke"])
+    assert durees.quantiles().equals(store.stores[str(tmp_path / "Bateke.xlsx")].snapshot.durees.quantiles())
+
+    index = FilterIndex(frame)
+    assert len(index.rows(sidebar_criteria(None, None, None, ["Lefini"]))) == 120
+
+
+def test_seul_le_projet_modifie_est_relu(tmp_path, store, registres):
+    manifeste = ecrire_projets(tmp_path, registres)
+    store.refresh(manifeste)
+    assert store.refresh(manifeste).mode == "unchanged"
+
+    # Seul le classeur de Bateke est réécrit
+    registres["Bateke"].iloc[:-5].to_excel(tmp_path / "Bateke.xlsx", index=False)
+    stats = store.refresh(manifeste)
+    assert stats.mode == "delta" and stats.deleted == 5 and stats.rows == 195
+    assert {r.project: r.stats.mode for r in store.results.values()} == {"Lefini": "unchanged", "Bateke": "delta"}
+
+
+def test_projet_incomplet_ecarte(tmp_path, store, registres):
+    registres["Incomplet"] = make_register(10).drop(columns=["Classement"])
+    store.refresh(ecrire_projets(tmp_path, registres))
+    assert store.results["Incomplet"].missing_cols == ["Classement"]
+    assert set(store.snapshot.frame[PROJECT_COL].unique()) == {"Lefini", "Bateke"}
+
+
+def test_aucun_projet_exploitable(tmp_path, store):
+    manifeste = ecrire_projets(tmp_path, {"Incomplet": make_register(10).drop(columns=["Communaute"])})
+    with pytest.raises(RemoteFetchError):
+        store.refresh(manifeste)
+    assert store.snapshot is None
+
+
+def test_lecture_en_processus(tmp_path, store, registres, monkeypatch):
+    # Plusieurs cœurs : les classeurs modifiés sont analysés dans des processus
+    monkeypatch.setattr("griefpy.consolidation.os.cpu_count", lambda: 2)
+    stats = store.refresh(ecrire_projets(tmp_path, registres))
+    assert stats.rows == 200
+    assert all(r.error is None for r in store.results.values())
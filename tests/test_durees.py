@@ -0,0 +1,80 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : histogrammes des durées (quantiles, dépassement, deltas)
+#******************************************************************
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_register
+from griefpy.durees import BUCKET_COL, DURATION_DIMS, EXACT_MAX_DAYS, RELATIVE_ERROR, DurationSketches
+from griefpy.incremental import IncrementalStore
+
+from tests.test_incremental import version_suivante
+
+
+def exacts(durees, q):
+    return np.quantile(durees.dropna().astype("float64"), q, method="inverted_cdf")
+
+
+def histogrammes(sketches):
+    cells = sketches.cells.astype({dim: str for dim in DURATION_DIMS})
+    return cells.sort_values(DURATION_DIMS + [BUCKET_COL]).reset_index(drop=True)
+
+
+@pytest.fixture
+def v1():
+    raw = make_register(600, n_communities=6)
+    raw.loc[[4, 9], "Nb_jour"] = None
+    return raw
+
+
+@pytest.fixture
+def store(v1, tmp_path):
+    store = IncrementalStore(str(tmp_path / "etat"))
+    store.update(v1, "v1")
+    return store
+
+
+def test_quantiles_exacts_sur_tout_filtre(store):
+    table, durees = store.table, store.durees
+    q = durees.quantiles()
+    assert q.tolist() == exacts(table["Nb_jour"], [0.5, 0.9, 0.99]).tolist()
+
+    # Filtres de la barre latérale puis trimestre : fusion des histogrammes des cellules
+    annee, statuts = int(table["Année"].iloc[0]), ["Achevé", "En cours"]
+    trimestre = f"{annee}Q2"
+    lignes = table[(table["Année"] == annee) & table["Statut_traitement"].isin(statuts) & (table["Trimestre"] == trimestre)]
+    filtre = durees.slice(annee, statuts=statuts).slice(trimestre=trimestre)
+    par_nature = filtre.duration_stats("Nature_plainte", sla_days=45)
+    assert len(par_nature) == lignes["Nature_plainte"].nunique() > 1
+    for nature, groupe in lignes.groupby("Nature_plainte", observed=True):
+        assert par_nature.loc[nature, ["p50", "p90", "p99"]].tolist() == exacts(groupe["Nb_jour"], [0.5, 0.9, 0.99]).tolist()
+        assert par_nature.loc[nature, "depassement"] == pytest.approx((groupe["Nb_jour"].dropna() > 45).mean())
+        assert par_nature.loc[nature, "n"] == groupe["Nb_jour"].notna().sum()
+
+
+def test_longues_durees_a_erreur_relative_bornee():
+    durees = pd.Series([0.5, -3, 12, EXACT_MAX_DAYS, 900, 2000, 5000], dtype="float64")
+    df = pd.DataFrame({dim: "x" for dim in DURATION_DIMS}, index=durees.index).assign(Nb_jour=durees)
+    sketches = DurationSketches.from_frame(df)
+    valeurs = sketches.quantiles(quantiles={str(i): (i + 1) / len(durees) for i in range(len(durees))})
+    attendues = [0, 1, 12, EXACT_MAX_DAYS, 900, 2000, 5000]
+    assert valeurs.iloc[:4].tolist() == attendues[:4]
+    assert np.allclose(valeurs.iloc[4:], attendues[4:], rtol=RELATIVE_ERROR)
+    assert sketches.breach_rate(EXACT_MAX_DAYS) == pytest.approx(3 / 7)
+    # Délai cible dans les classes logarithmiques
+    assert sketches.breach_rate(1500) == pytest.approx(2 / 7)
+    assert sketches.duration_stats(sla_days=4000)["depassement"].iloc[0] == pytest.approx(1 / 7)
+
+
+def test_delta_egal_reconstruction(v1, store, tmp_path):
+    v2 = version_suivante(v1)
+    assert store.update(v2, "v2").mode == "delta"
+    fraiche = IncrementalStore(str(tmp_path / "complete"))
+    fraiche.update(v2, "v2")
+    pd.testing.assert_frame_equal(histogrammes(store.durees), histogrammes(fraiche.durees))
+    assert store.snapshot.durees is store.durees
+
+    # Relu depuis le disque avec l'état
+    relu = IncrementalStore(store.state_dir)
+    pd.testing.assert_frame_equal(histogrammes(relu.durees), histogrammes(store.durees))
@@ -0,0 +1,238 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : store incrémental vs reconstruction complète
+#******************************************************************
+import json
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_register
+from griefpy.aggregation import CUBE_DIMS
+from griefpy.incremental import IncrementalStore, purge_states, row_registry
+from griefpy.ingestion import MissingColumnsError
+
+
+def version_suivante(raw, seed=1):
+    """Griefs ajoutés en fin de registre, durées et dates modifiées, lignes supprimées."""
+    nouveaux = make_register(30, n_communities=8, seed=seed)
+    nouveaux["ID"] += int(raw["ID"].max())
+    raw = pd.concat([raw, nouveaux], ignore_index=True)
+    raw.loc[[3, 17, 42], "Nb_jour"] += 1000
+    raw.loc[8, "Communaute"] = "Nouveau village"
+    raw.loc[25, "Date_reception"] = pd.NaT
+    return raw.drop(index=[0, 5, 6, 90]).reset_index(drop=True)
+
+
+def cellules(cube):
+    """Cellules triées, rang d'apparition ramené à un rang (les trous de numérotation diffèrent)."""
+    cells = cube.cells.astype({dim: str for dim in CUBE_DIMS})
+    cells = cells.sort_values(CUBE_DIMS).reset_index(drop=True)
+    return cells.assign(premier=cells["premier"].rank(method="dense"))
+
+
+def assert_meme_etat(store, attendu):
+    a, b = store.snapshot.frame, attendu.snapshot.frame
+    assert a.attrs["sans_date"] == b.attrs["sans_date"]
+    pd.testing.assert_frame_equal(a, b, check_categorical=False)
+    pd.testing.assert_frame_equal(cellules(store.cube), cellules(attendu.cube))
+
+
+@pytest.fixture
+def v1():
+    return make_register(300, n_communities=8)
+
+
+def test_reconstruction_moins_chere(v1, tmp_path, monkeypatch):
+    v2 = version_suivante(v1)
+    store = IncrementalStore(str(tmp_path / "delta"))
+    store.update(v1, "v1")
+    # Petite table : reconstruite
+    monkeypatch.setattr("griefpy.incremental.DELTA_MIN_ROWS", len(v1) + 1)
+    assert store.update(v2, "v2").mode == "full"
+    # 39 lignes changées sur 300 : au-delà de la part admise
+    monkeypatch.setattr("griefpy.incremental.DELTA_MIN_ROWS", 0)
+    monkeypatch.setattr("griefpy.incremental.DELTA_MAX_SHARE", 0.1)
+    assert store.update(v1, "v1").mode == "full"
+
+    fraiche = IncrementalStore(str(tmp_path / "complete"))
+    fraiche.update(v1, "v1")
+    assert_meme_etat(store, fraiche)
+
+
+def test_empreintes_des_textes(v1):
+    """Textes hachés par catégories : mêmes empreintes que les valeurs (états existants comparables)."""
+    v1["Mixte"] = [i if i % 3 else f"x{i}" for i in range(len(v1))]
+    v1.loc[4, ["Sexe", "Mixte"]] = None
+    attendu = pd.util.hash_pandas_object(v1, index=False).to_numpy()
+    assert (row_registry(v1)["_hash"].to_numpy() == attendu).all()
+
+
+def test_delta_egal_reconstruction(v1, tmp_path):
+    v2 = version_suivante(v1)
+    store = IncrementalStore(str(tmp_path / "delta"))
+    store.update(v1, "v1")
+    stats = store.update(v2, "v2")
+    assert stats.mode == "delta"
+    assert (stats.added, stats.modified, stats.deleted) == (30, 5, 4)
+    assert stats.rows == len(v2) - 1
+
+    fraiche = IncrementalStore(str(tmp_path / "complete"))
+    assert fraiche.update(v2, "v2").mode == "full"
+    assert_meme_etat(store, fraiche)
+
+
+def test_suppressions_seules(v1, tmp_path):
+    v2 = v1.drop(index=[1, 2, 150, 299]).reset_index(drop=True)
+    store = IncrementalStore(str(tmp_path / "delta"))
+    store.update(v1, "v1")
+    stats = store.update(v2, "v2")
+    assert (stats.added, stats.modified, stats.deleted) == (0, 0, 4)
+
+    fraiche = IncrementalStore(str(tmp_path / "complete"))
+    fraiche.update(v2, "v2")
+    assert_meme_etat(store, fraiche)
+
+
+def test_sans_identifiant(v1, tmp_path):
+    # Sans ID, la clé est l'empreinte de la ligne : une modification = suppression + ajout
+    v1 = v1.drop(columns="ID")
+    v2 = version_suivante(make_register(300, n_communities=8)).drop(columns="ID")
+    store = IncrementalStore(str(tmp_path / "delta"))
+    store.update(v1, "v1")
+    stats = store.update(v2, "v2")
+    assert stats.mode == "delta" and stats.modified == 0
+    assert stats.added - stats.deleted == len(v2) - len(v1)
+
+    fraiche = IncrementalStore(str(tmp_path / "complete"))
+    fraiche.update(v2, "v2")
+    # L'ordre des lignes modifiées diffère (ajoutées en fin de table) : comparaison triée
+    cles = ["Date_reception", "Communaute", "Nature_plainte", "Nb_jour", "Statut_traitement", "Sexe", "Type"]
+    trier = lambda df: df.sort_values(cles, na_position="first").reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        trier(store.snapshot.frame), trier(fraiche.snapshot.frame), check_categorical=False
+    )
+    pd.testing.assert_frame_equal(
+        cellules(store.cube).drop(columns="premier"), cellules(fraiche.cube).drop(columns="premier")
+    )
+
+
+def test_restauration_depuis_le_disque(v1, tmp_path):
+    state_dir = str(tmp_path / "etat")
+    store = IncrementalStore(state_dir)
+    store.update(v1, "v1")
+    v2 = version_suivante(v1)
+    store.update(v2, "v2")
+    v3 = version_suivante(v2, seed=2)
+    store.update(v3, "v3")
+
+    # Base + deltas relus : même table, même cube, et le delta suivant s'applique
+    relu = IncrementalStore(state_dir)
+    assert relu.version == "v3"
+    pd.testing.assert_frame_equal(relu.table, store.table)
+    pd.testing.assert_frame_equal(relu.cube.cells, store.cube.cells)
+    assert relu.update(v3, "v3").mode == "unchanged"
+
+    v4 = version_suivante(v3, seed=3)
+    assert relu.update(v4, "v4").mode == "delta"
+    fraiche = IncrementalStore(str(tmp_path / "complete"))
+    fraiche.update(v4, "v4")
+    assert_meme_etat(relu, fraiche)
+
+
+def test_etat_partage_entre_stores(v1, tmp_path):
+    """Deux stores (dashboard, API) sur le même dossier : chacun repart de l'état sur disque."""
+    state_dir = str(tmp_path / "etat")
+    v2 = version_suivante(v1)
+    v3 = version_suivante(v2, seed=2)
+    dashboard, api = IncrementalStore(state_dir), IncrementalStore(state_dir)
+    dashboard.update(v1, "v1")
+    dashboard.update(v2, "v2")
+    # L'API, restée sans version, rattrape v2 puis applique v3 en delta
+    assert api.update(v3, "v3").mode == "delta"
+    assert dashboard.update(v3, "v3").mode == "unchanged"
+    # Retour à une version déjà vue : ses fichiers ne remplacent aucun fichier référencé
+    assert dashboard.update(v2, "v2").mode == "delta"
+
+    relu = IncrementalStore(state_dir)
+    assert_meme_etat(relu, dashboard)
+    fraiche = IncrementalStore(str(tmp_path / "complete"))
+    fraiche.update(v2, "v2")
+    assert_meme_contenu(relu, fraiche)
+    with open(os.path.join(state_dir, "state.json"), encoding="utf-8") as f:
+        state = json.load(f)
+    references = {state["base"], *state["files"].values(), *(d["file"] for d in state["deltas"])}
+    assert {n for n in os.listdir(state_dir) if n.endswith(".parquet")} == references
+
+
+def assert_meme_contenu(store, attendu):
+    """Mêmes lignes et mêmes comptes, quel que soit l'ordre d'apparition (lignes réintroduites)."""
+    a, b = (s.snapshot.frame.sort_values("ID").reset_index(drop=True) for s in (store, attendu))
+    pd.testing.assert_frame_equal(a, b, check_categorical=False)
+    pd.testing.assert_frame_equal(cellules(store.cube).drop(columns="premier"),
+                                  cellules(attendu.cube).drop(columns="premier"))
+
+
+def _appliquer(state_dir, versions):
+    store = IncrementalStore(state_dir)
+    for nom, raw in versions:
+        store.update(raw, nom)
+
+
+def test_processus_concurrents(v1, tmp_path):
+    state_dir = str(tmp_path / "etat")
+    v2 = version_suivante(v1)
+    v3 = version_suivante(v2, seed=2)
+    registres = {"v1": v1, "v2": v2, "v3": v3}
+    ordres = [["v1", "v2", "v3", "v2", "v3"], ["v1", "v3", "v2", "v3", "v1"]]
+    contexte = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    processus = [
+        contexte.Process(target=_appliquer, args=(state_dir, [(n, registres[n]) for n in ordre]))
+        for ordre in ordres
+    ]
+    for p in processus:
+        p.start()
+    for p in processus:
+        p.join(120)
+        assert p.exitcode == 0
+
+    # L'état publié est entier et correspond à la dernière version écrite
+    relu = IncrementalStore(state_dir)
+    fraiche = IncrementalStore(str(tmp_path / "complete"))
+    fraiche.update(registres[relu.version], relu.version)
+    assert_meme_contenu(relu, fraiche)
+
+
+def test_recompactage(v1, tmp_path):
+    store = IncrementalStore(str(tmp_path / "etat"), max_deltas=1)
+    raw = v1
+    for i in range(3):
+        raw = version_suivante(raw, seed=i + 1)
+        store.update(raw, f"v{i + 2}")
+    relu = IncrementalStore(str(tmp_path / "etat"))
+    pd.testing.assert_frame_equal(relu.table, store.table)
+
+
+def test_colonnes_manquantes(v1, tmp_path):
+    store = IncrementalStore(str(tmp_path / "etat"))
+    store.update(v1, "v1")
+    with pytest.raises(MissingColumnsError) as err:
+        store.update(v1.drop(columns=["Classement", "Communaute"]), "v2")
+    assert err.value.missing == ["Communaute", "Classement"]
+    # La version précédente reste publiée
+    assert store.snapshot.version == "v1"
+
+
+def test_purge_des_etats(tmp_path):
+    ancien, recent, garde = (tmp_path / nom for nom in ("ancien", "recent", "garde"))
+    for dossier in (ancien, recent, garde):
+        dossier.mkdir()
+        (dossier / "state.json").write_text("{}")
+    now = ancien.stat().st_mtime + 3600
+    os.utime(recent, (now, now))
+
+    supprimes = purge_states(str(tmp_path), max_age=600, keep=[str(garde)], now=now)
+    assert supprimes == [str(ancien)]
+    assert not ancien.exists() and recent.exists() and garde.exists()
+    assert purge_states(str(tmp_path / "absent"), max_age=0) == []
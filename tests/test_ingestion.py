@@ -0,0 +1,70 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : lecture en flux des fichiers téléversés (validation)
+#******************************************************************
+import io
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_register
+from griefpy.incremental import IncrementalStore
+from griefpy.ingestion import InvalidRowsError, MissingColumnsError, read_workbook, stream_workbook
+
+
+def octets(df):
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def registre():
+    raw = make_register(230, n_communities=6)
+    # Dates saisies en texte et durées manquantes, comme dans le registre réel
+    raw["Date_reception"] = raw["Date_reception"].astype(object)
+    raw.loc[[4, 120], "Date_reception"] = ["03/02/2021", "2022-11-30"]
+    raw.loc[[8, 200], "Nb_jour"] = None
+    return raw
+
+
+def test_meme_table_que_read_excel(registre, tmp_path):
+    data = octets(registre)
+    avancement = []
+    flux = stream_workbook(data, chunk_rows=50, progress=lambda lues, total: avancement.append((lues, total)))
+    assert avancement == [(50, 230), (100, 230), (150, 230), (200, 230), (230, 230)]
+    assert len(flux) == 230 and list(flux.columns) == list(registre.columns)
+
+    # Même table préparée que par la lecture complète
+    complet = IncrementalStore(str(tmp_path / "complet"))
+    complet.update(read_workbook(data), "v1")
+    en_flux = IncrementalStore(str(tmp_path / "flux"))
+    en_flux.update(flux, "v1")
+    pd.testing.assert_frame_equal(en_flux.snapshot.frame, complet.snapshot.frame)
+
+
+def test_en_tete_refuse_avant_les_lignes(registre):
+    avancement = []
+    with pytest.raises(MissingColumnsError) as err:
+        stream_workbook(octets(registre.drop(columns=["Sexe"])), progress=lambda *a: avancement.append(a))
+    assert err.value.missing == ["Sexe"]
+    assert avancement == []
+
+
+def test_valeurs_invalides_refusees_au_premier_bloc(registre):
+    registre["Nb_jour"] = registre["Nb_jour"].astype(object)
+    registre.loc[3, "Nb_jour"] = "trois"
+    registre.loc[10, "Statut_traitement"] = "Classé"
+    registre.loc[12, "Date_reception"] = "pas une date"
+    registre.loc[220, "Statut_traitement"] = "Autre"
+    avancement = []
+    with pytest.raises(InvalidRowsError) as err:
+        stream_workbook(octets(registre), chunk_rows=50, progress=lambda *a: avancement.append(a))
+    # Lignes Excel (en-tête en ligne 1) ; le dernier bloc n'est pas lu
+    assert err.value.errors == [
+        (5, "Nb_jour", "trois"), (12, "Statut_traitement", "Classé"), (14, "Date_reception", "pas une date"),
+    ]
+    assert avancement == []
+
+    # Tout statut admis sur demande
+    registre.loc[[3, 12], ["Nb_jour", "Date_reception"]] = [5, "01/01/2022"]
+    assert len(stream_workbook(octets(registre), statuses=None)) == 230
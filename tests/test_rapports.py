@@ -0,0 +1,95 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : rapports hors ligne (contenu, empreintes, pool)
+#******************************************************************
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_geopackages, make_register
+from griefpy.incremental import IncrementalStore, source_state_dir
+from griefpy.rapports import ALL_COMMUNITIES, build_reports, load_dataset, slug
+from griefpy.remote import RemoteFetcher
+
+pytestmark = pytest.mark.filterwarnings("ignore:CartoDB tiles")
+
+
+@pytest.fixture
+def sources(tmp_path):
+    raw = make_register(200, n_communities=3, start="2023-01-01", end="2024-12-31")
+    raw.to_excel(tmp_path / "registre.xlsx", index=False)
+    points, limite = make_geopackages(str(tmp_path), raw["Communaute"].unique())
+    return raw, str(tmp_path / "registre.xlsx"), points, limite
+
+
+def charger(tmp_path, sources):
+    _, registre, points, limite = sources
+    return load_dataset(registre, points, limite, RemoteFetcher(str(tmp_path / "copies")), str(tmp_path / "etat"))
+
+
+def test_un_rapport_par_annee_et_communaute(tmp_path, sources):
+    raw = sources[0]
+    dataset = charger(tmp_path, sources)
+    sortie = tmp_path / "rapports"
+    stats = build_reports(dataset, str(sortie), max_workers=1)
+
+    attendus = {
+        f"{annee}/{nom}"
+        for annee, communautes in raw.groupby(raw["Date_reception"].dt.year)["Communaute"]
+        for nom in [ALL_COMMUNITIES] + [slug(c.strip().lower()) for c in communautes.unique()]
+    }
+    empreintes = json.loads((sortie / "empreintes.json").read_text(encoding="utf-8"))
+    assert set(empreintes) == attendus and stats.rendered == len(attendus)
+
+    # Indicateurs du rapport global = comptes du registre pour l'année
+    annee = int(raw["Date_reception"].dt.year.min())
+    kpis = json.loads((sortie / str(annee) / ALL_COMMUNITIES / "indicateurs.json").read_text(encoding="utf-8"))
+    assert kpis["total"] == int((raw["Date_reception"].dt.year == annee).sum())
+    page = (sortie / str(annee) / ALL_COMMUNITIES / "index.html").read_text(encoding="utf-8")
+    assert "Nature de griefs par traitement" in page and "carte.html" in page
+    assert (sortie / str(annee) / ALL_COMMUNITIES / "carte.html").exists()
+
+
+def test_rapports_inchanges_ignores(tmp_path, sources):
+    raw, registre = sources[:2]
+    sortie = str(tmp_path / "rapports")
+    build_reports(charger(tmp_path, sources), sortie, max_workers=1)
+    assert build_reports(charger(tmp_path, sources), sortie, max_workers=1).rendered == 0
+
+    # Durées modifiées pour une communauté et une année : deux rapports à refaire
+    communaute, annee = raw.loc[0, "Communaute"], raw.loc[0, "Date_reception"].year
+    cible = (raw["Communaute"] == communaute) & (raw["Date_reception"].dt.year == annee)
+    raw.loc[cible, "Nb_jour"] += 1000
+    raw.to_excel(registre, index=False)
+    stats = build_reports(charger(tmp_path, sources), sortie, max_workers=1)
+    assert stats.rendered == 2
+
+
+def test_etat_partage_avec_le_dashboard(tmp_path, sources):
+    raw, registre = sources[:2]
+    dashboard = IncrementalStore(source_state_dir(registre, str(tmp_path / "etat")))
+    dashboard.refresh(registre)
+
+    # Le CLI fait avancer l'état partagé, puis le dashboard reçoit une autre version
+    raw.loc[:9, "Nb_jour"] += 1000
+    raw.to_excel(registre, index=False)
+    dataset = charger(tmp_path, sources)
+    assert dataset.version != dashboard.version
+    raw = raw.iloc[20:]
+    raw.to_excel(registre, index=False)
+    assert dashboard.refresh(registre).mode != "unchanged"
+
+    attendu = IncrementalStore(str(tmp_path / "neuf"))
+    attendu.refresh(registre)
+    relu = IncrementalStore(dashboard.state_dir)
+    assert relu.version == attendu.version
+    for store in (dashboard, relu):
+        frames = [s.snapshot.frame.sort_values("ID").reset_index(drop=True) for s in (store, attendu)]
+        pd.testing.assert_frame_equal(*frames, check_categorical=False)
+
+
+def test_rendu_en_processus(tmp_path, sources, monkeypatch):
+    monkeypatch.setattr("griefpy.rapports.os.cpu_count", lambda: 2)
+    stats = build_reports(charger(tmp_path, sources), str(tmp_path / "rapports"), annees=[2024], max_workers=2)
+    assert stats.rendered == 4 and stats.skipped == 0
+    assert all((tmp_path / "rapports" / "2024" / d / "index.html").exists() for d in [ALL_COMMUNITIES])
@@ -0,0 +1,144 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : scrutation en tâche de fond, attente croissante
+#******************************************************************
+import io
+import time
+
+import pytest
+
+from benchmarks.synthetic import make_register
+from griefpy.incremental import IncrementalStore
+from griefpy.refresh import BackgroundRefresher, backoff_delay
+from griefpy.remote import RemoteFetcher
+
+
+class Horloge:
+    """Horloge injectée : le temps n'avance que sur demande."""
+
+    def __init__(self):
+        self.t = 1_000.0
+
+    def __call__(self):
+        return self.t
+
+
+def classeur(n_rows, seed=0):
+    buffer = io.BytesIO()
+    make_register(n_rows, n_communities=5, seed=seed).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def scrutateur(source_http, tmp_path):
+    source_http.body = classeur(40)
+    horloge = Horloge()
+    store = IncrementalStore(str(tmp_path / "etat"))
+    refresher = BackgroundRefresher(
+        RemoteFetcher(str(tmp_path / "copies")), store, source_http.url("Table_MGG.xlsx"),
+        interval=30, max_backoff=300, clock=horloge,
+    )
+    return refresher, store, horloge
+
+
+def test_backoff_delay():
+    assert [backoff_delay(30, n, 300) for n in range(6)] == [30, 60, 120, 240, 300, 300]
+
+
+def test_premiere_scrutation_publie(scrutateur):
+    refresher, store, horloge = scrutateur
+    status = refresher.poll()
+    assert status.failures == 0 and status.last_error is None
+    assert status.version == store.snapshot.version
+    assert len(store.snapshot.frame) == 40
+    assert status.checked_at == status.changed_at == horloge.t
+    assert status.next_at == horloge.t + 30
+
+
+def test_pannes_attente_croissante_et_derniere_version_servie(scrutateur, source_http):
+    refresher, store, horloge = scrutateur
+    bonne = refresher.poll().version
+    snapshot = store.snapshot
+
+    source_http.pannes = 10
+    attentes = []
+    for _ in range(5):
+        horloge.t += 10
+        status = refresher.poll()
+        attentes.append(status.next_at - horloge.t)
+        assert "RemoteFetchError" in status.last_error
+        # La dernière version valide reste publiée, sans reconstruction
+        assert store.snapshot is snapshot
+    assert attentes == [60, 120, 240, 300, 300]
+    assert refresher.status.failures == 5
+    assert refresher.status.version == bonne
+
+    # Source rétablie avec une nouvelle version : publication et attente normale
+    source_http.pannes = 0
+    source_http.body = classeur(45, seed=1)
+    horloge.t += 10
+    status = refresher.poll()
+    assert status.failures == 0 and status.last_error is None
+    assert status.version != bonne and status.version == store.snapshot.version
+    assert len(store.snapshot.frame) == 45
+    assert status.next_at == horloge.t + 30
+
+
+def test_classeur_illisible_garde_la_version_valide(scrutateur, source_http):
+    refresher, store, horloge = scrutateur
+    bonne = refresher.poll().version
+    snapshot = store.snapshot
+
+    source_http.body = b"pas un classeur"
+    horloge.t += 30
+    status = refresher.poll()
+    assert status.failures == 1 and status.last_error
+    assert status.version == bonne
+    assert store.snapshot is snapshot
+
+
+def test_serveur_arrete(scrutateur, source_http):
+    refresher, store, horloge = scrutateur
+    bonne = refresher.poll().version
+    source_http.arreter()
+    status = refresher.poll()
+    assert status.failures == 1 and "injoignable" in status.last_error
+    assert store.snapshot.version == bonne
+
+
+def test_sources_en_parallele(source_http, tmp_path):
+    source_http.body = classeur(40)
+    source_http.delais = {"Table_MGG.xlsx": 0.6, "boites.gpkg": 0.4, "limite.gpkg": 0.4}
+    store = IncrementalStore(str(tmp_path / "etat"))
+    arrivees = {}
+
+    def on_fetched(result):
+        # GeoPackage prêt alors que le classeur n'est pas encore publié
+        arrivees[result.url.rsplit("/", 1)[1]] = store.version
+
+    refresher = BackgroundRefresher(
+        RemoteFetcher(str(tmp_path / "copies")), store, source_http.url("Table_MGG.xlsx"),
+        [source_http.url("boites.gpkg"), source_http.url("limite.gpkg")], on_fetched=on_fetched,
+    )
+    t0 = time.perf_counter()
+    status = refresher.poll()
+    # Proche du plus long téléchargement, loin de la somme (1,4 s)
+    assert time.perf_counter() - t0 < 1.2
+    assert status.failures == 0 and status.version == store.version
+    assert arrivees == {"boites.gpkg": None, "limite.gpkg": None, "Table_MGG.xlsx": None}
+
+
+def test_delai_par_source(source_http, tmp_path):
+    source_http.body = classeur(40)
+    source_http.delais = {"limite.gpkg": 1.0}
+    store = IncrementalStore(str(tmp_path / "etat"))
+    limite = source_http.url("limite.gpkg")
+    refresher = BackgroundRefresher(
+        RemoteFetcher(str(tmp_path / "copies"), timeout=30), store, source_http.url("Table_MGG.xlsx"),
+        [limite], timeouts={limite: 0.2},
+    )
+    t0 = time.perf_counter()
+    status = refresher.poll()
+    assert time.perf_counter() - t0 < 0.9
+    assert status.failures == 1 and "RemoteFetchError" in status.last_error
+    # Le classeur arrivé à temps est tout de même publié
+    assert status.version == store.version is not None
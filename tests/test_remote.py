@@ -0,0 +1,79 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : téléchargement conditionnel et copie hors ligne
+#******************************************************************
+import pytest
+
+from griefpy.remote import RemoteFetcher, RemoteFetchError
+
+
+def lire(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_premier_telechargement_puis_304(source_http, tmp_path):
+    source_http.body = b"version 1"
+    fetcher = RemoteFetcher(str(tmp_path))
+    url = source_http.url("Table_MGG.xlsx")
+
+    premier = fetcher.fetch(url)
+    assert premier.status == "downloaded"
+    assert lire(premier.path) == b"version 1"
+
+    second = fetcher.fetch(url)
+    assert second.status == "not_modified"
+    assert second.path == premier.path
+    # La revalidation a bien transmis l'ETag de la copie locale
+    assert source_http.requetes[-1] is not None
+
+
+def test_copie_fraiche_sans_appel_reseau(source_http, tmp_path):
+    source_http.body = b"version 1"
+    fetcher = RemoteFetcher(str(tmp_path), max_age=3600)
+    url = source_http.url("Table_MGG.xlsx")
+    fetcher.fetch(url)
+    assert fetcher.fetch(url).status == "cached"
+    assert len(source_http.requetes) == 1
+
+
+def test_nouvelle_version_remplace_la_copie(source_http, tmp_path):
+    source_http.body = b"version 1"
+    fetcher = RemoteFetcher(str(tmp_path))
+    url = source_http.url("Table_MGG.xlsx")
+    ancien = fetcher.fetch(url)
+    source_http.body = b"version 2"
+    nouveau = fetcher.fetch(url)
+    assert nouveau.status == "downloaded"
+    assert lire(nouveau.path) == b"version 2"
+    assert nouveau.sha256 != ancien.sha256
+
+
+def test_hors_ligne_sert_la_derniere_copie(source_http, tmp_path):
+    source_http.body = b"version 1"
+    fetcher = RemoteFetcher(str(tmp_path))
+    url = source_http.url("Table_MGG.xlsx")
+    premier = fetcher.fetch(url)
+
+    source_http.pannes = 1
+    panne = fetcher.fetch(url)
+    assert panne.status == "offline"
+    assert lire(panne.path) == b"version 1"
+
+    source_http.arreter()
+    coupure = RemoteFetcher(str(tmp_path), timeout=2).fetch(url)
+    assert coupure.status == "offline"
+    assert coupure.path == premier.path
+
+
+def test_sans_copie_locale_leve_une_erreur(source_http, tmp_path):
+    source_http.pannes = 1
+    with pytest.raises(RemoteFetchError):
+        RemoteFetcher(str(tmp_path)).fetch(source_http.url("Table_MGG.xlsx"))
+
+
+def test_chemin_local_transmis_tel_quel(tmp_path):
+    path = tmp_path / "Table_MGG.xlsx"
+    path.write_bytes(b"x")
+    result = RemoteFetcher(str(tmp_path / "cache")).fetch(str(path))
+    assert result.status == "local"
+    assert result.path == str(path)
@@ -0,0 +1,42 @@
+#*********************** Projet GriefPy ***************************
+#   Tests : exports du tableau acceptés par st.download_button
+#******************************************************************
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from streamlit.runtime.media_file_manager import convert_data_to_bytes_and_infer_mime
+
+from benchmarks.synthetic import make_register
+from griefpy.table import export_csv, export_parquet
+
+
+@pytest.fixture
+def registre():
+    df = make_register(1_000, n_communities=5)
+    return df, np.arange(0, len(df), 3), ["ID", "Communaute", "Nb_jour"]
+
+
+@pytest.mark.parametrize("export, lire", [
+    (export_csv, lambda data: pd.read_csv(io.BytesIO(data), encoding="utf-8-sig")),
+    (export_parquet, lambda data: pd.read_parquet(io.BytesIO(data))),
+])
+def test_export_par_blocs(registre, export, lire):
+    df, rows, colonnes = registre
+    # Plusieurs blocs : un seul en-tête CSV, un groupe Parquet par bloc
+    data, _ = convert_data_to_bytes_and_infer_mime(
+        export(df, rows, colonnes, chunk_rows=100), unsupported_error=TypeError("type refusé")
+    )
+    relu = lire(data)
+    assert list(relu.columns) == colonnes
+    pd.testing.assert_frame_equal(
+        relu.astype(str), df.take(rows)[colonnes].reset_index(drop=True).astype(str)
+    )
+
+
+def test_export_vide(registre):
+    df, _, colonnes = registre
+    rows = np.array([], dtype=np.int64)
+    assert list(pd.read_parquet(export_parquet(df, rows, colonnes)).columns) == colonnes
+    assert export_csv(df, rows, colonnes).getvalue().decode("utf-8-sig").strip() == ",".join(colonnes)